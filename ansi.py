@@ -0,0 +1,184 @@
+import os
+import sys
+import numpy as np
+
+import painter
+
+# --- ANSI escape sequences ---
+CURSOR_HOME = b"\x1b[H"
+CLEAR_SCREEN = b"\x1b[2J"
+HIDE_CURSOR = b"\x1b[?25l"
+SHOW_CURSOR = b"\x1b[?25h"
+RESET_ATTRIBUTES = b"\x1b[0m"
+# Synchronized output (DEC mode 2026): the terminal holds the screen until
+# the end marker, so a frame is never shown half drawn. Terminals that do
+# not support it ignore the markers.
+BEGIN_SYNC = b"\x1b[?2026h"
+END_SYNC = b"\x1b[?2026l"
+ROW_SEPARATOR = b"\r\n"
+
+
+class AnsiScreen:
+    """
+    Output backend that bypasses curses and writes each frame to a terminal
+    file descriptor as one buffer of ANSI escape sequences.
+
+    Frames are drawn from the cursor home position, rows are separated by
+    CR/LF, and in color mode a 24-bit foreground escape is emitted only when
+    the color differs from the previous cell.
+
+    Attributes:
+        bytes_last_frame (int): Size of the most recently written frame.
+        total_bytes (int): Bytes written for all frames so far.
+        frames_written (int): Number of frames written.
+    """
+
+    def __init__(self, fd=None, color_bits=8, synchronized=True):
+        """
+        Args:
+            fd (int, optional): File descriptor to write to. Defaults to stdout.
+            color_bits (int): Bits kept per color channel. Fewer bits make
+                neighbouring cells share colors more often, which means fewer
+                escapes and smaller frames.
+            synchronized (bool): Wrap frames in synchronized-output markers.
+        """
+        self.fd = sys.stdout.fileno() if fd is None else fd
+        self.color_mask = (0xFF << (8 - color_bits)) & 0xFF
+        self.synchronized = synchronized
+        self.bytes_last_frame = 0
+        self.total_bytes = 0
+        self.frames_written = 0
+        # Reused output buffer of the compiled kernel, grown as needed
+        self._body = bytearray()
+
+    def start(self):
+        """Clears the terminal and hides the cursor."""
+        self._write(CLEAR_SCREEN + CURSOR_HOME + HIDE_CURSOR)
+
+    def clear(self):
+        """Clears the terminal, e.g. before frames of a smaller size."""
+        self._write(CLEAR_SCREEN + CURSOR_HOME)
+
+    def stop(self):
+        """Restores the cursor and text attributes."""
+        self._write(RESET_ATTRIBUTES + SHOW_CURSOR + ROW_SEPARATOR)
+
+    def average_bytes(self):
+        """Returns the average frame size in bytes."""
+        if self.frames_written == 0:
+            return 0
+        return self.total_bytes / self.frames_written
+
+    def paint_screen(self, grayscale_frame, overlay=None):
+        """
+        Renders and writes a grayscale frame as ASCII characters.
+
+        Args:
+            grayscale_frame (numpy.ndarray): A 2D array of grayscale pixel values.
+            overlay (overlay.Overlay, optional): Text merged into the frame.
+        """
+        chars = painter.frame_to_chars(grayscale_frame, painter.frame_buffer("ansi_chars", grayscale_frame.shape))
+        if overlay is not None:
+            chars, _ = overlay.apply(chars)
+        self.write_frame(self.render_chars(chars))
+
+    def paint_color_screen(self, grayscale_frame, frame, overlay=None):
+        """
+        Renders and writes a frame as ASCII characters colored with the
+        original pixel colors.
+
+        Args:
+            grayscale_frame (numpy.ndarray): A 2D array of grayscale pixel values.
+            frame (numpy.ndarray): A 3D array (height, width, 3) of BGR pixel
+                values. Overlay cells are painted over in place.
+            overlay (overlay.Overlay, optional): Text merged into the frame.
+        """
+        chars = painter.frame_to_chars(grayscale_frame, painter.frame_buffer("ansi_chars", grayscale_frame.shape))
+        if overlay is not None:
+            chars, frame = overlay.apply(chars, frame)
+        self.write_frame(self.render_chars(chars, frame))
+
+    def render_chars(self, chars, frame=None):
+        """
+        Builds the escape-coded bytes for a frame of character codes.
+
+        Args:
+            chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+            frame (numpy.ndarray, optional): A (height, width, 3) BGR array
+                giving each cell's foreground color. Monochrome if None.
+
+        Returns:
+            bytes: The complete frame, ready to be written to the terminal.
+        """
+        height, row_width = chars.shape
+        parts = [BEGIN_SYNC, CURSOR_HOME] if self.synchronized else [CURSOR_HOME]
+        if painter.painter_kernel:
+            # Escapes and characters go into one reused buffer; only the
+            # finished frame is copied out
+            needed = height * ((row_width * 20 if frame is not None else row_width) + 2)
+            if len(self._body) < needed:
+                self._body = bytearray(needed)
+            length = painter.painter_kernel.ansi_body(chars, frame, self.color_mask, self._body)
+            parts.append(memoryview(self._body)[:length])
+            if frame is not None:
+                parts.append(RESET_ATTRIBUTES)
+            if self.synchronized:
+                parts.append(END_SYNC)
+            return b"".join(parts)
+
+        data = np.ascontiguousarray(chars).tobytes()
+
+        if frame is None:
+            parts.append(ROW_SEPARATOR.join(data[i:i + row_width]
+                                            for i in range(0, len(data), row_width)))
+        else:
+            masked = np.bitwise_and(frame, self.color_mask, out=painter.frame_buffer("ansi_masked", frame.shape))
+            # Pack each BGR pixel into a single 0xRRGGBB integer
+            packed = painter.frame_buffer("ansi_packed", (height * row_width,), np.uint32)
+            channel = painter.frame_buffer("ansi_channel", (height * row_width,), np.uint32)
+            np.left_shift(masked[..., 2].ravel(), 16, out=packed, dtype=np.uint32)
+            np.left_shift(masked[..., 1].ravel(), 8, out=channel, dtype=np.uint32)
+            packed |= channel
+            packed |= masked[..., 0].ravel()
+            changed = painter.frame_buffer("ansi_changed", packed.shape, bool)
+            changed[0] = True
+            np.not_equal(packed[1:], packed[:-1], out=changed[1:])
+            # Segments start at every color change and every row start
+            boundaries = painter.frame_buffer("ansi_boundaries", packed.shape, bool)
+            np.copyto(boundaries, changed)
+            boundaries[::row_width] = True
+            starts = np.flatnonzero(boundaries)
+            ends = np.append(starts[1:], packed.size)
+
+            for start, end, new_color, rgb in zip(starts.tolist(), ends.tolist(),
+                                                  changed[starts].tolist(), packed[starts].tolist()):
+                if start and start % row_width == 0:
+                    parts.append(ROW_SEPARATOR)
+                if new_color:
+                    parts.append(b"\x1b[38;2;%d;%d;%dm" % (rgb >> 16, (rgb >> 8) & 0xFF, rgb & 0xFF))
+                parts.append(data[start:end])
+            parts.append(RESET_ATTRIBUTES)
+
+        if self.synchronized:
+            parts.append(END_SYNC)
+        return b"".join(parts)
+
+    def write_frame(self, payload):
+        """
+        Writes a rendered frame and updates the byte statistics.
+
+        Args:
+            payload (bytes): A frame produced by render_chars.
+        """
+        self._write(payload)
+        self.bytes_last_frame = len(payload)
+        self.total_bytes += len(payload)
+        self.frames_written += 1
+
+    def _write(self, payload):
+        # A single os.write normally takes the whole frame; loop only in case
+        # the descriptor accepts a partial write.
+        view = memoryview(payload)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
@@ -0,0 +1,215 @@
+import os
+import subprocess
+import threading
+import time
+
+
+class AudioStream:
+    """
+    Plays a media file's audio track while it is still being decoded.
+
+    FFmpeg decodes the audio to raw PCM on a pipe; a background thread cuts
+    the stream into short chunks and feeds them to a pygame mixer channel
+    through its one-slot queue. Playback therefore starts as soon as the
+    first chunk is decoded instead of after the whole track has been
+    transcoded to a file.
+
+    The playback position is tracked from the moment each chunk actually
+    starts playing, so it can drive A/V synchronization like
+    pygame.mixer.music.get_pos(). It stands still while paused, and seek()
+    restarts the decoder at a new position without closing the mixer.
+
+    Attributes:
+        first_chunk_latency (float or None): Seconds from start() until
+            audio began playing, or None if it has not started.
+        seek_latencies (list): Seconds from each seek() (or the resume()
+            after it) until audio played again.
+    """
+
+    def __init__(self, source, chunk_seconds=0.1, start_time=0.0):
+        """
+        Args:
+            source (str): A file path or URL FFmpeg can read.
+            chunk_seconds (float): Length of each chunk handed to the mixer.
+            start_time (float): Position in seconds to start playing from.
+        """
+        self.source = source
+        self.chunk_seconds = chunk_seconds
+        self.start_time = start_time
+        self.first_chunk_latency = None
+        self.seek_latencies = []
+        self._process = None
+        self._mixer = None
+        self._channel = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._finished = False
+        self._paused_at = None
+        self._lock = threading.Lock()
+        # Position of the chunk currently playing, and when it started
+        self._anchor_pos = None
+        self._anchor_time = 0.0
+        self._anchor_duration = 0.0
+
+    def start(self):
+        """
+        Initializes the mixer, launches FFmpeg and starts streaming.
+
+        Returns:
+            bool: False if FFmpeg could not be started.
+        """
+        # Imported on first use, so silent playback never loads pygame. It
+        # would otherwise print its banner over the screen already set up.
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        import pygame
+        self._mixer = pygame.mixer
+        if not self._mixer.get_init():
+            self._mixer.init()
+        self.sample_rate, size, self.channels = self._mixer.get_init()
+        self._frame_bytes = abs(size) // 8 * self.channels
+        self._channel = self._mixer.Channel(0)
+        return self._launch()
+
+    def _launch(self):
+        command = [
+            'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+            '-ss', str(self.start_time), '-i', self.source, '-vn',
+            '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ac', str(self.channels), '-ar', str(self.sample_rate), '-'
+        ]
+        self._launch_time = time.perf_counter()
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError:
+            self._finished = True
+            return False
+        self._thread = threading.Thread(target=self._run, name="audio-stream", daemon=True)
+        self._thread.start()
+        return True
+
+    def _halt(self):
+        self._stop.set()
+        if self._process:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._channel:
+            self._channel.stop()
+
+    def stop(self):
+        """Stops playback and the FFmpeg process, and shuts the mixer down."""
+        self._halt()
+        if self._mixer and self._mixer.get_init():
+            self._mixer.quit()
+
+    def pause(self):
+        """Pauses playback; the position stands still until resume()."""
+        if self._paused_at is not None:
+            return
+        with self._lock:
+            self._paused_at = time.perf_counter()
+        if self._channel:
+            self._channel.pause()
+
+    def resume(self):
+        """Resumes playback after pause(), or starts it after a seek while paused."""
+        if self._paused_at is None:
+            return
+        with self._lock:
+            # The chunk playing when paused continues where it stopped
+            self._anchor_time += time.perf_counter() - self._paused_at
+            self._paused_at = None
+        if self._channel:
+            self._channel.unpause()
+        if self._thread is None and self._channel is not None:
+            self._launch()
+
+    def seek(self, position):
+        """
+        Restarts decoding at 'position' seconds. get_pos() returns -1 until
+        the first chunk from there plays. While paused, decoding restarts on
+        resume().
+        """
+        if self._channel is None:
+            return
+        self._halt()
+        self._stop.clear()
+        self._finished = False
+        self.start_time = position
+        with self._lock:
+            self._anchor_pos = None
+        if self._paused_at is None:
+            self._launch()
+
+    def get_busy(self):
+        """Returns True once audio has started playing, until it ends."""
+        return self._anchor_pos is not None and not self._finished
+
+    def get_pos(self):
+        """
+        Returns the playback position in milliseconds, or -1 if playback has
+        not started yet.
+        """
+        with self._lock:
+            if self._anchor_pos is None:
+                return -1
+            now = time.perf_counter() if self._paused_at is None else self._paused_at
+            # Do not run past the end of the current chunk during an underrun
+            elapsed = min(now - self._anchor_time, self._anchor_duration)
+            return int((self._anchor_pos + elapsed) * 1000)
+
+    def _set_anchor(self, position, duration):
+        with self._lock:
+            self._anchor_pos = position
+            self._anchor_time = time.perf_counter()
+            self._anchor_duration = duration
+
+    def _run(self):
+        chunk_bytes = int(self.sample_rate * self.chunk_seconds) * self._frame_bytes
+        position = self.start_time
+        queued = None
+        started = False
+
+        while not self._stop.is_set():
+            data = self._process.stdout.read(chunk_bytes)
+            # Drop a trailing partial sample frame
+            data = data[:len(data) - len(data) % self._frame_bytes]
+            if not data:
+                break
+            sound = self._mixer.Sound(buffer=data)
+            duration = len(data) / self._frame_bytes / self.sample_rate
+
+            # Wait for the channel's queue slot to free up
+            while not self._stop.is_set() and self._channel.get_queue() is not None:
+                time.sleep(0.005)
+            if queued is not None and self._channel.get_busy():
+                # The previously queued chunk is now the one playing
+                self._set_anchor(*queued)
+                queued = None
+
+            if not self._channel.get_busy():
+                # First chunk, or the decoder fell behind and playback ran dry
+                self._channel.play(sound)
+                self._set_anchor(position, duration)
+                queued = None
+                if not started:
+                    started = True
+                    if self.first_chunk_latency is None:
+                        self.first_chunk_latency = time.perf_counter() - self._launch_time
+                    else:
+                        self.seek_latencies.append(time.perf_counter() - self._launch_time)
+            else:
+                self._channel.queue(sound)
+                queued = (position, duration)
+            position += duration
+
+        # Let the last chunks play out
+        while not self._stop.is_set() and self._channel.get_busy():
+            if queued is not None and self._channel.get_queue() is None:
+                self._set_anchor(*queued)
+                queued = None
+            time.sleep(0.005)
+        self._finished = True
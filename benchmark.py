@@ -0,0 +1,410 @@
+import argparse
+import contextlib
+import curses
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+import color
+import painter
+from ansi import AnsiScreen
+from overlay import Overlay
+from pipeline import FrameBuffers
+
+# --- Argument Parsing ---
+parser = argparse.ArgumentParser(description='Headless benchmarks for the painter and color hot paths')
+parser.add_argument("--video", type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "slam_dunk.mp4"),
+                    help="video to decode benchmark frames from")
+parser.add_argument("--widths", type=int, nargs="+", default=[80, 120, 200, 300], help="render widths to benchmark")
+parser.add_argument("--frames", type=int, default=30, help="number of frames per benchmark")
+parser.add_argument("--only", type=str, nargs="+", default=None, help="run only the named benchmarks")
+parser.add_argument("--output", type=str, default="", help="write results to this JSON file")
+parser.add_argument("--baseline", type=str, default="", help="compare against results from an earlier run")
+parser.add_argument("--no-kernel", action='store_true', help="benchmark the NumPy fallback instead of the compiled painter kernel")
+parser.add_argument("--tolerance", type=float, default=0.15,
+                    help="relative p50 slowdown against the baseline reported as a regression")
+parser.add_argument("--check-allocations", action='store_true',
+                    help="measure Python heap allocations per frame on the decode-to-paint path instead of timing")
+parser.add_argument("--allocation-limit", type=float, default=32,
+                    help="bytes allocated per character cell and frame that --check-allocations accepts "
+                         "(the bound assumes the compiled painter kernel)")
+parser.add_argument("--check-startup", action='store_true',
+                    help="time a fresh import of the player's modules and check that no heavy module is loaded up front")
+
+
+class RecordingWindow:
+    """
+    Stands in for a curses window. Records how many draw calls and characters
+    were issued instead of drawing anything.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.calls = 0
+        self.chars = 0
+
+    def addch(self, y, x, char, attr=0):
+        self.calls += 1
+        self.chars += 1
+
+    def addstr(self, y, x, text, attr=0):
+        self.calls += 1
+        self.chars += len(text)
+
+    def refresh(self):
+        pass
+
+
+@contextlib.contextmanager
+def headless_curses(colors=256):
+    """
+    Makes the curses color functions usable without a terminal, so
+    CursesColor can be built and color pairs looked up in benchmarks.
+    """
+    fakes = {
+        "has_colors": lambda: True,
+        "can_change_color": lambda: True,
+        "init_color": lambda *args: None,
+        "init_pair": lambda *args: None,
+        "color_pair": lambda pair_id: pair_id << 8,
+        "COLORS": colors,
+        "COLOR_PAIRS": colors,
+    }
+    saved = {name: getattr(curses, name) for name in fakes if hasattr(curses, name)}
+    for name, value in fakes.items():
+        setattr(curses, name, value)
+    try:
+        yield
+    finally:
+        for name in fakes:
+            if name in saved:
+                setattr(curses, name, saved[name])
+            else:
+                delattr(curses, name)
+
+
+def load_frames(video, width, num_frames):
+    """
+    Decodes num_frames frames spread evenly across the video and resizes them
+    the same way the players do.
+
+    Returns:
+        list: (frame_resized, grayscale_frame) tuples.
+    """
+    cap = cv2.VideoCapture(video)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for i in range(num_frames):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(i * total_frames / num_frames))
+        ok, frame = cap.read()
+        if not ok:
+            continue
+        height = int(frame.shape[0] * (width / frame.shape[1]) * (3.0 / 5))
+        frame_resized = cv2.resize(frame, (width, height))
+        frames.append((frame_resized, cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"Could not decode frames from {video}")
+    return frames
+
+
+def summarize(latencies, window):
+    """
+    Turns per-frame latencies (seconds) into a result dictionary.
+    """
+    ms = np.array(latencies) * 1000
+    return {
+        "frames": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "fps": float(1000 / ms.mean()) if ms.mean() > 0 else float("inf"),
+        "draw_calls_per_frame": window.calls / len(ms) if window else 0,
+    }
+
+
+def time_frames(frames, window, render):
+    latencies = []
+    for frame_resized, grayscale_frame in frames:
+        start = time.perf_counter()
+        render(window, frame_resized, grayscale_frame)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, window)
+
+
+def bench_paint_screen(frames, curses_color, embedding):
+    height, width = frames[0][1].shape
+    return time_frames(frames, RecordingWindow(height, width),
+                       lambda window, frame, gray: painter.paint_screen(window, gray, width, height))
+
+
+def bench_paint_color_screen(frames, curses_color, embedding):
+    height, width = frames[0][1].shape
+    return time_frames(frames, RecordingWindow(height, width),
+                       lambda window, frame, gray: painter.paint_color_screen(window, gray, frame, width, height,
+                                                                               curses_color))
+
+
+def bench_paint_embedding(frames, curses_color, embedding):
+    height, width = frames[0][1].shape
+    embed_bytes = embedding.encode("utf-8")
+    embed_height = len(embedding.split("\n"))
+    return time_frames(frames, RecordingWindow(height, width),
+                       lambda window, frame, gray: painter.paint_embedding(window, embed_bytes, embed_height,
+                                                                            width, height))
+
+
+def bench_overlay(frames, curses_color, embedding):
+    # The same watermark merged into the character grid instead of drawn on top
+    height, width = frames[0][1].shape
+    overlay = Overlay(width, height)
+    overlay.add_text(embedding, "bottom-right")
+    return time_frames(frames, RecordingWindow(height, width),
+                       lambda window, frame, gray: painter.paint_screen(window, gray, width, height, overlay))
+
+
+def bench_get_color(frames, curses_color, embedding):
+    # Per-pixel lookups through the lru_cache, as the scalar path does
+    CursesColor = type(curses_color)
+    CursesColor.get_color.cache_clear()
+
+    def render(window, frame, gray):
+        for row in frame:
+            for pixel in row:
+                curses_color.get_color(tuple(pixel))
+
+    return time_frames(frames, None, render)
+
+
+BENCHMARKS = {
+    "paint_screen": bench_paint_screen,
+    "paint_color_screen": bench_paint_color_screen,
+    "paint_embedding": bench_paint_embedding,
+    "overlay": bench_overlay,
+    "get_color": bench_get_color,
+}
+
+SAMPLE_EMBEDDING = "\n".join([
+    "+--------------------+",
+    "|   ASCII  PLAYER    |",
+    "|  benchmark embed   |",
+    "+--------------------+",
+])
+
+
+def allocation_paths(width, height, curses_color, fd):
+    """
+    The steady-state render paths checked by --check-allocations, each taking
+    a resized BGR frame and its grayscale version. ANSI frames are written to
+    'fd'.
+    """
+    window = RecordingWindow(height, width)
+    mono_screen = AnsiScreen(fd=fd)
+    color_screen = AnsiScreen(fd=fd)
+    return {
+        "paint_screen": lambda frame, gray: painter.paint_screen(window, gray, width, height),
+        "paint_color_screen": lambda frame, gray: painter.paint_color_screen(window, gray, frame, width, height,
+                                                                             curses_color),
+        "ansi": lambda frame, gray: mono_screen.paint_screen(gray),
+        "ansi_color": lambda frame, gray: color_screen.paint_color_screen(gray, frame),
+    }
+
+
+def check_allocations(video, width, num_frames, limit, warmup=10):
+    """
+    Runs decode, resize, grayscale conversion and painting frame after frame
+    under tracemalloc, as the player's loop does, and checks the peak heap
+    growth of every frame after the warmup against 'limit' bytes per cell.
+    Growth that stays allocated across the run is checked against the same
+    per-frame bound, so a slow leak fails too.
+
+    Returns:
+        list: Descriptions of the paths that exceeded the limit.
+    """
+    cap = cv2.VideoCapture(video)
+    ok, frame = cap.read()
+    if not ok:
+        raise RuntimeError(f"Could not decode frames from {video}")
+    height = int(frame.shape[0] * (width / frame.shape[1]) * (3.0 / 5))
+    curses_color = color.CursesColor(cv2.resize(frame, (width, height)))
+    bound = limit * width * height
+    failures = []
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    tracemalloc.start()
+    try:
+        for name, render in allocation_paths(width, height, curses_color, devnull).items():
+            buffers = FrameBuffers()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            peaks = []
+            steady = None
+            for i in range(warmup + num_frames):
+                if i == warmup:
+                    steady = tracemalloc.get_traced_memory()[0]
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                ok, frame = buffers.read(cap)
+                if not ok:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ok, frame = buffers.read(cap)
+                frame_resized = buffers.resize(frame, width, height)
+                render(frame_resized, buffers.to_gray(frame_resized))
+                if i >= warmup:
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            growth = tracemalloc.get_traced_memory()[0] - steady
+            peak = max(peaks)
+            marker = ""
+            if peak > bound or growth > bound:
+                marker = "  <-- OVER LIMIT"
+                failures.append(f"{name}@{width}")
+            print(f"{name + '@' + str(width):<28} peak {peak:9d} B/frame ({peak / (width * height):6.1f} B/cell)  "
+                  f"retained {growth:7d} B over {num_frames} frames{marker}")
+    finally:
+        tracemalloc.stop()
+        os.close(devnull)
+        cap.release()
+    return failures
+
+
+# Modules the player imports, in cplayer.py's order
+PLAYER_MODULES = ["cv2", "curses", "numpy", "color", "youtube_utils", "youtube_cache", "ansi", "container",
+                  "palette_cache", "palette_worker", "pipeline", "sync", "audio", "frame_source", "stats",
+                  "overlay", "quality", "seek_index", "controls", "painter"]
+# Only needed once playback is under way (palette building, audio, YouTube)
+DEFERRED_MODULES = ["sklearn", "scipy", "pygame", "yt_dlp"]
+
+
+def check_startup():
+    """
+    Imports the player's modules in a fresh interpreter, as starting the
+    player does, and reports how long that took and which of the
+    DEFERRED_MODULES were loaded anyway.
+
+    Returns:
+        list: The deferred modules that were imported at startup.
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {PLAYER_MODULES!r}:\n"
+        "    __import__(name)\n"
+        "seconds = time.perf_counter() - start\n"
+        f"loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]\n"
+        "print(json.dumps({'seconds': seconds, 'loaded': loaded}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    result = json.loads(output.splitlines()[-1])
+    print(f"Player modules imported in {result['seconds'] * 1000:.0f} ms")
+    for name in DEFERRED_MODULES:
+        print(f"{name:<28} {'LOADED AT STARTUP' if name in result['loaded'] else 'deferred'}")
+    return result["loaded"]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares p50 latencies against a baseline.
+
+    Returns:
+        list: Descriptions of the benchmarks that regressed.
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous or previous["p50_ms"] <= 0:
+            continue
+        change = result["p50_ms"] / previous["p50_ms"] - 1
+        marker = ""
+        if change > tolerance:
+            marker = "  <-- REGRESSION"
+            regressions.append(key)
+        print(f"{key:<28} {previous['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms ({change:+.1%}){marker}")
+    return regressions
+
+
+def main():
+    args = parser.parse_args()
+    names = args.only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    if args.no_kernel:
+        painter.painter_kernel = None
+    print(f"Painter kernel: {'compiled' if painter.painter_kernel else 'NumPy fallback'}")
+
+    if args.check_startup:
+        loaded = check_startup()
+        if loaded:
+            print(f"{len(loaded)} module(s) should only be imported when first needed: {', '.join(loaded)}")
+            return 1
+        print("No heavy module is imported at startup.")
+        return 0
+
+    if args.check_allocations:
+        failures = []
+        with headless_curses():
+            for width in args.widths:
+                failures += check_allocations(args.video, width, args.frames, args.allocation_limit)
+        if failures:
+            print(f"{len(failures)} path(s) allocated more than {args.allocation_limit:g} B/cell per frame: "
+                  f"{', '.join(failures)}")
+            return 1
+        print(f"All paths stayed under {args.allocation_limit:g} B/cell per frame.")
+        return 0
+
+    results = {}
+    with headless_curses():
+        for width in args.widths:
+            frames = load_frames(args.video, width, args.frames)
+            curses_color = None
+            if {"paint_color_screen", "get_color"} & set(names):
+                curses_color = color.CursesColor(np.vstack([frame.reshape(-1, 3) for frame, _ in frames]))
+            height = frames[0][1].shape[0]
+            for name in names:
+                result = BENCHMARKS[name](frames, curses_color, SAMPLE_EMBEDDING)
+                result.update({"width": width, "height": height})
+                key = f"{name}@{width}"
+                results[key] = result
+                print(f"{key:<28} p50 {result['p50_ms']:9.3f} ms  p90 {result['p90_ms']:9.3f} ms  "
+                      f"p99 {result['p99_ms']:9.3f} ms  {result['fps']:10.1f} fps  "
+                      f"{result['draw_calls_per_frame']:8.0f} calls/frame")
+
+    report = {
+        "meta": {
+            "video": os.path.basename(args.video),
+            "frames": args.frames,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "painter_kernel": painter.painter_kernel is not None,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"\nComparison against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import time
+import cv2
+import numpy as np
+
+# Sensor output the RGB path captures, and the crop used by rpicam_cplayer
+SENSOR_SIZE = (1920, 1080)
+CAMERA_CONTROLS = {
+    # Enable Auto Exposure (ensures proper brightness)
+    "AeEnable": True,
+    # Enable Auto White Balance (ensures proper colors)
+    "AwbEnable": True,
+    # High-quality noise reduction (matches ISP processing)
+    "NoiseReductionMode": 3,
+    "Sharpness": 1.0,         # Match rpicam-still sharpness
+    "Contrast": 1.0,          # Prevent washed-out image
+    "Saturation": 1.2,        # Slight color boost (adjust if needed)
+    "ScalerCrop": (348, 434, 1920, 1080),  # Ensure full frame is used
+    "ColourGains": (1.5, 1.5)  # Try matching CFE color correction
+}
+
+
+def render_height(sensor_size, width):
+    """Character rows of a frame 'width' characters wide, corrected for the 3/5 cell aspect."""
+    return max(int(sensor_size[1] * (width / sensor_size[0]) * (3.0 / 5)), 1)
+
+
+class CameraSource:
+    """
+    A camera delivering grayscale frames at the render size.
+
+    In luma mode the camera is asked for a second, small YUV420 stream close
+    to the render size and the Y plane of that stream is used as the gray
+    frame: no color conversion, and at most a resize of an already small
+    image. In RGB mode full-size RGB frames are captured, resized and
+    converted as before; it is also the fallback when the camera rejects the
+    luma configuration.
+
+    Subclasses implement _configure() and _capture() for a concrete camera.
+
+    Attributes:
+        width (int): Render width in characters.
+        height (int): Render height in characters.
+        luma (bool): True if frames come from the Y plane.
+        lores_size (tuple): (width, height) of the YUV stream in luma mode.
+    """
+
+    def __init__(self, width, sensor_size=SENSOR_SIZE, luma=True):
+        """
+        Args:
+            width (int): Render width in characters.
+            sensor_size (tuple): (width, height) of the full-size stream.
+            luma (bool): Try the luma fast path first.
+        """
+        self.width = width
+        self.height = render_height(sensor_size, width)
+        self.sensor_size = sensor_size
+        self.luma = False
+        self.lores_size = None
+        if luma:
+            try:
+                self.lores_size = self._configure((self.width, self.height))
+                self.luma = True
+            except Exception as e:
+                print(f"Luma capture unavailable ({e}), falling back to RGB capture.")
+        if not self.luma:
+            self._configure(None)
+        self._gray = np.empty((self.height, self.width), dtype=np.uint8)
+
+    def _configure(self, lores_size):
+        """
+        Configures and starts the camera.
+
+        Args:
+            lores_size (tuple or None): Requested (width, height) of the YUV420
+                stream, or None for RGB capture only.
+
+        Returns:
+            tuple or None: The YUV stream size the camera actually uses.
+        """
+        raise NotImplementedError
+
+    def _capture(self, stream):
+        """Returns the newest frame of the "main" (RGB) or "lores" (YUV420) stream."""
+        raise NotImplementedError
+
+    def read_gray(self):
+        """
+        Returns:
+            numpy.ndarray: A (height, width) uint8 frame. In luma mode it may
+            be a view of the camera buffer, valid until the next call.
+        """
+        if not self.luma:
+            frame = cv2.resize(self._capture("main"), (self.width, self.height))
+            return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+
+        yuv = self._capture("lores")
+        lores_width, lores_height = self.lores_size
+        # YUV420 arrays hold the Y plane in the first rows; rows may be padded
+        # past the image width to the buffer stride.
+        luma = yuv[:lores_height, :lores_width]
+        if self.lores_size == (self.width, self.height):
+            return luma
+        return cv2.resize(luma, (self.width, self.height), dst=self._gray, interpolation=cv2.INTER_AREA)
+
+    def stop(self):
+        pass
+
+
+class Picamera2Source(CameraSource):
+    """A Raspberry Pi camera driven by Picamera2."""
+
+    def __init__(self, width, sensor_size=SENSOR_SIZE, luma=True):
+        # Imported here so the module also loads where Picamera2 is missing
+        from picamera2 import Picamera2
+        self.picam2 = Picamera2()
+        super().__init__(width, sensor_size, luma)
+
+    def _configure(self, lores_size):
+        if self.picam2.started:
+            # Retrying in RGB mode after the luma configuration failed
+            self.picam2.stop()
+        if lores_size is None:
+            config = self.picam2.create_video_configuration(
+                main={"format": "RGB888", "size": self.sensor_size})
+        else:
+            # The main stream is only produced by the ISP, never copied out
+            config = self.picam2.create_video_configuration(
+                main={"format": "YUV420", "size": self.sensor_size},
+                lores={"format": "YUV420", "size": lores_size})
+            # Rounds the lores size to what the ISP supports
+            self.picam2.align_configuration(config)
+        self.picam2.configure(config)
+        self.picam2.start()
+        self.picam2.set_controls(CAMERA_CONTROLS)
+        time.sleep(2)
+        if lores_size is not None:
+            return tuple(config["lores"]["size"])
+        return None
+
+    def _capture(self, stream):
+        return self.picam2.capture_array(stream)
+
+    def stop(self):
+        self.picam2.stop()
+
+
+class StubCamera(CameraSource):
+    """
+    A synthetic camera for running the capture pipeline without a Pi. It
+    produces a moving gradient as YUV420 buffers laid out like Picamera2's
+    (padded rows, Y plane first) or as RGB frames.
+    """
+
+    def __init__(self, width, sensor_size=SENSOR_SIZE, luma=True, lores_align=64):
+        """
+        Args:
+            lores_align (int): Row stride alignment of the YUV buffers.
+        """
+        self.lores_align = lores_align
+        self.frame_index = 0
+        super().__init__(width, sensor_size, luma)
+
+    def _configure(self, lores_size):
+        if lores_size is None:
+            return None
+        # Even dimensions, as YUV420 requires
+        width, height = (lores_size[0] + 1) & ~1, (lores_size[1] + 1) & ~1
+        stride = -(-width // self.lores_align) * self.lores_align
+        self._yuv = np.full((height * 3 // 2, stride), 128, dtype=np.uint8)
+        self._ramp = np.add.outer(np.arange(height), np.arange(width)).astype(np.uint16)
+        return width, height
+
+    def _capture(self, stream):
+        self.frame_index += 1
+        if stream == "lores":
+            height, width = self._ramp.shape
+            self._yuv[:height, :width] = (self._ramp + self.frame_index) & 0xFF
+            return self._yuv
+        sensor_width, sensor_height = self.sensor_size
+        ramp = (np.add.outer(np.arange(sensor_height) // 4, np.arange(sensor_width) // 4) + self.frame_index) & 0xFF
+        return np.repeat(ramp.astype(np.uint8)[:, :, None], 3, axis=2)
@@ -1,94 +1,277 @@
 import curses
+import cv2
 import numpy as np
 from functools import lru_cache
-from scipy.spatial import KDTree
-from sklearn.cluster import KMeans
+
+# scipy and sklearn take longer to import than everything else the players
+# load, so they are imported where a palette is actually built: mono
+# playback never pays for them.
+
+# --- Define a set of guaranteed base colors for vibrancy (in BGR format) ---
+BASE_COLORS_BGR = np.array([
+    [0, 0, 0],       # Black
+    [255, 255, 255], # White
+    [0, 0, 255],     # Red
+    [0, 255, 0],     # Green
+    [255, 0, 0],     # Blue
+    [0, 255, 255],   # Yellow
+    [255, 0, 255],   # Magenta
+    [255, 255, 0],   # Cyan
+    [128, 128, 128], # Gray
+    [0, 0, 128],     # Maroon
+    [0, 128, 0],     # Dark Green
+    [128, 0, 0],     # Navy
+], dtype=np.uint8)
+
+
+def sample_video_pixels(cap, width, height, num_frames=30, pixels_per_frame=1000):
+    """
+    Samples pixels from frames spread across a video for palette generation,
+    then rewinds the capture to the beginning.
+
+    Args:
+        cap (cv2.VideoCapture): An opened video file.
+        width (int): Width the frames will be rendered at.
+        height (int): Height the frames will be rendered at.
+        num_frames (int): Number of frames to sample.
+        pixels_per_frame (int): Maximum pixels taken from each frame.
+
+    Returns:
+        numpy.ndarray or None: An (N, 3) array of BGR pixels, or None if no
+        frame could be read.
+    """
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    all_sample_pixels = []
+    for i in range(num_frames):
+        frame_idx = int(i * (total_frames / num_frames))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, sample_frame = cap.read()
+        if not ret:
+            continue
+
+        resized_frame = cv2.resize(sample_frame, (width, height))
+        pixels = resized_frame.reshape(-1, 3)
+        sample_size = min(len(pixels), pixels_per_frame)
+        all_sample_pixels.append(pixels[np.random.choice(len(pixels), sample_size, replace=False)])
+
+    # Reset video to the beginning
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    if not all_sample_pixels:
+        return None
+    return np.vstack(all_sample_pixels)
+
+
+def build_palette(sample_pixels_or_frame, num_colors=240):
+    """
+    Generates an optimized color palette by combining dominant colors from the video
+    (found via K-Means) with a set of guaranteed base colors for vibrancy.
+
+    Args:
+        sample_pixels_or_frame (numpy.ndarray): An (N, 3) array of BGR pixels
+            or a (height, width, 3) BGR frame.
+        num_colors (int): The maximum number of palette entries.
+
+    Returns:
+        numpy.ndarray: A (num_entries, 3) uint8 array of unique BGR colors.
+    """
+    from sklearn.cluster import KMeans
+
+    if sample_pixels_or_frame.ndim == 3:
+         pixels = sample_pixels_or_frame.reshape(-1, 3)
+    else:
+         pixels = sample_pixels_or_frame
+
+    unique_pixels = np.unique(pixels, axis=0)
+
+    # Calculate how many colors we can dedicate to K-Means after reserving space for base colors
+    num_kmeans_colors = num_colors - len(BASE_COLORS_BGR)
+    n_clusters = min(num_kmeans_colors, len(unique_pixels))
+
+    if n_clusters > 0:
+        # Fit KMeans to find the dominant colors
+        kmeans = KMeans(n_clusters=n_clusters, random_state=0, n_init='auto').fit(unique_pixels)
+        kmeans_palette = kmeans.cluster_centers_.astype(np.uint8)
+        # Combine dominant colors with base colors
+        final_palette_bgr = np.vstack([kmeans_palette, BASE_COLORS_BGR])
+    else:
+        # If not enough room for K-Means, just use the base colors
+        final_palette_bgr = BASE_COLORS_BGR
+
+    # Ensure no duplicate colors in the final palette
+    return np.unique(final_palette_bgr, axis=0)
+
+
+def build_color_cube(palette_bgr, lut_bits=6):
+    """
+    Precomputes the index of the nearest palette color for every cell of a BGR
+    cube quantized to lut_bits per channel, so whole frames can be mapped with a
+    single array lookup instead of one nearest-neighbour query per pixel.
+
+    Args:
+        palette_bgr (numpy.ndarray): A (num_entries, 3) array of BGR colors.
+        lut_bits (int): Bits kept per channel; the cube has 2**(3*lut_bits) cells.
+
+    Returns:
+        numpy.ndarray: A flat array of palette indices, one per cube cell.
+    """
+    from scipy.spatial import KDTree
+
+    shift = 8 - lut_bits
+    levels = 1 << lut_bits
+    # Query with the center of each quantization cell
+    centers = (np.arange(levels) << shift) + ((1 << shift) >> 1)
+    b, g, r = np.meshgrid(centers, centers, centers, indexing="ij")
+    cells_bgr = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1)
+    _, indices = KDTree(palette_bgr).query(cells_bgr, workers=-1)
+    return indices.astype(np.min_scalar_type(max(len(palette_bgr) - 1, 0)))
+
+
+def cube_index(frame, lut_bits=6, out=None, scratch=None):
+    """
+    Computes the color cube cell of every pixel of a BGR frame.
+
+    Args:
+        frame (numpy.ndarray): A (height, width, 3) uint8 BGR array.
+        lut_bits (int): Bits per channel the cube was built with.
+        out (numpy.ndarray, optional): A (height, width) intp array to write
+            the indices to. Together with 'scratch', an array of the same
+            shape and type, the indices are computed without allocating.
+
+    Returns:
+        numpy.ndarray: A (height, width) array of cube cell indices.
+    """
+    if out is not None and scratch is not None:
+        shift = 8 - lut_bits
+        np.right_shift(frame[..., 0], shift, out=out)
+        np.left_shift(out, 2 * lut_bits, out=out)
+        np.right_shift(frame[..., 1], shift, out=scratch)
+        np.left_shift(scratch, lut_bits, out=scratch)
+        np.bitwise_or(out, scratch, out=out)
+        np.right_shift(frame[..., 2], shift, out=scratch)
+        np.bitwise_or(out, scratch, out=out)
+        return out
+    quantized = frame >> (8 - lut_bits)
+    index = quantized[..., 0].astype(np.intp) << (2 * lut_bits)
+    index |= quantized[..., 1].astype(np.intp) << lut_bits
+    index |= quantized[..., 2]
+    return index
+
+
+def available_colors(start_color_idx=16):
+    """
+    Returns how many custom colors CursesColor will use on this terminal.
+    """
+    # Use a safe number of colors, leaving room for standard ones. Max is often 256.
+    return min(curses.COLORS - start_color_idx, 240)
+
 
 class CursesColor:
-    def __init__(self, sample_pixels_or_frame, start_color_idx=16):
+    def __init__(self, sample_pixels_or_frame=None, start_color_idx=16, lut_bits=6, palette=None,
+                 index_cube=None, verbose=True):
         """
-        Generates an optimized color palette by combining dominant colors from the video
-        (found via K-Means) with a set of guaranteed base colors for vibrancy.
-        It then uses a KD-Tree for rapid nearest-color lookups.
+        Registers a color palette with curses, building it from sample pixels
+        with build_palette() unless a precomputed 'palette' (BGR) is given.
+        It then uses a KD-Tree for rapid nearest-color lookups, and precomputes a
+        quantized BGR lookup cube (lut_bits per channel) for whole-frame mapping,
+        unless a cube of palette indices from an earlier run is passed as
+        'index_cube'. Pass verbose=False when the screen is already in use.
         """
         if not curses.has_colors() or not curses.can_change_color():
             raise RuntimeError("Terminal does not support custom colors.")
 
         self.start_color_idx = start_color_idx
-        # Use a safe number of colors, leaving room for standard ones. Max is often 256.
-        self.num_custom_colors = min(curses.COLORS - self.start_color_idx, 240)
+        self.num_custom_colors = available_colors(self.start_color_idx)
         if self.num_custom_colors < 16: # Need at least 16 for base colors + some custom
             raise RuntimeError(f"Not enough available color slots in the terminal. Found only {curses.COLORS}.")
 
-        # --- Define a set of guaranteed base colors for vibrancy (in BGR format) ---
-        base_colors_bgr = np.array([
-            [0, 0, 0],       # Black
-            [255, 255, 255], # White
-            [0, 0, 255],     # Red
-            [0, 255, 0],     # Green
-            [255, 0, 0],     # Blue
-            [0, 255, 255],   # Yellow
-            [255, 0, 255],   # Magenta
-            [255, 255, 0],   # Cyan
-            [128, 128, 128], # Gray
-            [0, 0, 128],     # Maroon
-            [0, 128, 0],     # Dark Green
-            [128, 0, 0],     # Navy
-        ], dtype=np.uint8)
-
-        # --- Palette Generation using K-Means ---
-        if sample_pixels_or_frame.ndim == 3:
-             pixels = sample_pixels_or_frame.reshape(-1, 3)
-        else:
-             pixels = sample_pixels_or_frame
-
-        unique_pixels = np.unique(pixels, axis=0)
-        
-        # Calculate how many colors we can dedicate to K-Means after reserving space for base colors
-        num_kmeans_colors = self.num_custom_colors - len(base_colors_bgr)
-        n_clusters = min(num_kmeans_colors, len(unique_pixels))
-
-        if n_clusters > 0:
-            # Fit KMeans to find the dominant colors
-            kmeans = KMeans(n_clusters=n_clusters, random_state=0, n_init='auto').fit(unique_pixels)
-            kmeans_palette = kmeans.cluster_centers_.astype(int)
-            # Combine dominant colors with base colors
-            final_palette_bgr = np.vstack([kmeans_palette, base_colors_bgr])
-        else:
-            # If not enough room for K-Means, just use the base colors
-            final_palette_bgr = base_colors_bgr
-
-        # Ensure no duplicate colors in the final palette
-        final_palette_bgr = np.unique(final_palette_bgr, axis=0)
+        if palette is None:
+            palette = build_palette(sample_pixels_or_frame, self.num_custom_colors)
+
+        self.lut_bits = lut_bits
+        # Index buffers reused by get_colors(out=...) while the geometry stays
+        self._index = None
+        self._scratch = None
+        self.set_palette(palette, index_cube)
+        if verbose:
+            print(f"Hybrid color palette created with {len(self.palette)} colors.")
+
+    def set_palette(self, palette, index_cube=None):
+        """
+        Registers a BGR palette with curses, replacing the current one. The
+        lookup structures are rebuilt first and swapped in together, and the
+        get_color cache is invalidated, so this is safe to call between frames.
+
+        Args:
+            palette (numpy.ndarray): An (N, 3) array of BGR colors.
+            index_cube (numpy.ndarray, optional): Precomputed palette indices
+                per color cube cell, as stored in 'index_cube'.
+        """
+        from scipy.spatial import KDTree
 
         # --- Initialize Curses Colors and Build KD-Tree ---
-        self.palette = []
+        new_palette = []
         palette_for_kdtree = []
 
         current_color_idx = self.start_color_idx
-        current_pair_id = self.start_color_idx 
+        current_pair_id = self.start_color_idx
 
-        for b, g, r in final_palette_bgr:
+        for b, g, r in palette.astype(int):
             if current_color_idx >= curses.COLORS or current_pair_id >= curses.COLOR_PAIRS:
                 break # Stop if we exceed terminal limits
 
             curses_r = (r * 1000) // 255
             curses_g = (g * 1000) // 255
             curses_b = (b * 1000) // 255
-            
+
             curses.init_color(current_color_idx, curses_r, curses_g, curses_b)
-            curses.init_pair(current_pair_id, current_color_idx, -1) 
-            
-            self.palette.append({
+            curses.init_pair(current_pair_id, current_color_idx, -1)
+
+            new_palette.append({
                 "pair_id": current_pair_id
             })
             palette_for_kdtree.append((r, g, b)) # Use RGB for KD-Tree
-            
+
             current_color_idx += 1
             current_pair_id += 1
 
+        palette_bgr = np.array(palette_for_kdtree, dtype=np.uint8)[:, ::-1]
+        pair_ids = np.array([entry["pair_id"] for entry in new_palette], dtype=np.uint16)
+        # A saved cube is only valid if every palette entry got registered
+        if (index_cube is None or len(new_palette) != len(palette)
+                or index_cube.size != 1 << (3 * self.lut_bits)):
+            index_cube = build_color_cube(palette_bgr, self.lut_bits)
+
+        self.palette = new_palette
+        self.palette_bgr = palette_bgr
         self.kdtree = KDTree(palette_for_kdtree)
-        print(f"Hybrid color palette created with {len(self.palette)} colors.")
+        self.pair_ids = pair_ids
+        self.index_cube = index_cube
+        self.color_cube = pair_ids[index_cube]
+        CursesColor.get_color.cache_clear()
+
+    def get_colors(self, frame, out=None):
+        """
+        Maps an entire BGR frame to curses pair IDs in one vectorized lookup.
+
+        Args:
+            frame (numpy.ndarray): A (height, width, 3) uint8 BGR array.
+            out (numpy.ndarray, optional): A (height, width) array of the
+                color cube's type to write the pair IDs to. The intermediate
+                indices then go to buffers kept for the frame size, so
+                nothing is allocated per frame.
+
+        Returns:
+            numpy.ndarray: A (height, width) uint16 array of pair IDs.
+        """
+        if out is None:
+            return self.color_cube[cube_index(frame, self.lut_bits)]
+        if self._index is None or self._index.shape != frame.shape[:2]:
+            self._index = np.empty(frame.shape[:2], dtype=np.intp)
+            self._scratch = np.empty(frame.shape[:2], dtype=np.intp)
+        index = cube_index(frame, self.lut_bits, self._index, self._scratch)
+        # mode="clip" writes straight to 'out'; the default buffers the result
+        return np.take(self.color_cube, index, out=out, mode="clip")
 
     @lru_cache(maxsize=16384) # Increased cache size for more diverse videos
     def get_color(self, bgr: tuple) -> int:
@@ -100,7 +283,7 @@ class CursesColor:
         target_rgb = (r, g, b) # KD-Tree was built with RGB
 
         distance, index = self.kdtree.query(target_rgb)
-        
+
         # Ensure the index is within the bounds of the created palette
         if index < len(self.palette):
             return self.palette[index]["pair_id"]
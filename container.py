@@ -0,0 +1,184 @@
+import mmap
+import struct
+import zlib
+import numpy as np
+
+# --- File layout ---
+# header | charset | audio reference | palette (BGR) | frame blobs... | index
+# Each frame blob holds the character plane followed, in color files, by the
+# palette-index plane, optionally zlib-compressed together. The index stores
+# the (offset, length) of every blob so any frame can be located in O(1).
+MAGIC = b"ASCV"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHdIHHHQ")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4")])
+
+FLAG_COLOR = 1
+FLAG_ZLIB = 2
+
+
+def is_container(path):
+    """
+    Returns True if 'path' is a pre-rendered ASCII video file.
+
+    Args:
+        path: A file path, or anything else (e.g. a webcam index).
+    """
+    if not isinstance(path, str):
+        return False
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class ContainerWriter:
+    """
+    Writes pre-rendered frames to a container file. Use as a context manager,
+    or call close() to write the index and finalize the header.
+    """
+
+    def __init__(self, path, width, height, fps, charset, palette=None, audio_path="", compress=True):
+        """
+        Args:
+            path (str): Output file path.
+            width (int): Frame width in characters.
+            height (int): Frame height in characters.
+            fps (float): Playback frame rate.
+            charset (str): The characters frames were rendered with, darkest first.
+            palette (numpy.ndarray, optional): An (N, 3) BGR palette for color
+                files, at most 256 entries. Monochrome if None.
+            audio_path (str): Where to load the audio track from at playback.
+            compress (bool): zlib-compress each frame.
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.charset = charset.encode("ascii")
+        self.palette = None if palette is None else np.ascontiguousarray(palette, dtype=np.uint8)
+        self.audio_path = audio_path.encode("utf-8")
+        self.compress = compress
+        self.flags = (FLAG_COLOR if palette is not None else 0) | (FLAG_ZLIB if compress else 0)
+        self._index = []
+        self._file = open(path, "wb")
+        self._file.write(self._header(0, 0))
+        self._file.write(self.charset)
+        self._file.write(self.audio_path)
+        if self.palette is not None:
+            self._file.write(self.palette.tobytes())
+
+    def _header(self, frame_count, index_offset):
+        palette_size = 0 if self.palette is None else len(self.palette)
+        return HEADER.pack(MAGIC, VERSION, self.flags, self.width, self.height, self.fps,
+                           frame_count, palette_size, len(self.charset), len(self.audio_path),
+                           index_offset)
+
+    def write_frame(self, chars, palette_indices=None):
+        """
+        Appends one frame.
+
+        Args:
+            chars (numpy.ndarray): A (height, width) uint8 array of character codes.
+            palette_indices (numpy.ndarray, optional): A (height, width) array
+                of palette indices; required for color files.
+        """
+        blob = np.ascontiguousarray(chars, dtype=np.uint8).tobytes()
+        if self.flags & FLAG_COLOR:
+            blob += np.ascontiguousarray(palette_indices, dtype=np.uint8).tobytes()
+        if self.compress:
+            blob = zlib.compress(blob, 6)
+        self._index.append((self._file.tell(), len(blob)))
+        self._file.write(blob)
+
+    def close(self):
+        """Writes the frame index and the final header."""
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+        self._file.seek(0)
+        self._file.write(self._header(len(self._index), index_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ContainerReader:
+    """
+    Reads a container through a memory map. Uncompressed frames are returned
+    as zero-copy views into the map.
+
+    Attributes:
+        width (int): Frame width in characters.
+        height (int): Frame height in characters.
+        fps (float): Playback frame rate.
+        frame_count (int): Number of frames.
+        charset (str): The characters frames were rendered with.
+        palette (numpy.ndarray or None): The (N, 3) BGR palette of color files.
+        audio_path (str): Where to load the audio track from.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.flags, self.width, self.height, self.fps, self.frame_count,
+         palette_size, charset_len, audio_len, index_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an ASCII video container.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported container version {version} in {path}.")
+
+        offset = HEADER.size
+        self.charset = self._map[offset:offset + charset_len].decode("ascii")
+        offset += charset_len
+        self.audio_path = self._map[offset:offset + audio_len].decode("utf-8")
+        offset += audio_len
+        self.palette = None
+        if self.flags & FLAG_COLOR:
+            self.palette = np.frombuffer(self._map, dtype=np.uint8, count=palette_size * 3,
+                                         offset=offset).reshape(-1, 3)
+        self._index = np.frombuffer(self._map, dtype=INDEX_DTYPE, count=self.frame_count,
+                                    offset=index_offset)
+        self._plane_size = self.width * self.height
+
+    @property
+    def is_color(self):
+        return bool(self.flags & FLAG_COLOR)
+
+    def read_frame(self, frame_index):
+        """
+        Returns one frame, located through the index without reading any other.
+
+        Args:
+            frame_index (int): Index of the frame, 0 <= frame_index < frame_count.
+
+        Returns:
+            tuple: (chars, palette_indices), two (height, width) uint8 arrays;
+            palette_indices is None for monochrome files.
+        """
+        offset, length = self._index[frame_index].tolist()
+        if self.flags & FLAG_ZLIB:
+            data = np.frombuffer(zlib.decompress(self._map[offset:offset + length]), dtype=np.uint8)
+        else:
+            data = np.frombuffer(self._map, dtype=np.uint8, count=length, offset=offset)
+        shape = (self.height, self.width)
+        chars = data[:self._plane_size].reshape(shape)
+        palette_indices = None
+        if self.flags & FLAG_COLOR:
+            palette_indices = data[self._plane_size:2 * self._plane_size].reshape(shape)
+        return chars, palette_indices
+
+    def close(self):
+        # Views returned by read_frame keep the map alive until released
+        self._index = None
+        self.palette = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._file.close()
@@ -0,0 +1,206 @@
+import curses
+import os
+import select
+import sys
+import time
+
+# Seconds moved by the left/right and down/up arrow keys
+SHORT_SEEK = 5
+LONG_SEEK = 60
+# How often a paused player checks for keys
+POLL_INTERVAL = 0.03
+
+SEEK_KEYS = {"left": -SHORT_SEEK, "right": SHORT_SEEK, "down": -LONG_SEEK, "up": LONG_SEEK}
+CURSES_KEYS = {curses.KEY_LEFT: "left", curses.KEY_RIGHT: "right", curses.KEY_UP: "up", curses.KEY_DOWN: "down"}
+# Cursor keys as terminals send them in normal and application mode
+ESCAPE_KEYS = {b"\x1b[D": "left", b"\x1b[C": "right", b"\x1b[A": "up", b"\x1b[B": "down",
+               b"\x1bOD": "left", b"\x1bOC": "right", b"\x1bOA": "up", b"\x1bOB": "down"}
+
+
+def parse_keys(data):
+    """
+    Splits bytes read from a terminal into key names, turning cursor key
+    escape sequences into "left", "right", "up" and "down".
+    """
+    keys = []
+    i = 0
+    while i < len(data):
+        if data[i:i + 3] in ESCAPE_KEYS:
+            keys.append(ESCAPE_KEYS[data[i:i + 3]])
+            i += 3
+        else:
+            keys.append(chr(data[i]))
+            i += 1
+    return keys
+
+
+class CursesKeys:
+    """Reads key presses from a curses window without blocking."""
+
+    def __init__(self, window):
+        curses.noecho()
+        curses.cbreak()
+        self.set_window(window)
+
+    def set_window(self, window):
+        """Reads from a new window, e.g. after the frame size changed."""
+        window.nodelay(True)
+        window.keypad(True)
+        self.window = window
+
+    def read(self):
+        """
+        Returns:
+            list: Names of the keys pressed since the last call.
+        """
+        keys = []
+        # Terminals that ignore keypad mode send cursor keys as plain escape
+        # sequences, which curses passes through byte by byte
+        pending = bytearray()
+        while True:
+            key = self.window.getch()
+            if key == -1:
+                return keys + parse_keys(bytes(pending))
+            if key in CURSES_KEYS:
+                keys += parse_keys(bytes(pending)) + [CURSES_KEYS[key]]
+                pending.clear()
+            elif 0 <= key < 256:
+                pending.append(key)
+
+    def close(self):
+        pass
+
+
+class TerminalKeys:
+    """
+    Reads key presses from the terminal without blocking, for the ANSI
+    backend. The terminal is switched to cbreak mode (no line buffering, no
+    echo) until close(); if stdin is not a terminal no keys are read.
+    """
+
+    def __init__(self, fd=None):
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self._saved = None
+        if os.isatty(self.fd):
+            # Imported here so the module also loads where termios is missing
+            import termios
+            import tty
+            self._saved = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+
+    def read(self):
+        """
+        Returns:
+            list: Names of the keys pressed since the last call.
+        """
+        if self._saved is None:
+            return []
+        data = b""
+        while select.select([self.fd], [], [], 0)[0]:
+            chunk = os.read(self.fd, 64)
+            if not chunk:
+                break
+            data += chunk
+        return parse_keys(data)
+
+    def close(self):
+        """Restores the terminal mode."""
+        if self._saved is not None:
+            import termios
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved)
+            self._saved = None
+
+
+class PlaybackControls:
+    """
+    Turns key presses into playback commands, and measures how long seeks
+    take to show their first frame.
+
+    Space or p pauses and resumes, left/right seek 5 seconds, down/up 60
+    seconds, 0-9 jump to 0%-90% of the video and q quits. Seeking is only
+    offered when the duration is known.
+
+    Attributes:
+        paused (bool): True while playback is paused.
+        quit (bool): True once q was pressed.
+        seek_latencies (list): Seconds from each seek key press until the
+            first frame at the new position was on screen.
+    """
+
+    def __init__(self, keys, duration=0.0):
+        """
+        Args:
+            keys: A CursesKeys or TerminalKeys reader.
+            duration (float): Length of the video in seconds; 0 disables
+                seeking (webcams, streams of unknown length).
+        """
+        self.keys = keys
+        self.duration = duration
+        self.paused = False
+        self.quit = False
+        self.seek_latencies = []
+        self._paused_at = None
+        self._seek_start = None
+        self._seek_target = None
+
+    def poll(self, position):
+        """
+        Handles the keys pressed since the last call.
+
+        Args:
+            position (float): Playback position in seconds, which relative
+                seeks start from.
+
+        Returns:
+            list: (command, value) tuples: ("pause", None), ("resume",
+            seconds spent paused) and at most one ("seek", seconds).
+        """
+        commands = []
+        target = None
+        for key in self.keys.read():
+            if key == "q":
+                self.quit = True
+            elif key in (" ", "p"):
+                if self.paused:
+                    commands.append(("resume", time.perf_counter() - self._paused_at))
+                    self._paused_at = None
+                else:
+                    commands.append(("pause", None))
+                    self._paused_at = time.perf_counter()
+                self.paused = not self.paused
+            elif key in SEEK_KEYS and self.duration:
+                # Repeated presses add up, also while a seek is still under way
+                if target is None:
+                    target = self._seek_target if self._seek_start is not None else position
+                target += SEEK_KEYS[key]
+            elif key.isdigit() and self.duration:
+                target = self.duration * int(key) / 10
+        if target is not None:
+            self._seek_target = min(max(target, 0.0), self.duration)
+            self._seek_start = time.perf_counter()
+            commands.append(("seek", self._seek_target))
+        return commands
+
+    def frame_shown(self):
+        """Call after each frame is on screen; completes a pending seek."""
+        if self._seek_start is not None:
+            self.seek_latencies.append(time.perf_counter() - self._seek_start)
+            self._seek_start = None
+
+    def hud_text(self):
+        """Returns the latency of the last seek for the HUD line, or ''."""
+        if not self.seek_latencies:
+            return ""
+        return f"seek {self.seek_latencies[-1] * 1000:.0f} ms "
+
+    def report(self):
+        """Returns a one-line summary of the seeks, or None if there were none."""
+        if not self.seek_latencies:
+            return None
+        latencies = sorted(self.seek_latencies)
+        mean = sum(latencies) / len(latencies)
+        return (f"{len(latencies)} seeks, first frame after {mean * 1000:.0f} ms on average "
+                f"(median {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms)")
+
+    def close(self):
+        self.keys.close()
@@ -1,20 +1,32 @@
+import time
+# Module loading is part of startup; the exit summary reports it
+import_start = time.perf_counter()
 import os
 import cv2
 import curses
 import argparse
-import time
 import numpy as np
 import color
 import youtube_utils
-import subprocess
-import pygame
+import youtube_cache
+import ansi
+import container
+from palette_cache import PaletteCache
+from palette_worker import PaletteWorker, PaletteBuilder
+from pipeline import FramePrefetcher, DecodeProcess
+from sync import AVSync, SmoothedClock
+from audio import AudioStream
+from frame_source import FFmpegFrameSource
+from stats import StageTimer, NullTimer
+from overlay import Overlay
+from quality import QualityController, build_ladder, describe
+from seek_index import KeyframeIndex, seek_lead
+from controls import PlaybackControls, CursesKeys, TerminalKeys, POLL_INTERVAL
 
-# Use pyximport to compile and import the Cython module on the fly
-import pyximport
-pyximport.install()
-
-# Import the fast, compiled functions from your .pyx file
-from painter import paint_screen, paint_color_screen, paint_embedding, invert_chars
+# painter uses the compiled kernel when it has been built (setup.py build_ext)
+from painter import paint_screen, paint_color_screen, invert_chars, IncrementalPainter
+from painter import paint_chars, paint_color_chars
+import_seconds = time.perf_counter() - import_start
 
 # --- Argument Parsing (Corrected) ---
 parser = argparse.ArgumentParser(description='ASCII Player')
@@ -24,7 +36,25 @@ parser.add_argument("--show", action='store_true', help="show the original video
 parser.add_argument("--inv", action='store_true', help="invert the shades")
 parser.add_argument("--color", action='store_true', help="print colors if available (slows things down)")
 parser.add_argument("--embed", type=str, default="", help="pass a txt file to embed as watermark")
-parser.add_argument("video", type=str, help="path to video or webcam index")
+parser.add_argument("--title", type=str, default="", help="show a title box at the top of the screen")
+parser.add_argument("--incremental", action='store_true', help="only redraw the parts of the frame that changed")
+parser.add_argument("--threshold", type=int, default=0, help="pixel change ignored as noise by --incremental")
+parser.add_argument("--ansi", action='store_true', help="write frames as raw ANSI escapes instead of using curses")
+parser.add_argument("--ansi-bits", type=int, default=8, help="bits per color channel in --ansi color mode")
+parser.add_argument("--prefetch", type=int, default=4, help="number of frames to decode ahead of the renderer")
+parser.add_argument("--decode-process", action='store_true', help="decode in a separate process that hands frames over through shared memory")
+parser.add_argument("--ffmpeg", action='store_true', help="decode with FFmpeg straight to the render size (faster for HD/4K sources)")
+parser.add_argument("--no-palette-cache", action='store_true', help="always rebuild the color palette instead of using the on-disk cache")
+parser.add_argument("--no-youtube-cache", action='store_true', help="stream YouTube videos instead of downloading them to the on-disk cache")
+parser.add_argument("--refresh-palette", action='store_true', help="discard the cached palette for this video and rebuild it")
+parser.add_argument("--adaptive-palette", action='store_true', help="rebuild the color palette in the background after scene cuts")
+parser.add_argument("--adaptive", action='store_true', help="lower the width or drop color when frames take too long, and raise them again when there is headroom")
+parser.add_argument("--min-width", type=int, default=40, help="narrowest width --adaptive may fall back to")
+parser.add_argument("--exact-seek", action='store_true', help="seek to the exact frame instead of snapping to a nearby keyframe")
+parser.add_argument("--stats", action='store_true', help="show per-stage timings and dropped frames in a HUD line")
+parser.add_argument("--trace", type=str, default="", help="write per-frame stage timings to this file")
+parser.add_argument("--trace-format", type=str, default="jsonl", choices=["jsonl", "chrome"], help="format of the --trace file")
+parser.add_argument("video", type=str, help="path to video, pre-rendered container or webcam index")
 args = parser.parse_args()
 
 if args.inv:
@@ -36,150 +66,369 @@ try:
 except ValueError:
     pass
 
-# --- Temporary file for extracted audio ---
-TEMP_AUDIO_FILE = "temp_audio_for_ascii_player.mp3"
-audio_extracted = False
+launch_time = time.perf_counter()
+audio = None
+time_to_first_frame = None
 fps = 0 # Initialize fps to avoid NameError in finally block
+incremental_painter = None
+palette_worker = None
+palette_builder = None
+palette_ready_time = None
+color_unsupported = False
+ansi_screen = None
+prefetcher = None
+av_sync = None
+reader = None
+cap = None
+quality = None
+keyframe_index = None
+controls = None
+# Timing calls are no-ops unless --stats or --trace is given
+timer = StageTimer(args.trace or None, args.trace_format) if args.stats or args.trace else NullTimer()
 
 try:
     # --- Video Path and Audio Extraction ---
     if isinstance(video_path_arg, str):
-        if youtube_utils.is_youtube_url(video_path_arg):
+        if container.is_container(video_path_arg):
+            # Frames are pre-rendered; the source video is only needed for audio
+            reader = container.ContainerReader(video_path_arg)
+            video = reader.audio_path
+            if youtube_utils.is_youtube_url(video):
+                video = youtube_cache.resolve(video, reader.width, not args.no_youtube_cache)
+        elif youtube_utils.is_youtube_url(video_path_arg):
             print("Downloading YouTube video...")
-            video = youtube_utils.get_youtube_video_url(video_path_arg)
+            video = youtube_cache.resolve(video_path_arg, args.width, not args.no_youtube_cache)
         elif os.path.isfile(video_path_arg):
             video = video_path_arg
         else:
             print(f"Error: Failed to find video at: {args.video}")
             exit()
-        
-        # --- Extract audio using FFmpeg ---
-        print("Extracting audio... (this may take a moment)")
-        command = [
-            'ffmpeg', '-i', video, '-q:a', '0', '-map', 'a', TEMP_AUDIO_FILE, '-y', '-hide_banner', '-loglevel', 'error'
-        ]
-        result = subprocess.run(command)
-        if result.returncode == 0 and os.path.exists(TEMP_AUDIO_FILE):
-            audio_extracted = True
-        else:
-            print("Warning: Could not extract audio. FFmpeg might not be installed, or the video may have no audio.")
+
+        # --- Audio is decoded by FFmpeg and streamed while playing ---
+        audio = AudioStream(video)
     else:
         video = video_path_arg # For webcam
 
     # --- Video Capture and Initial Frame Processing ---
-    cap = cv2.VideoCapture(video)
-    ok, frame = cap.read()
-    if not ok:
-        print("Could not extract frame from video.")
-        exit()
-    
-    source_fps = cap.get(cv2.CAP_PROP_FPS)
-    if source_fps == 0: # Webcam might report 0, use user-defined fps
-        source_fps = args.fps
-    
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    width = args.width
-    ratio = width / frame.shape[1]
-    height = int(frame.shape[0] * ratio * (3.0 / 5))
-
-    # --- Curses and Pygame Setup ---
-    curses.initscr()
+    if reader:
+        width, height = reader.width, reader.height
+        source_fps = reader.fps
+        total_frames = reader.frame_count
+    else:
+        width = args.width
+        if args.ffmpeg and isinstance(video, str):
+            # FFmpeg scales (and converts to gray in monochrome mode) while
+            # decoding; the ring must outlast the frames queued ahead
+            cap = FFmpegFrameSource(video, width, pix_fmt="bgr24" if args.color else "gray",
+                                    buffers=args.prefetch + 4)
+        else:
+            cap = cv2.VideoCapture(video)
+        ok, frame = cap.read()
+        if not ok:
+            print("Could not extract frame from video.")
+            exit()
+
+        source_fps = cap.get(cv2.CAP_PROP_FPS)
+        if source_fps == 0: # Webcam might report 0, use user-defined fps
+            source_fps = args.fps
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        if isinstance(cap, FFmpegFrameSource):
+            height = cap.height
+        else:
+            ratio = width / frame.shape[1]
+            height = int(frame.shape[0] * ratio * (3.0 / 5))
+
+    # --- Output Backend Setup ---
     curses_color = None
-    if args.color and curses.has_colors():
+    if args.ansi:
+        # Truecolor escapes need no palette
+        ansi_screen = ansi.AnsiScreen(color_bits=args.ansi_bits)
+    else:
+        curses.initscr()
+    if args.color and not args.ansi and curses.has_colors():
         curses.start_color()
         curses.use_default_colors()
         
-        # --- Advanced Palette Generation ---
-        print("Analyzing video for optimal color palette... (this is a one-time process)")
-        
-        # Sample pixels from multiple frames across the video for a better palette
-        num_palette_frames = 30
-        all_sample_pixels = []
-        
-        # Ensure we don't try to sample more frames than exist
-        if total_frames > 1 and isinstance(video, str):
-            for i in range(num_palette_frames):
-                frame_idx = int(i * (total_frames / num_palette_frames))
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, sample_frame = cap.read()
-                if not ret:
-                    continue
-                
-                resized_frame = cv2.resize(sample_frame, (width, height))
-                pixels = resized_frame.reshape(-1, 3)
-                sample_size = min(len(pixels), 1000) # Sample up to 1000 pixels per frame
-                all_sample_pixels.append(pixels[np.random.choice(len(pixels), sample_size, replace=False)])
-            
-            # Reset video to the beginning
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            
-            sample_pixels = np.vstack(all_sample_pixels)
-            curses_color = color.CursesColor(sample_pixels)
-        else: # Fallback for webcams or single-frame videos
-            curses_color = color.CursesColor(cv2.resize(frame, (width, height)))
-            
-    window = curses.newwin(height, width, 0, 0)
-
-    # --- Initialize Pygame mixer and play audio if extracted ---
-    if audio_extracted:
-        pygame.mixer.init()
-        pygame.mixer.music.load(TEMP_AUDIO_FILE)
-        pygame.mixer.music.play()
-
-    # --- Embedding Setup ---
-    embedding = ""
-    embedding_height = 0
+        if reader:
+            if reader.is_color:
+                # Register the stored palette; entries the terminal could not
+                # allocate fall back to their nearest registered color.
+                curses_color = color.CursesColor(palette=reader.palette)
+                pair_lookup = curses_color.get_colors(reader.palette[np.newaxis])[0]
+        else:
+            # --- Palette Cache (local files only) ---
+            palette_cache = None
+            cached_palette = None
+            if not args.no_palette_cache and isinstance(video, str) and os.path.isfile(video):
+                palette_cache = PaletteCache()
+                cache_key = palette_cache.key(video, width, height, color.available_colors())
+                if args.refresh_palette:
+                    palette_cache.invalidate(cache_key)
+                cached_palette = palette_cache.load(cache_key)
+
+            if cached_palette:
+                curses_color = color.CursesColor(palette=cached_palette["palette"],
+                                                 index_cube=cached_palette["index_cube"])
+            elif not curses.can_change_color():
+                # The palette could never be registered; play in grayscale
+                # from the start instead of failing once it is built
+                color_unsupported = True
+            else:
+                # --- Palette Generation (sampled and clustered in the background) ---
+                # Playback starts in grayscale and switches to color once the
+                # palette is ready
+                palette_builder = PaletteBuilder(video, width, height, color.available_colors(), frame)
+                palette_builder.start()
+
+    if ansi_screen:
+        ansi_screen.start()
+    else:
+        window = curses.newwin(height, width, 0, 0)
+
+    # --- Start streaming audio ---
+    if audio and not audio.start():
+        print("Warning: Could not start audio. FFmpeg might not be installed.")
+        audio = None
+
+    # --- Overlay Setup (watermark, title and stats line, merged into each frame) ---
+    overlay = Overlay(width, height)
     if args.embed:
         if os.path.isfile(args.embed):
             with open(args.embed, "r", encoding='utf-8') as f:
-                embedding = f.read()
-            embedding_height = len(embedding.split("\n"))
+                overlay.add_text(f.read(), "bottom-right")
         else:
             print(f"Warning: Embedding file not found at {args.embed}")
+    if args.title:
+        overlay.add_box(args.title, "top-center")
+    if not overlay.active and not args.stats:
+        overlay = None
+
+    # --- Scene-Adaptive Palette ---
+    if args.adaptive_palette and curses_color and not reader:
+        palette_worker = PaletteWorker(curses_color.num_custom_colors)
+        palette_worker.start()
+
+    # --- Incremental Redraw Setup ---
+    if args.incremental:
+        incremental_painter = IncrementalPainter(args.threshold)
+        paint_screen = incremental_painter.paint_screen
+        paint_color_screen = incremental_painter.paint_color_screen
+
+    # --- Keyframe Index (built in the background, cached per file) ---
+    if not reader and isinstance(video, str) and os.path.isfile(video):
+        keyframe_index = KeyframeIndex(video)
+        keyframe_index.start()
+
+    # --- Frame Prefetching (decode, resize and grayscale on a worker thread or process) ---
+    if not reader:
+        if args.decode_process:
+            # The decoder process opens the source itself
+            cap.release()
+            prefetcher = DecodeProcess(video, width, height, args.prefetch, args.color, args.ffmpeg)
+        else:
+            prefetcher = FramePrefetcher(cap, width, height, args.prefetch, keyframe_index)
+        prefetcher.start()
+
+    if audio:
+        av_sync = AVSync(source_fps, SmoothedClock(audio.get_pos))
+
+    # --- Adaptive Quality (frame size and color mode follow the render budget) ---
+    color_mode = args.color and (ansi_screen is not None or curses_color is not None or palette_builder is not None)
+    if args.adaptive:
+        # Pre-rendered frames have a fixed size; only color can be dropped
+        min_width = width if reader else args.min_width
+        quality = QualityController(build_ladder(width, height, color_mode, min_width),
+                                    source_fps if av_sync else args.fps)
+
+    # --- Playback Controls (pause and seek keys, read without blocking) ---
+    controls = PlaybackControls(TerminalKeys() if ansi_screen else CursesKeys(window),
+                                total_frames / source_fps if total_frames > 0 and source_fps else 0.0)
 
     # --- Main Rendering Loop ---
     start_time = time.time()
     frame_count = 0
-    
+    next_frame_index = 0
+    shown_index = 0
+    # A seek while paused still shows the frame it lands on
+    show_one = False
+
     while True:
-        # --- Audio-Video Synchronization Logic ---
-        if audio_extracted and pygame.mixer.get_init() and pygame.mixer.music.get_busy():
-            audio_time = pygame.mixer.music.get_pos() / 1000.0
-            target_frame_num = int(audio_time * source_fps)
-            current_frame_num = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        for command, value in controls.poll(shown_index / source_fps):
+            if command == "pause":
+                if audio:
+                    audio.pause()
+            elif command == "resume":
+                if audio:
+                    audio.resume()
+                    av_sync.clock.reset()
+                # Paused time does not count towards pacing or the frame rate
+                start_time += value
+            elif command == "seek":
+                target_frame = min(int(value * source_fps), max(total_frames - 1, 0))
+                if keyframe_index and not args.exact_seek:
+                    # Half a short seek away from the target is close enough
+                    target_frame = keyframe_index.snap(target_frame, shown_index, int(source_fps * 2.5),
+                                                       seek_lead(cap))
+                if reader:
+                    next_frame_index = target_frame
+                else:
+                    prefetcher.seek(target_frame)
+                if audio:
+                    audio.seek(target_frame / source_fps)
+                    av_sync.clock.reset()
+                show_one = controls.paused
+        if controls.quit:
+            break
+        if controls.paused and not show_one:
+            time.sleep(POLL_INTERVAL)
+            continue
 
-            if current_frame_num < target_frame_num:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame_num)
+        timer.begin_frame()
+        frame_start = time.perf_counter()
+        if reader:
+            frame_index = next_frame_index
+            if frame_index >= reader.frame_count:
+                break
+            next_frame_index += 1
+        else:
+            item = prefetcher.get()
+            if item is None:
+                break
+            frame_index, orig_frame, frame_resized, grayscale_frame, stage_times = item
+            timer.lap("wait")
+            # Decoding happened on the prefetch thread, overlapping earlier frames
+            timer.add("decode", stage_times[0])
+            timer.add("resize", stage_times[1])
+            timer.add("convert", stage_times[2])
+            if grayscale_frame.shape != (height, width):
+                # Decoded ahead before the last quality change
+                frame_resized = cv2.resize(frame_resized, (width, height))
+                grayscale_frame = frame_resized
+                if frame_resized.ndim == 3:
+                    grayscale_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
+
+        # --- Audio-Video Synchronization Logic ---
+        sleep_start = time.perf_counter()
+        if show_one:
+            pass
+        elif audio and audio.get_busy():
+            delay = av_sync.schedule(frame_index)
+            if delay is None:
+                # Too late to show: let the decoder skip ahead without
+                # decoding images, and only seek for very large gaps.
+                target_frame_num = av_sync.target_frame()
+                if reader:
+                    # Any frame is a single index lookup away
+                    next_frame_index = target_frame_num
+                else:
+                    prefetcher.skip_to(target_frame_num, av_sync.should_seek(frame_index, target_frame_num))
+                timer.drop()
+                continue
+            if delay > 0:
+                time.sleep(delay)
         else:
             target_time = frame_count / args.fps
             elapsed_time = time.time() - start_time
             wait_time = target_time - elapsed_time
             if wait_time > 0:
                 time.sleep(wait_time)
+        slept = time.perf_counter() - sleep_start
+        timer.lap("sleep")
 
-        ok, orig_frame = cap.read()
-        if not ok:
-            break
-
-        frame_resized = cv2.resize(orig_frame, (width, height))
-        grayscale_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
-        
-        if args.show:
+        if args.show and not reader:
             cv2.imshow("frame", orig_frame)
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
 
-        if args.color and curses_color:
-            paint_color_screen(window, grayscale_frame, frame_resized, width, height, curses_color)
+        if palette_builder and curses_color is None:
+            # Switch from grayscale to color between frames, once the
+            # background palette is ready
+            new_palette = palette_builder.poll()
+            if new_palette:
+                curses_color = color.CursesColor(palette=new_palette[0], index_cube=new_palette[1], verbose=False)
+                if palette_cache:
+                    palette_cache.store(cache_key, curses_color.palette_bgr, curses_color.index_cube)
+                if args.adaptive_palette:
+                    palette_worker = PaletteWorker(curses_color.num_custom_colors)
+                    palette_worker.start()
+                if incremental_painter:
+                    # Unchanged cells still have to be redrawn in color
+                    incremental_painter.reset()
+                palette_ready_time = time.perf_counter() - launch_time
+
+        if args.stats:
+            overlay.set_status(timer.hud_text() + controls.hud_text())
+
+        if reader:
+            chars, palette_indices = reader.read_frame(frame_index)
+            use_color = color_mode and palette_indices is not None
+            if ansi_screen:
+                colors = reader.palette[palette_indices] if use_color else None
+                if overlay is not None:
+                    chars, colors = overlay.apply(chars, colors)
+                ansi_screen.write_frame(ansi_screen.render_chars(chars, colors))
+            else:
+                pair_ids = pair_lookup[palette_indices] if curses_color and use_color else None
+                if incremental_painter:
+                    incremental_painter.paint(window, chars, chars, pair_ids, overlay)
+                else:
+                    if overlay is not None:
+                        chars, pair_ids = overlay.apply(chars, pair_ids)
+                    if pair_ids is not None:
+                        paint_color_chars(window, chars, pair_ids)
+                    else:
+                        paint_chars(window, chars)
+        elif ansi_screen:
+            if color_mode:
+                ansi_screen.paint_color_screen(grayscale_frame, frame_resized, overlay)
+            else:
+                ansi_screen.paint_screen(grayscale_frame, overlay)
+        elif color_mode and curses_color:
+            if palette_worker:
+                # Swap in a rebuilt palette between frames, never waiting for one
+                new_palette = palette_worker.poll()
+                if new_palette:
+                    curses_color.set_palette(*new_palette)
+                    if incremental_painter:
+                        # Cells keep their pixels but their pair ids now mean other colors
+                        incremental_painter.reset()
+                palette_worker.submit(frame_resized)
+            paint_color_screen(window, grayscale_frame, frame_resized, width, height, curses_color, overlay)
         else:
-            paint_screen(window, grayscale_frame, width, height)
+            paint_screen(window, grayscale_frame, width, height, overlay)
+        timer.lap("paint")
 
-        if embedding:
-            paint_embedding(window, embedding.encode('utf-8'), embedding_height, width, height)
-        
-        window.refresh()
+        if not ansi_screen:
+            window.refresh()
+        timer.lap("refresh")
+        timer.end_frame()
+        controls.frame_shown()
+        shown_index = frame_index
+        show_one = False
+        if frame_count == 0:
+            time_to_first_frame = time.perf_counter() - launch_time
         frame_count += 1
+
+        if quality:
+            new_level = quality.update(time.perf_counter() - frame_start - slept)
+            if new_level:
+                width, height, color_mode = new_level
+                # Everything sized to the frame follows the new geometry
+                if prefetcher:
+                    prefetcher.set_size(width, height)
+                if overlay is not None:
+                    overlay.resize(width, height)
+                if incremental_painter:
+                    incremental_painter.reset()
+                if ansi_screen:
+                    ansi_screen.clear()
+                else:
+                    window.erase()
+                    window.refresh()
+                    window = curses.newwin(height, width, 0, 0)
+                    controls.keys.set_window(window)
         
         elapsed_for_fps = time.time() - start_time
         if elapsed_for_fps > 0:
@@ -187,12 +436,76 @@ try:
 
 finally:
     # --- Cleanup ---
+    if prefetcher:
+        prefetcher.stop()
+    if controls:
+        controls.close()
+    timer.close()
+    if palette_worker:
+        palette_worker.stop()
     cv2.destroyAllWindows()
-    curses.endwin()
+    if reader:
+        reader.close()
+    if cap is not None:
+        cap.release()
+    if ansi_screen:
+        ansi_screen.stop()
+    else:
+        curses.endwin()
 
-    if 'pygame' in locals() and pygame.mixer.get_init():
-        pygame.mixer.quit()
-    if audio_extracted and os.path.exists(TEMP_AUDIO_FILE):
-        os.remove(TEMP_AUDIO_FILE)
+    if audio:
+        audio.stop()
 
     print(f"Finished. Average playback was around {int(fps)} FPS.")
+    if time_to_first_frame is not None:
+        print(f"Time to first frame: {time_to_first_frame * 1000:.0f} ms "
+              f"(after {import_seconds * 1000:.0f} ms of imports)", end="")
+        if audio and audio.first_chunk_latency is not None:
+            print(f", audio started after {audio.first_chunk_latency * 1000:.0f} ms", end="")
+        print(".")
+    if color_unsupported:
+        print("Warning: Terminal does not support custom colors; played in grayscale.")
+    if palette_builder:
+        if palette_ready_time is not None:
+            print(f"Color palette ready after {palette_ready_time * 1000:.0f} ms "
+                  f"({palette_builder.build_seconds * 1000:.0f} ms to build); frames before it were grayscale.")
+        elif palette_builder.error:
+            print(f"Warning: Could not build the color palette: {palette_builder.error}")
+        else:
+            print("Playback ended before the color palette was ready.")
+    if timer.frames:
+        print(f"Stage timings:{timer.hud_text()}")
+        if args.trace:
+            print(f"Per-frame trace written to {args.trace}.")
+    if av_sync:
+        print(f"A/V sync: mean drift {av_sync.mean_drift() * 1000:.0f} ms, max {av_sync.max_drift * 1000:.0f} ms, "
+              f"{av_sync.dropped_frames} frames dropped, "
+              f"{prefetcher.frames_skipped if prefetcher else 0} skipped undecoded, "
+              f"{av_sync.late_frames} late, {av_sync.seeks} seeks.")
+    if controls and controls.report():
+        print(f"Seeking: {controls.report()}", end="")
+        if audio and audio.seek_latencies:
+            print(f", audio followed after {sum(audio.seek_latencies) / len(audio.seek_latencies) * 1000:.0f} ms",
+                  end="")
+        print(f"; {keyframe_index.report()}." if keyframe_index else ".")
+    if prefetcher:
+        print(f"Prefetch: {prefetcher.average_occupancy():.1f}/{prefetcher.depth} frames ready on average, "
+              f"decoder stalled {prefetcher.producer_stall:.2f}s, renderer stalled {prefetcher.consumer_stall:.2f}s.")
+        if args.decode_process:
+            print(f"Decode process: {prefetcher.report()}.")
+        elif prefetcher.error:
+            print(f"Warning: Decoding stopped early: {prefetcher.error}")
+    if palette_worker:
+        print(f"Adaptive palette: {palette_worker.cuts_detected} scene cuts, "
+              f"{palette_worker.palettes_built} palettes rebuilt "
+              f"(last took {palette_worker.last_build_seconds:.2f}s).")
+    if quality:
+        print(f"Adaptive quality: {len(quality.changes)} changes, finished at {describe(quality.level)}.")
+        for line in quality.report():
+            print(line)
+    if incremental_painter:
+        print(f"Incremental redraw: {incremental_painter.total_redrawn} cells redrawn, "
+              f"{incremental_painter.total_skipped} skipped.")
+    if ansi_screen and ansi_screen.frames_written:
+        print(f"ANSI output: {int(ansi_screen.average_bytes())} bytes per frame on average "
+              f"({ansi_screen.total_bytes / 1024:.0f} KiB total).")
@@ -0,0 +1,204 @@
+import os
+import sys
+import cv2
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import color
+import painter
+import ansi
+import youtube_utils
+import youtube_cache
+
+# --- Argument Parsing ---
+parser = argparse.ArgumentParser(description='Export a whole video as ASCII text or ANSI frames using all cores')
+parser.add_argument("--width", type=int, default=120, help="width of the rendered frames in characters")
+parser.add_argument("--inv", action='store_true', help="invert the shades")
+parser.add_argument("--format", type=str, default="text", choices=["text", "ansi"], help="plain text or ANSI escape output")
+parser.add_argument("--color", action='store_true', help="color --format ansi output with a palette shared by all workers")
+parser.add_argument("--colors", type=int, default=240, help="maximum number of palette colors in --color mode")
+parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+parser.add_argument("--chunk", type=int, default=0, help="frames per work unit (default: split evenly, 4 units per worker)")
+parser.add_argument("--per-frame", action='store_true', help="write one file per frame into the output directory")
+parser.add_argument("video", type=str, help="path or YouTube URL of the video to export")
+parser.add_argument("output", type=str, help="file to write, or a directory with --per-frame")
+
+# Text frames are separated by a form feed on its own line
+FRAME_SEPARATOR = b"\f\n"
+
+# --- Worker state, set once per process by init_worker ---
+_job = None
+
+
+def init_worker(job):
+    """
+    Prepares a worker process: applies the character set and keeps the job
+    description (video, geometry, format and the shared color cube).
+    """
+    global _job
+    _job = job
+    painter.set_characters(job["charset"])
+    # Each worker decodes on its own core; OpenCV's internal threads would
+    # only compete with the other workers.
+    cv2.setNumThreads(1)
+
+
+def render_frame(frame_resized, screen):
+    """
+    Renders one resized BGR frame to bytes in the job's format.
+
+    Args:
+        frame_resized (numpy.ndarray): A (height, width, 3) BGR frame.
+        screen (ansi.AnsiScreen or None): Renderer for ANSI output.
+
+    Returns:
+        bytes: The rendered frame.
+    """
+    grayscale_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
+    chars = painter.frame_to_chars(grayscale_frame)
+    if screen is None:
+        return "\n".join(painter.chars_to_rows(chars)).encode("ascii") + b"\n"
+    colors = None
+    if _job["palette"] is not None:
+        # Quantize to the shared palette so every worker agrees on colors
+        colors = _job["palette"][_job["index_cube"][color.cube_index(frame_resized)]]
+    return screen.render_chars(chars, colors) + ansi.ROW_SEPARATOR
+
+
+def export_range(frame_range):
+    """
+    Decodes and renders a contiguous range of frames with a capture of its
+    own, seeked to the start of the range.
+
+    Args:
+        frame_range (tuple): (first_frame, frame_count).
+
+    Returns:
+        tuple: (first_frame, frames) where frames is a list of rendered
+        frames, or the number of frames written in per-frame mode.
+    """
+    first_frame, frame_count = frame_range
+    cap = cv2.VideoCapture(_job["video"])
+    if first_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    screen = None
+    if _job["format"] == "ansi":
+        # Frames are only rendered to bytes, never written to the terminal
+        screen = ansi.AnsiScreen(fd=-1, synchronized=False)
+
+    frames = []
+    written = 0
+    for frame_index in range(first_frame, first_frame + frame_count):
+        ok, orig_frame = cap.read()
+        if not ok:
+            break
+        rendered = render_frame(cv2.resize(orig_frame, (_job["width"], _job["height"])), screen)
+        if _job["per_frame_dir"]:
+            extension = "ans" if screen else "txt"
+            path = os.path.join(_job["per_frame_dir"], f"frame_{frame_index:06d}.{extension}")
+            with open(path, "wb") as f:
+                f.write(rendered)
+            written += 1
+        else:
+            frames.append(rendered)
+    cap.release()
+    return first_frame, written if _job["per_frame_dir"] else frames
+
+
+def split_frames(total_frames, chunk):
+    """
+    Splits [0, total_frames) into (first_frame, frame_count) ranges.
+    """
+    return [(start, min(chunk, total_frames - start)) for start in range(0, total_frames, chunk)]
+
+
+def main():
+    args = parser.parse_args()
+    if args.color and args.format != "ansi":
+        parser.error("--color needs --format ansi")
+
+    if args.inv:
+        painter.invert_chars()
+
+    if youtube_utils.is_youtube_url(args.video):
+        print("Resolving YouTube video...")
+        video = youtube_cache.resolve(args.video, args.width)
+    elif os.path.isfile(args.video):
+        video = args.video
+    else:
+        print(f"Error: Failed to find video at: {args.video}")
+        return 1
+
+    cap = cv2.VideoCapture(video)
+    ok, frame = cap.read()
+    if not ok:
+        print("Could not extract frame from video.")
+        return 1
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total_frames <= 0:
+        print("Could not determine the frame count; export needs a seekable video file.")
+        return 1
+
+    width = args.width
+    ratio = width / frame.shape[1]
+    height = int(frame.shape[0] * ratio * (3.0 / 5))
+
+    # --- Shared Palette (computed once, before any worker starts) ---
+    palette = None
+    index_cube = None
+    if args.color:
+        print("Analyzing video for optimal color palette...")
+        sample_pixels = color.sample_video_pixels(cap, width, height)
+        if sample_pixels is None:
+            sample_pixels = cv2.resize(frame, (width, height))
+        palette = color.build_palette(sample_pixels, min(args.colors, 256))
+        index_cube = color.build_color_cube(palette)
+    cap.release()
+
+    per_frame_dir = ""
+    if args.per_frame:
+        per_frame_dir = args.output
+        os.makedirs(per_frame_dir, exist_ok=True)
+
+    workers = max(args.workers, 1)
+    chunk = args.chunk or max(-(-total_frames // (workers * 4)), 1)
+    ranges = split_frames(total_frames, chunk)
+    job = {
+        "video": video,
+        "width": width,
+        "height": height,
+        "charset": "".join(painter.characters),
+        "format": args.format,
+        "palette": palette,
+        "index_cube": index_cube,
+        "per_frame_dir": per_frame_dir,
+    }
+
+    print(f"Exporting {total_frames} frames ({width}x{height}) in {len(ranges)} ranges on {workers} workers...")
+    start_time = time.time()
+    frame_count = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(job,)) as executor:
+        # map() yields results in submission order, so ranges are written in
+        # order even though workers finish them out of order.
+        results = executor.map(export_range, ranges)
+        if per_frame_dir:
+            for _, written in results:
+                frame_count += written
+        else:
+            separator = FRAME_SEPARATOR if args.format == "text" else b""
+            with open(args.output, "wb") as f:
+                for _, frames in results:
+                    for rendered in frames:
+                        if frame_count and separator:
+                            f.write(separator)
+                        f.write(rendered)
+                        frame_count += 1
+
+    elapsed = time.time() - start_time
+    print(f"Exported {frame_count} frames to {args.output} in {elapsed:.1f}s "
+          f"({frame_count / elapsed if elapsed > 0 else 0:.0f} frames/s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
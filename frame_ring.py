@@ -0,0 +1,317 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# --- Header fields (int64), shared by the writer and the reader ---
+LATEST = 0            # Sequence number of the newest complete frame, 0 before the first
+CONSUMED = 1          # Sequence number of the last frame the reader took
+OVERWRITTEN = 2       # Complete frames the writer replaced before the reader took them
+STOP = 3              # Set by the reader to ask the writer to exit
+WANTED = 4            # Highest frame index the reader asks for (see DecodeProcess)
+SEEK_GENERATION = 5   # Bumped by the reader for every seek request
+SEEK_TARGET = 6       # Frame index of the latest seek request
+FRAME_WIDTH = 7       # Frame size the reader asks for, at most the slot capacity
+FRAME_HEIGHT = 8
+SEEKS = 9             # Seeks performed by the writer
+PRODUCER_STALL_US = 10  # Microseconds the writer waited for the reader
+END_GENERATION = 11   # Seek generation in which the source ran out of frames, -1 if none
+HEADER_FIELDS = 16
+
+# --- Per-slot fields (int64) ---
+SLOT_SEQ = 0          # 2 * seq once complete, odd while the slot is being written
+SLOT_INDEX = 1        # Frame index in the source
+SLOT_GENERATION = 2   # Seek generation the frame belongs to
+SLOT_WIDTH = 3
+SLOT_HEIGHT = 4
+SLOT_TAKEN = 5        # Sequence number of the last frame the reader took from the slot
+SLOT_FIELDS = 8
+
+# --- Per-slot times (float64) ---
+TIME_PUBLISHED = 0    # time.monotonic() when the frame became complete
+TIME_DECODE = 1       # Seconds spent decoding, resizing and converting it
+TIME_RESIZE = 2
+TIME_CONVERT = 3
+TIME_FIELDS = 4
+
+# Keeps each section of the block on its own cache lines
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class RingFrame:
+    """
+    A frame read from a FrameRing. 'bgr' and 'gray' are views into shared
+    memory: nothing is copied, and the writer may reuse the slot once the
+    ring has moved on, which FrameRing.release() reports.
+
+    Attributes:
+        seq (int): Position in the ring's write order, from 1.
+        slot (int): Slot holding the frame.
+        index (int): Frame index in the source.
+        generation (int): Seek generation the frame was decoded for.
+        bgr (numpy.ndarray or None): (height, width, 3) resized frame, or None
+            for a ring without color.
+        gray (numpy.ndarray): (height, width) grayscale frame.
+        published (float): time.monotonic() when the writer completed it.
+        stage_times (tuple): Seconds spent on (decode, resize, convert).
+    """
+
+    __slots__ = ("seq", "slot", "index", "generation", "bgr", "gray", "published", "stage_times")
+
+    def __init__(self, seq, slot, index, generation, bgr, gray, published, stage_times):
+        self.seq = seq
+        self.slot = slot
+        self.index = index
+        self.generation = generation
+        self.bgr = bgr
+        self.gray = gray
+        self.published = published
+        self.stage_times = stage_times
+
+
+class FrameRing:
+    """
+    A ring of fixed-size frame slots in shared memory, written by a decoder
+    process and read by the renderer without pickling or copying.
+
+    Every slot holds one resized BGR frame (in color rings) and its grayscale
+    version, at any size up to the ring's capacity, stored contiguously so
+    both processes can hand the slot straight to OpenCV and NumPy. Slots are
+    guarded by a sequence lock: the writer makes the slot's sequence word odd
+    while it writes and stores twice the frame's sequence number once the
+    frame is complete, then publishes it as the newest frame. A reader only
+    takes slots whose word is even and matches, and release() checks the
+    word again, so a frame the writer overwrote while it was in use is
+    detected rather than shown silently.
+
+    The ring never blocks the writer: when the reader falls behind, it skips
+    to the newest complete frame, and the frames it never took are counted
+    as overwritten. Writers that must not run ahead of the reader (files
+    played in order) hold back on their own, up to the WANTED header field.
+
+    Both sides construct a FrameRing: the owner with create=True, the other
+    process with the owner's 'name' and the same geometry.
+
+    Attributes:
+        name (str): Name of the shared memory block.
+        width (int): Slot capacity in characters.
+        height (int): Slot capacity in rows.
+        slots (int): Number of slots.
+        color (bool): Whether slots hold BGR frames as well as grayscale.
+        header (numpy.ndarray): The shared int64 header fields.
+        frames_read (int): Frames the reader took.
+        frames_skipped (int): Complete frames the reader passed over because
+            a newer one was ready.
+        torn_reads (int): Frames overwritten while the reader still used them.
+        latencies (list): Seconds from each frame's completion until the
+            reader took it: the hand-over between the processes, plus the
+            time the frame waited when the writer works ahead.
+    """
+
+    def __init__(self, width, height, slots=4, color=True, name=None, create=False):
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.color = color
+        self.frames_read = 0
+        self.frames_skipped = 0
+        self.torn_reads = 0
+        self.latencies = []
+        self._overwritten = 0
+        self._last_seq = 0
+        self._next_seq = 1
+
+        cells = width * height
+        header_size = _aligned(HEADER_FIELDS * 8)
+        meta_size = _aligned(slots * SLOT_FIELDS * 8)
+        times_size = _aligned(slots * TIME_FIELDS * 8)
+        gray_size = _aligned(cells)
+        bgr_size = _aligned(cells * 3) if color else 0
+        size = header_size + meta_size + times_size + slots * (gray_size + bgr_size)
+        self._memory = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self._memory.name
+        self._owner = create
+
+        buffer = self._memory.buf
+        offset = 0
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += header_size
+        self._meta = np.ndarray((slots, SLOT_FIELDS), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += meta_size
+        self._times = np.ndarray((slots, TIME_FIELDS), dtype=np.float64, buffer=buffer, offset=offset)
+        offset += times_size
+        # One flat buffer per slot, viewed at the size of the frame it holds
+        self._gray = np.ndarray((slots, gray_size), dtype=np.uint8, buffer=buffer, offset=offset)
+        offset += slots * gray_size
+        self._bgr = None
+        if color:
+            self._bgr = np.ndarray((slots, bgr_size), dtype=np.uint8, buffer=buffer, offset=offset)
+        if create:
+            self.header[:] = 0
+            self._meta[:] = 0
+            self.header[FRAME_WIDTH] = width
+            self.header[FRAME_HEIGHT] = height
+            self.header[END_GENERATION] = -1
+
+    def spec(self):
+        """Returns the arguments another process passes to FrameRing() to attach."""
+        return {"width": self.width, "height": self.height, "slots": self.slots,
+                "color": self.color, "name": self.name}
+
+    # --- Writer side ---
+
+    def acquire(self, width, height):
+        """
+        Marks the next slot as being written and returns views to decode into.
+
+        Args:
+            width (int): Frame width, at most the ring's width.
+            height (int): Frame height, at most the ring's height.
+
+        Returns:
+            tuple: (bgr, gray) contiguous views of the slot, bgr being None in
+            a ring without color. They are valid until publish().
+        """
+        seq = self._next_seq
+        slot = (seq - 1) % self.slots
+        previous = seq - self.slots
+        if previous > 0 and self._meta[slot, SLOT_TAKEN] != previous:
+            # The slot still holds a frame the reader never took
+            self.header[OVERWRITTEN] += 1
+        self._meta[slot, SLOT_SEQ] = 2 * seq + 1
+        self._meta[slot, SLOT_WIDTH] = width
+        self._meta[slot, SLOT_HEIGHT] = height
+        gray = self._gray[slot, :width * height].reshape(height, width)
+        bgr = None
+        if self._bgr is not None:
+            bgr = self._bgr[slot, :width * height * 3].reshape(height, width, 3)
+        return bgr, gray
+
+    def publish(self, index, generation=0, stage_times=(0.0, 0.0, 0.0)):
+        """Completes the slot returned by acquire() and makes it the newest frame."""
+        seq = self._next_seq
+        slot = (seq - 1) % self.slots
+        self._meta[slot, SLOT_INDEX] = index
+        self._meta[slot, SLOT_GENERATION] = generation
+        self._times[slot, TIME_DECODE:] = stage_times
+        self._times[slot, TIME_PUBLISHED] = time.monotonic()
+        self._meta[slot, SLOT_SEQ] = 2 * seq
+        self.header[LATEST] = seq
+        self._next_seq += 1
+
+    # --- Reader side ---
+
+    def _frame(self, seq):
+        slot = (seq - 1) % self.slots
+        meta = self._meta[slot].tolist()
+        if meta[SLOT_SEQ] != 2 * seq:
+            # Being rewritten, or already holding a later frame
+            return None
+        width, height = meta[SLOT_WIDTH], meta[SLOT_HEIGHT]
+        gray = self._gray[slot, :width * height].reshape(height, width)
+        bgr = None
+        if self._bgr is not None:
+            bgr = self._bgr[slot, :width * height * 3].reshape(height, width, 3)
+        times = self._times[slot].tolist()
+        frame = RingFrame(seq, slot, meta[SLOT_INDEX], meta[SLOT_GENERATION], bgr, gray,
+                          times[TIME_PUBLISHED], tuple(times[TIME_DECODE:]))
+        # The writer may have started over the slot while the fields were read
+        return frame if self._meta[slot, SLOT_SEQ] == 2 * seq else None
+
+    def newest(self):
+        """
+        Returns the newest complete frame if it is newer than the last one
+        taken, otherwise None. Older frames that were never taken are
+        counted as skipped.
+        """
+        while True:
+            seq = int(self.header[LATEST])
+            if seq <= self._last_seq:
+                return None
+            frame = self._frame(seq)
+            if frame is not None:
+                return self._take(frame)
+
+    def find(self, first_index, generation):
+        """
+        Returns the complete frame with the lowest index at or after
+        'first_index' in the given seek generation, or None if the writer has
+        not produced one yet. Used when frames must be shown in order.
+        """
+        latest = int(self.header[LATEST])
+        best = None
+        for seq in range(max(latest - self.slots + 1, 1), latest + 1):
+            frame = self._frame(seq)
+            if (frame is not None and frame.generation == generation and frame.index >= first_index
+                    and (best is None or frame.index < best.index)):
+                best = frame
+        return self._take(best) if best is not None else None
+
+    def ready_frames(self, first_index, generation):
+        """Counts complete frames at or after 'first_index' waiting in the ring."""
+        latest = int(self.header[LATEST])
+        count = 0
+        for seq in range(max(latest - self.slots + 1, 1), latest + 1):
+            frame = self._frame(seq)
+            if frame is not None and frame.generation == generation and frame.index >= first_index:
+                count += 1
+        return count
+
+    def _take(self, frame):
+        if frame.seq > self._last_seq + 1 and self._last_seq:
+            self.frames_skipped += frame.seq - self._last_seq - 1
+        self._last_seq = max(self._last_seq, frame.seq)
+        self._meta[frame.slot, SLOT_TAKEN] = frame.seq
+        self.header[CONSUMED] = self._last_seq
+        self.frames_read += 1
+        self.latencies.append(time.monotonic() - frame.published)
+        return frame
+
+    def release(self, frame):
+        """
+        Call once the reader is done with a frame's views.
+
+        Returns:
+            bool: False if the writer reused the slot while the frame was in
+            use, so what was read may mix two frames.
+        """
+        if self._meta[frame.slot, SLOT_SEQ] == 2 * frame.seq:
+            return True
+        self.torn_reads += 1
+        return False
+
+    def frames_overwritten(self):
+        """Complete frames the writer replaced before the reader took them."""
+        if self.header is not None:
+            self._overwritten = int(self.header[OVERWRITTEN])
+        return self._overwritten
+
+    def report(self):
+        """Returns a one-line summary of the traffic through the ring."""
+        latencies = sorted(self.latencies)
+        text = (f"{self.frames_read} frames through {self.slots} shared slots, "
+                f"{self.frames_overwritten()} overwritten unread, {self.torn_reads} torn")
+        if latencies:
+            mean = sum(latencies) / len(latencies)
+            text += (f", taken {mean * 1000:.1f} ms after publishing on average "
+                     f"(median {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms)")
+        return text
+
+    def close(self):
+        """Unmaps the ring; the owner also frees the shared memory."""
+        if self.header is None:
+            return
+        self.frames_overwritten()
+        # Views into the buffer must go before it can be closed
+        self.header = self._meta = self._times = self._gray = self._bgr = None
+        try:
+            self._memory.close()
+        except BufferError:
+            # Frames handed out are still referenced; the mapping then goes
+            # away with the process
+            pass
+        if self._owner:
+            self._memory.unlink()
@@ -0,0 +1,202 @@
+import json
+import subprocess
+import cv2
+import numpy as np
+
+# Bytes per pixel of the raw formats FFmpeg is asked for
+PIXEL_FORMATS = {"gray": 1, "bgr24": 3}
+
+
+def probe(source):
+    """
+    Reads the dimensions, frame rate and frame count of a video.
+
+    Uses ffprobe when it is installed and falls back to OpenCV otherwise.
+
+    Args:
+        source (str): A file path or URL.
+
+    Returns:
+        dict: 'width', 'height', 'fps' and 'frame_count' (0 if unknown).
+    """
+    command = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height,avg_frame_rate,nb_frames,duration',
+        '-of', 'json', source
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True, timeout=30).stdout
+        stream = json.loads(output)["streams"][0]
+        numerator, _, denominator = stream.get("avg_frame_rate", "0/1").partition("/")
+        denominator = float(denominator or 1)
+        fps = float(numerator) / denominator if denominator else 0.0
+        frame_count = int(stream.get("nb_frames", 0) or 0)
+        if not frame_count and stream.get("duration"):
+            # Streams often carry no frame count, only a duration
+            frame_count = int(float(stream["duration"]) * fps)
+        return {
+            "width": int(stream["width"]),
+            "height": int(stream["height"]),
+            "fps": fps,
+            "frame_count": frame_count,
+        }
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError, IndexError):
+        pass
+
+    cap = cv2.VideoCapture(source)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Could not open video: {source}")
+        return {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "frame_count": max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0),
+        }
+    finally:
+        cap.release()
+
+
+class FFmpegFrameSource:
+    """
+    Decodes a video with FFmpeg, which scales the frames to the render size
+    and converts them to gray or BGR inside the decoder, so full-resolution
+    frames never reach Python.
+
+    Frames are read from FFmpeg's stdout with readinto() into a small ring of
+    preallocated numpy buffers. A returned frame stays valid until 'buffers'
+    more frames have been read; copy it to keep it longer.
+
+    The read/grab/get/set/release methods mirror cv2.VideoCapture, so the
+    source can be used wherever the players use a capture. Seeking restarts
+    FFmpeg at the new position; seek_keyframe() restarts it exactly at a
+    keyframe known from a seek_index.KeyframeIndex.
+    """
+
+    def __init__(self, source, width, height=None, pix_fmt="bgr24", buffers=8):
+        """
+        Args:
+            source (str): A file path or URL, e.g. from
+                youtube_utils.get_youtube_video_url.
+            width (int): Width to decode frames at.
+            height (int, optional): Height to decode frames at. By default
+                derived from the aspect ratio with the same 3/5 character
+                correction the players use.
+            pix_fmt (str): "gray" for (height, width) frames or "bgr24" for
+                (height, width, 3) frames.
+            buffers (int): Number of frame buffers in the ring. Must exceed
+                the number of frames the caller holds at once.
+        """
+        if pix_fmt not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format: {pix_fmt}")
+        info = probe(source)
+        self.source = source
+        self.pix_fmt = pix_fmt
+        self.source_width = info["width"]
+        self.source_height = info["height"]
+        self.fps = info["fps"]
+        self.frame_count = info["frame_count"]
+        self.width = width
+        self.height = height or max(int(self.source_height * (width / self.source_width) * (3.0 / 5)), 1)
+        channels = PIXEL_FORMATS[pix_fmt]
+        shape = (self.height, self.width) if channels == 1 else (self.height, self.width, channels)
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(max(buffers, 2))]
+        self._next_buffer = 0
+        self._scratch = np.empty(shape, dtype=np.uint8)
+        self._process = None
+        self._position = 0
+        self._start(0)
+
+    def _start(self, frame_index, keyframe_time=None):
+        self._stop_process()
+        command = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error']
+        if keyframe_time is not None:
+            # Seek to just past the keyframe, which lands on the keyframe,
+            # and keep every frame from there instead of decoding up to the
+            # rounded timestamp
+            half_frame = 0.5 / self.fps if self.fps else 0.001
+            command += ['-noaccurate_seek', '-ss', f"{keyframe_time + half_frame:.6f}"]
+        elif frame_index and self.fps:
+            command += ['-ss', f"{frame_index / self.fps:.3f}"]
+        command += [
+            '-i', self.source, '-an', '-sn',
+            '-vf', f"scale={self.width}:{self.height}:flags=area",
+            '-pix_fmt', self.pix_fmt, '-f', 'rawvideo', '-'
+        ]
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=0)
+        self._position = frame_index
+
+    def _stop_process(self):
+        if self._process:
+            self._process.kill()
+            self._process.stdout.close()
+            self._process.wait()
+            self._process = None
+
+    def _read_into(self, buffer):
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            count = self._process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        self._position += 1
+        return True
+
+    def isOpened(self):
+        return self._process is not None
+
+    def read(self, image=None):
+        """
+        Args:
+            image: Ignored; accepted for compatibility with
+                cv2.VideoCapture.read(). Frames always land in the ring.
+
+        Returns:
+            tuple: (ok, frame) like cv2.VideoCapture.read().
+        """
+        if self._process is None:
+            return False, None
+        buffer = self._buffers[self._next_buffer]
+        if not self._read_into(buffer):
+            return False, None
+        self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+        return True, buffer
+
+    def grab(self):
+        """Reads past one frame without handing it out."""
+        return self._process is not None and self._read_into(self._scratch)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_count
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self._position
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self._start(max(int(value), 0))
+        return True
+
+    def seek_keyframe(self, frame_index, seconds):
+        """
+        Restarts decoding at a keyframe.
+
+        Args:
+            frame_index (int): Frame number of the keyframe.
+            seconds (float): Its timestamp from the first frame.
+        """
+        self._start(frame_index, seconds)
+
+    def release(self):
+        self._stop_process()
@@ -0,0 +1,481 @@
+import os
+import sys
+import cv2
+import math
+import queue
+import shutil
+import signal
+import argparse
+import curses
+import multiprocessing
+import time
+import numpy as np
+import ansi
+import color
+import painter
+import youtube_utils
+import youtube_cache
+import frame_ring
+from frame_ring import FrameRing
+from pipeline import FrameBuffers
+from controls import CursesKeys, TerminalKeys
+from overlay import OVERLAY_BGR, OVERLAY_PAIR_ID
+
+# --- Argument Parsing ---
+parser = argparse.ArgumentParser(description='Play several videos or webcams at once, tiled in one terminal')
+parser.add_argument("--width", type=int, default=0, help="width of the mosaic in characters (default: the terminal width)")
+parser.add_argument("--height", type=int, default=0, help="height of the mosaic in rows (default: the terminal height)")
+parser.add_argument("--fps", type=int, default=30, help="screen refreshes per second, and the frame rate of sources that report none")
+parser.add_argument("--inv", action='store_true', help="invert the shades")
+parser.add_argument("--color", action='store_true', help="print colors if available (slows things down)")
+parser.add_argument("--ansi", action='store_true', help="write frames as raw ANSI escapes instead of using curses")
+parser.add_argument("--ansi-bits", type=int, default=8, help="bits per color channel in --ansi color mode")
+parser.add_argument("--loop", action='store_true', help="restart video files when they end")
+parser.add_argument("sources", type=str, nargs='+', help="paths or YouTube URLs of videos, or webcam indices")
+
+# Columns left blank between neighbouring tiles
+TILE_GAP = 1
+# Shared frame slots per tile: the one the renderer copies from, the newest
+# complete one and the one being decoded into
+RING_SLOTS = 3
+# Seconds between updates of the tile labels and the status line
+LABEL_INTERVAL = 1.0
+
+
+def grid_layout(count, width, height):
+    """
+    Splits a width x height area into a near-square grid of tiles.
+
+    Args:
+        count (int): Number of tiles.
+        width (int): Area width in characters.
+        height (int): Area height in rows.
+
+    Returns:
+        list: (x, y, tile_width, tile_height) per tile, row by row.
+    """
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    tile_width = (width - TILE_GAP * (columns - 1)) // columns
+    tile_height = height // rows
+    return [((i % columns) * (tile_width + TILE_GAP), (i // columns) * tile_height, tile_width, tile_height)
+            for i in range(count)]
+
+
+def fit_size(frame_width, frame_height, box_width, box_height):
+    """
+    Returns the largest (width, height) in characters that shows a frame
+    undistorted inside a box, with characters 5:3 as tall as they are wide.
+    """
+    width = box_width
+    height = int(frame_height * (width / frame_width) * (3.0 / 5))
+    if height > box_height:
+        height = box_height
+        width = int(frame_width * (height / frame_height) * (5.0 / 3))
+    return max(width, 1), max(height, 1)
+
+
+def decode_tile(source, box_width, box_height, loop, default_fps, ring_spec, messages):
+    """
+    Decoder process of one tile. Opens the source, then decodes, resizes and
+    grayscale-converts frames at the source's own rate straight into the
+    tile's FrameRing, where the renderer picks up the newest one.
+
+    The frame index stored with each frame counts every frame decoded, so
+    gaps show frames the renderer never drew. 'messages' carries ("info",
+    width, height, fps) once the source is open, then ("end",) or ("error",
+    text).
+
+    Each decoder keeps its own clock: a decoder that falls behind skips
+    frames with grab() to catch up, and the ring never makes it wait for
+    the renderer, so no tile ever waits for another.
+    """
+    # Ctrl-C is handled by the renderer, which then stops the decoders
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # One process per source already spreads decoding over the cores
+    cv2.setNumThreads(1)
+    cap = cv2.VideoCapture(source)
+    ok, frame = cap.read()
+    if not ok:
+        messages.put(("error", "could not read a frame"))
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if not fps or fps <= 0 or fps > 1000: # Webcams might report 0
+        fps = default_fps
+    is_file = isinstance(source, str)
+    width, height = fit_size(frame.shape[1], frame.shape[0], box_width, box_height)
+    messages.put(("info", width, height, fps))
+
+    ring = FrameRing(**ring_spec)
+    buffers = FrameBuffers()
+    frame_interval = 1.0 / fps
+    start_time = time.perf_counter()
+    frame_index = 0
+    while not ring.header[frame_ring.STOP]:
+        bgr, gray = ring.acquire(width, height)
+        if bgr is not None:
+            cv2.resize(frame, (width, height), dst=bgr)
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY, dst=gray)
+        else:
+            cv2.cvtColor(buffers.resize(frame, width, height), cv2.COLOR_BGR2GRAY, dst=gray)
+        ring.publish(frame_index)
+        frame_index += 1
+
+        if is_file:
+            # Files are paced here; live sources deliver at their own rate
+            wait_time = frame_index * frame_interval - (time.perf_counter() - start_time)
+            if wait_time > 0:
+                time.sleep(wait_time)
+            while wait_time < -frame_interval and cap.grab():
+                frame_index += 1
+                wait_time += frame_interval
+        ok, frame = buffers.read(cap)
+        if not ok and loop and is_file:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = buffers.read(cap)
+        if not ok:
+            break
+    cap.release()
+    ring.close()
+    messages.put(("end",))
+
+
+class Tile:
+    """
+    Renderer-side end of one source: its decoder process, the shared frame
+    ring between the two, its place in the mosaic and its frame counters.
+
+    Attributes:
+        name (str): Label shown above the tile.
+        box (tuple): (x, y, width, height) of the tile in the mosaic.
+        ring (frame_ring.FrameRing): Frames from the decoder, sized for the
+            video area of the box.
+        size (tuple): (width, height) of the video inside the tile, known
+            once the decoder reported it.
+        fps (float): The source's frame rate.
+        frames_shown (int): Frames drawn.
+        frames_missed (int): Frames the decoder produced that were never
+            drawn: skipped to keep pace, or replaced in the ring by a newer
+            one before the next refresh.
+        ended (bool): True once the source has no more frames.
+        error (str or None): Why the source could not be played.
+    """
+
+    def __init__(self, name, source, box, use_color, loop, default_fps):
+        self.name = name
+        self.box = box
+        self.size = None
+        self.fps = 0.0
+        self.frames_shown = 0
+        self.frames_missed = 0
+        self.ended = False
+        self.error = None
+        self._last_index = -1
+        self._finished = False
+        # The label takes the top row of the box
+        x, y, width, height = box
+        self.ring = FrameRing(width, height - 1, RING_SLOTS, use_color, create=True)
+        self._messages = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=decode_tile, name=f"decode-{name}", daemon=True,
+            args=(source, width, height - 1, loop, default_fps, self.ring.spec(), self._messages))
+
+    def start(self):
+        self._process.start()
+
+    def wait_info(self, timeout):
+        """Waits for the decoder to report its frame size. Returns False on failure."""
+        try:
+            message = self._messages.get(timeout=timeout)
+        except queue.Empty:
+            self.error = "timed out opening the source"
+        else:
+            if message[0] == "info":
+                self.size = message[1:3]
+                self.fps = message[3]
+                return True
+            self.error = message[1]
+        self.ended = True
+        return False
+
+    def latest(self):
+        """
+        Returns the newest frame completed since the last call, as a
+        frame_ring.RingFrame whose views stay valid until release(), or None
+        if there is none.
+        """
+        if self.ended:
+            return None
+        if not self._finished:
+            # Checked before the message, so an "end" sent just before the
+            # process exited is still read
+            alive = self._process.is_alive()
+            try:
+                # Checked before the ring, so the last frame is still taken
+                self._finished = self._messages.get_nowait()[0] == "end"
+            except queue.Empty:
+                if not alive:
+                    # The decoder died without saying goodbye
+                    self._finished = True
+                    self.error = f"decoder exited with code {self._process.exitcode}"
+        frame = self.ring.newest()
+        if frame is None:
+            self.ended = self._finished
+            return None
+        self.frames_missed += frame.index - self._last_index - 1
+        self._last_index = frame.index
+        self.frames_shown += 1
+        return frame
+
+    def release(self, frame):
+        """Hands a frame from latest() back to the ring once it was copied."""
+        self.ring.release(frame)
+
+    def stop(self):
+        """Asks the decoder process to exit, without waiting for it."""
+        if self.ring.header is not None:
+            self.ring.header[frame_ring.STOP] = 1
+
+    def close(self):
+        """Stops the decoder process, waits for it to exit and frees the ring."""
+        self.stop()
+        try:
+            self._process.join(2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+        finally:
+            self.ring.close()
+
+
+class Mosaic:
+    """
+    The composed screen: one character grid, plus curses color pairs or BGR
+    cell colors in color mode, into which each tile's newest frame is
+    copied. A refresh draws the whole grid at once, however many tiles
+    changed.
+
+    Attributes:
+        chars (numpy.ndarray): (height, width) uint8 character codes.
+        colors (numpy.ndarray or None): (height, width, 3) BGR cell colors
+            for ANSI color output.
+        pair_ids (numpy.ndarray or None): (height, width) curses color pair
+            IDs for curses color output.
+    """
+
+    def __init__(self, width, height, ansi_color=False, curses_color=None):
+        self.width = width
+        self.height = height
+        self.curses_color = curses_color
+        self.chars = np.full((height, width), ord(" "), dtype=np.uint8)
+        self.colors = np.zeros((height, width, 3), dtype=np.uint8) if ansi_color else None
+        self.pair_ids = None
+        if curses_color is not None:
+            self.pair_ids = np.full((height, width), OVERLAY_PAIR_ID, dtype=curses_color.color_cube.dtype)
+
+    def place(self, tile, grayscale_frame, frame):
+        """Copies a tile's frame into the grid, centered below its label."""
+        x, y, box_width, box_height = tile.box
+        height, width = grayscale_frame.shape
+        x += (box_width - width) // 2
+        y += 1 + (box_height - 1 - height) // 2
+        area = (slice(y, y + height), slice(x, x + width))
+        painter.frame_to_chars(grayscale_frame, self.chars[area])
+        if self.colors is not None:
+            self.colors[area] = frame
+        if self.pair_ids is not None:
+            self.pair_ids[area] = self.curses_color.get_colors(frame)
+
+    def write_text(self, x, y, width, text):
+        """Writes a line of text padded or cut to 'width' cells, in the default color."""
+        line = text[:width].ljust(width).encode("ascii", "replace")
+        self.chars[y, x:x + width] = np.frombuffer(line, dtype=np.uint8)
+        if self.colors is not None:
+            self.colors[y, x:x + width] = OVERLAY_BGR
+        if self.pair_ids is not None:
+            self.pair_ids[y, x:x + width] = OVERLAY_PAIR_ID
+
+
+def tile_label(tile, elapsed):
+    state = "ended" if tile.ended else f"{tile.frames_shown / elapsed if elapsed > 0 else 0:.0f} fps"
+    if tile.error:
+        state = tile.error
+    return f" {tile.name} [{state}]"
+
+
+def resolve_source(source, width):
+    """
+    Turns a command line source into something cv2.VideoCapture opens.
+
+    Returns:
+        tuple: (source, name) or None if the source does not exist.
+    """
+    try:
+        return int(source), f"cam {source}" # Webcam index
+    except ValueError:
+        pass
+    if youtube_utils.is_youtube_url(source):
+        print(f"Resolving YouTube video {source}...")
+        return youtube_cache.resolve(source, width), source
+    if os.path.isfile(source):
+        return source, os.path.basename(source)
+    return None
+
+
+def main():
+    args = parser.parse_args()
+    if args.inv:
+        painter.invert_chars()
+
+    terminal = shutil.get_terminal_size()
+    width = args.width or terminal.columns
+    # The bottom row holds the status line
+    height = (args.height or terminal.lines) - 1
+    boxes = grid_layout(len(args.sources), width, height)
+    if boxes[0][2] < 4 or boxes[0][3] < 3:
+        print(f"Error: {width}x{height} is too small for {len(args.sources)} tiles.")
+        return 1
+
+    # --- Decoder Processes (one per source, started before the screen is set up) ---
+    resolved = []
+    for source, box in zip(args.sources, boxes):
+        resolved_source = resolve_source(source, box[2])
+        if resolved_source is None:
+            print(f"Error: Failed to find video at: {source}")
+            return 1
+        resolved.append(resolved_source)
+    tiles = [Tile(name, source, box, args.color, args.loop, args.fps)
+             for (source, name), box in zip(resolved, boxes)]
+    for tile in tiles:
+        tile.start()
+
+    ansi_screen = None
+    curses_color = None
+    curses_started = False
+    keys = None
+    start_time = time.perf_counter()
+    refresh_count = 0
+    try:
+        for tile in tiles:
+            if not tile.wait_info(timeout=30):
+                print(f"Warning: {tile.name}: {tile.error}")
+        live = [tile for tile in tiles if not tile.ended]
+        if not live:
+            print("Could not extract frame from any source.")
+            return 1
+
+        # --- Output Backend Setup ---
+        first_frames = {}
+        deadline = time.perf_counter() + 5.0
+        while len(first_frames) < len(live) and time.perf_counter() < deadline:
+            for tile in live:
+                frame = None if tile in first_frames else tile.latest()
+                if frame is not None:
+                    # Copied: the screen is set up before they are drawn
+                    first_frames[tile] = (frame.gray.copy(), None if frame.bgr is None else frame.bgr.copy())
+                    tile.release(frame)
+            time.sleep(0.005)
+        if args.ansi:
+            ansi_screen = ansi.AnsiScreen(color_bits=args.ansi_bits)
+        else:
+            curses.initscr()
+            curses_started = True
+        if args.color and not args.ansi and curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            # One palette for all tiles, from their first frames
+            samples = [frame.reshape(-1, 3) for frame in
+                       (first[1] for first in first_frames.values())]
+            if samples:
+                curses_color = color.CursesColor(np.vstack(samples))
+        mosaic = Mosaic(width, height + 1, ansi_color=args.color and ansi_screen is not None,
+                        curses_color=curses_color)
+        if ansi_screen:
+            ansi_screen.start()
+            keys = TerminalKeys()
+        else:
+            window = curses.newwin(height + 1, width, 0, 0)
+            keys = CursesKeys(window)
+        for tile, first in first_frames.items():
+            mosaic.place(tile, *first)
+
+        # --- Main Rendering Loop ---
+        start_time = time.perf_counter()
+        refresh_interval = 1.0 / args.fps
+        next_labels = 0.0
+        changed = True
+        while not all(tile.ended for tile in tiles):
+            tick_start = time.perf_counter()
+            if "q" in keys.read():
+                break
+            for tile in live:
+                frame = tile.latest()
+                if frame is not None:
+                    # Copied out of the shared slot right away, so the
+                    # decoder is free to reuse it
+                    mosaic.place(tile, frame.gray, frame.bgr)
+                    tile.release(frame)
+                    changed = True
+
+            elapsed = tick_start - start_time
+            if elapsed >= next_labels:
+                for tile in tiles:
+                    mosaic.write_text(tile.box[0], tile.box[1], tile.box[2], tile_label(tile, elapsed))
+                total_shown = sum(tile.frames_shown for tile in tiles)
+                mosaic.write_text(0, height, width,
+                                  f" {len(live)} sources | {total_shown / elapsed if elapsed > 0 else 0:.0f} fps "
+                                  f"total | q quits")
+                next_labels = elapsed + LABEL_INTERVAL
+                changed = True
+
+            # --- Draw every tile in one refresh ---
+            if changed:
+                if ansi_screen:
+                    ansi_screen.write_frame(ansi_screen.render_chars(mosaic.chars, mosaic.colors))
+                else:
+                    if curses_color:
+                        painter.paint_color_chars(window, mosaic.chars, mosaic.pair_ids)
+                    else:
+                        painter.paint_chars(window, mosaic.chars)
+                    window.refresh()
+                refresh_count += 1
+                changed = False
+
+            wait_time = refresh_interval - (time.perf_counter() - tick_start)
+            if wait_time > 0:
+                time.sleep(wait_time)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # --- Cleanup ---
+        elapsed = time.perf_counter() - start_time
+        # A second Ctrl-C must not cut this short and leave shared memory behind
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for tile in tiles:
+            tile.stop()
+        for tile in tiles:
+            tile.close()
+        if keys:
+            keys.close()
+        if ansi_screen:
+            ansi_screen.stop()
+        elif curses_started:
+            curses.endwin()
+
+    if refresh_count:
+        total_shown = sum(tile.frames_shown for tile in tiles)
+        print(f"Finished. {len(tiles)} sources at {total_shown / elapsed:.0f} FPS in total "
+              f"({refresh_count / elapsed:.0f} screen refreshes per second).")
+        for tile in tiles:
+            print(f"    {tile.name}: {tile.frames_shown / elapsed:.1f} of {tile.fps:.0f} FPS, "
+                  f"{tile.frames_shown} frames shown, {tile.frames_missed} missed"
+                  + (f" ({tile.error})" if tile.error else ""))
+        latencies = [latency for tile in tiles for latency in tile.ring.latencies]
+        if latencies:
+            print(f"Shared-memory hand-over: {sum(latencies) / len(latencies) * 1000:.1f} ms on average, "
+                  f"{sum(tile.ring.frames_overwritten() for tile in tiles)} frames replaced unread, "
+                  f"{sum(tile.ring.torn_reads for tile in tiles)} torn.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
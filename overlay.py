@@ -0,0 +1,165 @@
+import numpy as np
+
+# Overlay cells are drawn with the terminal's default colors: curses pair 0,
+# and white in BGR color frames.
+OVERLAY_PAIR_ID = 0
+OVERLAY_BGR = (255, 255, 255)
+
+ANCHORS = ("top-left", "top-center", "top-right", "bottom-left", "bottom-center", "bottom-right")
+
+
+class Overlay:
+    """
+    Text layers (a watermark, a title, a stats line) composited into each
+    frame's character grid before it is drawn.
+
+    Static layers are rendered once per geometry into a character plane and a
+    mask; apply() then merges them into a frame with a masked assignment
+    limited to the overlay's bounding box. Because the overlay becomes part
+    of the frame itself, it costs no extra draw calls and works the same with
+    every backend (curses, ANSI, incremental redraw).
+
+    Attributes:
+        width (int): Frame width in characters.
+        height (int): Frame height in characters.
+        chars (numpy.ndarray): (height, width) uint8 character codes of the
+            overlay cells.
+        mask (numpy.ndarray): (height, width) bool plane marking overlay cells.
+    """
+
+    def __init__(self, width, height):
+        self._layers = []
+        self._status = b""
+        self.resize(width, height)
+
+    def add_text(self, text, anchor="bottom-right"):
+        """
+        Adds a static block of text. Each line is aligned on its own towards
+        the anchor's side; spaces are drawn too, so they cover the video.
+
+        Args:
+            text (str): The text, lines separated by newlines. Characters that
+                are not ASCII are shown as '?'.
+            anchor (str): One of ANCHORS.
+        """
+        if anchor not in ANCHORS:
+            raise ValueError(f"Unknown overlay anchor: {anchor}")
+        self._layers.append((text.split("\n"), anchor))
+        self._render()
+
+    def add_box(self, text, anchor="top-left"):
+        """
+        Adds a static block of text inside a +---+ border, e.g. a title card.
+
+        Args:
+            text (str): The box contents, lines separated by newlines.
+            anchor (str): One of ANCHORS.
+        """
+        lines = text.split("\n")
+        inner = max(len(line) for line in lines)
+        border = "+" + "-" * (inner + 2) + "+"
+        boxed = [border] + [f"| {line.ljust(inner)} |" for line in lines] + [border]
+        self.add_text("\n".join(boxed), anchor)
+
+    def set_status(self, text):
+        """
+        Sets a dynamic line drawn at the top-left corner, e.g. a stats HUD.
+        Cheap enough to call every frame; an empty string removes it.
+        """
+        status = text[:self.width].encode("ascii", "replace")
+        if status == self._status:
+            return
+        self._status = status
+        self._compose_status()
+
+    def resize(self, width, height):
+        """Re-renders every layer for a new frame geometry."""
+        self.width = width
+        self.height = height
+        self._render()
+
+    @property
+    def active(self):
+        """True if the overlay draws anything."""
+        return self._bounds is not None
+
+    def apply(self, chars, colors=None):
+        """
+        Merges the overlay into a frame.
+
+        Args:
+            chars (numpy.ndarray): A (height, width) uint8 array of character
+                codes. Modified in place unless it is read-only.
+            colors (numpy.ndarray, optional): Either a (height, width) array of
+                curses pair IDs or a (height, width, 3) BGR frame giving the
+                cells' colors. Modified in place unless it is read-only.
+
+        Returns:
+            tuple: (chars, colors) with the overlay merged in. These are
+            copies only if the inputs could not be written to.
+        """
+        if self._bounds is None:
+            return chars, colors
+        if chars.shape != self.mask.shape:
+            raise ValueError(f"Overlay is {self.width}x{self.height}, frame is "
+                             f"{chars.shape[1]}x{chars.shape[0]}")
+        y0, y1, x0, x1 = self._bounds
+        region_mask = self.mask[y0:y1, x0:x1]
+        if not chars.flags.writeable:
+            chars = chars.copy()
+        np.copyto(chars[y0:y1, x0:x1], self.chars[y0:y1, x0:x1], where=region_mask)
+        if colors is not None:
+            if not colors.flags.writeable:
+                colors = colors.copy()
+            region = colors[y0:y1, x0:x1]
+            region[region_mask] = OVERLAY_BGR if colors.ndim == 3 else OVERLAY_PAIR_ID
+        return chars, colors
+
+    def _render(self):
+        self._static_chars = np.zeros((self.height, self.width), dtype=np.uint8)
+        self._static_mask = np.zeros((self.height, self.width), dtype=bool)
+        for lines, anchor in self._layers:
+            vertical, horizontal = anchor.split("-")
+            top = 0 if vertical == "top" else self.height - len(lines)
+            for line_idx, line in enumerate(lines):
+                y = top + line_idx
+                if not 0 <= y < self.height or not line:
+                    continue
+                codes = np.frombuffer(line.encode("ascii", "replace"), dtype=np.uint8)
+                if horizontal == "left":
+                    x = 0
+                elif horizontal == "center":
+                    x = (self.width - len(codes)) // 2
+                else:
+                    x = self.width - len(codes)
+                # Clip lines that do not fit the frame
+                start = max(-x, 0)
+                end = min(len(codes), self.width - x)
+                if start < end:
+                    self._static_chars[y, x + start:x + end] = codes[start:end]
+                    self._static_mask[y, x + start:x + end] = True
+        rows, cols = np.nonzero(self._static_mask)
+        self._static_bounds = None
+        if len(rows):
+            self._static_bounds = (int(rows.min()), int(rows.max()) + 1, int(cols.min()), int(cols.max()) + 1)
+        self.chars = self._static_chars.copy()
+        self.mask = self._static_mask.copy()
+        self._compose_status()
+
+    def _compose_status(self):
+        # Only the top row changes: restore it from the static layers, then
+        # write the status line over it
+        self._bounds = self._static_bounds
+        if not self.height:
+            return
+        self.chars[0] = self._static_chars[0]
+        self.mask[0] = self._static_mask[0]
+        length = min(len(self._status), self.width)
+        if length:
+            self.chars[0, :length] = np.frombuffer(self._status[:length], dtype=np.uint8)
+            self.mask[0, :length] = True
+            if self._bounds is None:
+                self._bounds = (0, 1, 0, length)
+            else:
+                y0, y1, x0, x1 = self._bounds
+                self._bounds = (0, y1, 0, max(x1, length))
@@ -1,6 +1,14 @@
 import curses
+import numpy as np
 from functools import lru_cache
 
+# The compiled kernel (painter_kernel.pyx, built with setup.py) is optional;
+# every function below falls back to NumPy when it is missing.
+try:
+    import painter_kernel
+except ImportError:
+    painter_kernel = None
+
 # Note: This script assumes you have a 'color.py' module with a class
 # that has a 'get_color' method, as was implied by the original Cython code.
 
@@ -11,6 +19,57 @@ from functools import lru_cache
 characters = [' ', '.', ',', '-', '~', ':', ';', '=', '!', '*', '#', '$', '@']
 # Calculate the brightness range that each character represents.
 char_range = int(255 / len(characters))
+# Lookup table mapping every grayscale value (0-255) to a character code.
+# Rebuilt whenever the character set changes.
+char_lut = np.zeros(256, dtype=np.uint8)
+# Maps every byte to itself, for passing ready-made characters to the kernel.
+identity_lut = np.arange(256, dtype=np.uint8)
+# Work arrays of the paint functions, kept between frames and reallocated
+# only when the frame size changes.
+_buffers = {}
+
+
+def frame_buffer(name, shape, dtype=np.uint8):
+    """
+    Returns a reusable array for one step of the frame path, allocating it
+    only on first use or when the shape or type changes. Its contents are
+    overwritten by the next frame.
+
+    Args:
+        name (str): Identifies the step the array belongs to.
+        shape (tuple): The array shape.
+        dtype: The array type.
+    """
+    buffer = _buffers.get(name)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = _buffers[name] = np.empty(shape, dtype=dtype)
+    return buffer
+
+
+def build_char_lut():
+    """
+    Rebuilds the 256-entry grayscale-to-character lookup table from the
+    current character set. Must be called whenever 'characters' changes.
+    """
+    global char_lut
+    indices = np.minimum(np.arange(256) // char_range, len(characters) - 1)
+    codes = np.frombuffer("".join(characters).encode("ascii"), dtype=np.uint8)
+    char_lut = codes[indices]
+    get_char.cache_clear()
+
+
+def set_characters(new_characters):
+    """
+    Replaces the character set used for rendering, ordered from darkest to
+    brightest, and rebuilds the lookup table.
+
+    Args:
+        new_characters (list): Single ASCII characters, darkest first.
+    """
+    global characters, char_range
+    characters = list(new_characters)
+    char_range = max(int(255 / len(characters)), 1)
+    build_char_lut()
 
 
 def invert_chars():
@@ -19,6 +78,7 @@ def invert_chars():
     """
     global characters
     characters = characters[::-1]
+    build_char_lut()
 
 
 @lru_cache(maxsize=256)
@@ -37,7 +97,105 @@ def get_char(val):
     return characters[index]
 
 
-def paint_screen(window, grayscale_frame, width, height):
+def frame_to_chars(grayscale_frame, out=None):
+    """
+    Maps a whole grayscale frame to character codes in one vectorized lookup.
+
+    Args:
+        grayscale_frame (numpy.ndarray): A 2D uint8 array of grayscale values.
+        out (numpy.ndarray, optional): A uint8 array of the same shape to
+            write the codes to instead of allocating a new one.
+
+    Returns:
+        numpy.ndarray: A 2D uint8 array of ASCII character codes.
+    """
+    if out is None:
+        return char_lut[grayscale_frame]
+    # mode="clip" writes straight to 'out'; the default buffers the result
+    return np.take(char_lut, grayscale_frame, out=out, mode="clip")
+
+
+def chars_to_rows(chars):
+    """
+    Converts a 2D array of character codes into one string per row.
+
+    Args:
+        chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+
+    Returns:
+        list: The rows of the frame as strings.
+    """
+    if painter_kernel:
+        return painter_kernel.char_rows(chars, identity_lut)
+    row_width = chars.shape[1]
+    data = np.ascontiguousarray(chars).tobytes().decode("ascii")
+    return [data[i:i + row_width] for i in range(0, len(data), row_width)]
+
+
+def paint_chars(window, chars):
+    """
+    Draws a 2D array of character codes to the window, one call per row.
+
+    Args:
+        window: The curses window object to draw on.
+        chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+    """
+    paint_rows(window, chars_to_rows(chars))
+
+
+def paint_rows(window, rows):
+    """
+    Draws one string per row to the window, starting at the left edge.
+
+    Args:
+        window: The curses window object to draw on.
+        rows (list): The rows of the frame as strings.
+    """
+    for y, row in enumerate(rows):
+        try:
+            window.addstr(y, 0, row)
+        except curses.error:
+            # Writing the bottom-right cell moves the cursor out of the
+            # window, which curses reports as an error after drawing.
+            pass
+
+
+def paint_color_chars(window, chars, pair_ids):
+    """
+    Draws a 2D array of character codes to the window, issuing one call per
+    run of horizontally adjacent cells that share a color pair.
+
+    Args:
+        window: The curses window object to draw on.
+        chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+        pair_ids (numpy.ndarray): A 2D array of curses color pair IDs.
+    """
+    if painter_kernel:
+        painter_kernel.draw_char_runs(window, chars, pair_ids.astype(np.uint16, copy=False), curses.color_pair)
+        return
+    height, row_width = pair_ids.shape
+    # Mark the first cell of every row and every cell whose color differs from
+    # its left neighbour; each mark starts a new segment.
+    starts = frame_buffer("segment_starts", pair_ids.shape, bool)
+    starts[:, 0] = True
+    np.not_equal(pair_ids[:, 1:], pair_ids[:, :-1], out=starts[:, 1:])
+    ys, xs = np.nonzero(starts)
+    positions = ys * row_width + xs
+    # A segment ends where the next one starts; rows always start a segment.
+    ends = np.append(positions[1:], height * row_width)
+    colors = pair_ids[ys, xs]
+
+    data = np.ascontiguousarray(chars).tobytes().decode("ascii")
+    for y, x, start, end, pair_id in zip(ys.tolist(), xs.tolist(), positions.tolist(),
+                                         ends.tolist(), colors.tolist()):
+        try:
+            window.addstr(y, x, data[start:end], curses.color_pair(pair_id))
+        except curses.error:
+            # Ignore errors from trying to draw outside the window bounds
+            pass
+
+
+def paint_screen(window, grayscale_frame, width, height, overlay=None):
     """
     Renders a grayscale frame to the curses window using ASCII characters.
 
@@ -46,20 +204,19 @@ def paint_screen(window, grayscale_frame, width, height):
         grayscale_frame (numpy.ndarray): A 2D array of grayscale pixel values.
         width (int): The width of the frame.
         height (int): The height of the frame.
+        overlay (overlay.Overlay, optional): Text merged into the frame.
     """
-    # Iterate through each pixel of the frame
-    for y in range(grayscale_frame.shape[0]):
-        for x in range(grayscale_frame.shape[1]):
-            try:
-                # Get the corresponding character and add it to the window
-                char = get_char(grayscale_frame[y, x])
-                window.addch(y, x, char)
-            except curses.error:
-                # Ignore errors that occur when trying to draw outside the window
-                pass
+    if painter_kernel and overlay is None:
+        # Map and build the rows in one pass, without an intermediate array
+        paint_rows(window, painter_kernel.char_rows(grayscale_frame, char_lut))
+        return
+    chars = frame_to_chars(grayscale_frame, frame_buffer("chars", grayscale_frame.shape))
+    if overlay is not None:
+        chars, _ = overlay.apply(chars)
+    paint_chars(window, chars)
 
 
-def paint_color_screen(window, grayscale_frame, frame, width, height, curses_color):
+def paint_color_screen(window, grayscale_frame, frame, width, height, curses_color, overlay=None):
     """
     Renders a color frame to the curses window, using ASCII characters for
     brightness and curses color pairs for color.
@@ -73,34 +230,153 @@ def paint_color_screen(window, grayscale_frame, frame, width, height, curses_col
         frame (numpy.ndarray): A 3D array (height, width, 3) of RGB pixel values.
         width (int): The width of the frame.
         height (int): The height of the frame.
-        curses_color: An object with a 'get_color' method that maps an RGB tuple
-                      to a curses color pair ID.
-    """
-    row_width = frame.shape[1]
-
-    for y in range(frame.shape[0]):
-        # Precompute the color for each pixel in this row for faster processing.
-        row_colors = [curses_color.get_color(tuple(pixel)) for pixel in frame[y]]
-
-        x = 0
-        while x < row_width:
-            # Find a segment of continuous, same-colored pixels
-            current_color = row_colors[x]
-            start_x = x
-            segment_chars = []
-            
-            while x < row_width and row_colors[x] == current_color:
-                # Collect the ASCII characters for this segment
-                segment_chars.append(get_char(grayscale_frame[y, x]))
-                x += 1
-            
-            # Draw the entire segment at once
-            try:
-                text_segment = "".join(segment_chars)
-                window.addstr(y, start_x, text_segment, curses.color_pair(current_color))
-            except curses.error:
-                # Ignore errors from trying to draw outside the window bounds
-                pass
+        curses_color: An object with a 'get_colors' method that maps a whole BGR
+                      frame to an array of curses color pair IDs.
+        overlay (overlay.Overlay, optional): Text merged into the frame.
+    """
+    if painter_kernel and overlay is None and curses_color.color_cube.dtype == np.uint16:
+        painter_kernel.draw_color_runs(window, grayscale_frame, frame, char_lut, curses_color.color_cube,
+                                       curses_color.lut_bits, curses.color_pair)
+        return
+    chars = frame_to_chars(grayscale_frame, frame_buffer("chars", grayscale_frame.shape))
+    pair_ids = curses_color.get_colors(frame, frame_buffer("pair_ids", grayscale_frame.shape,
+                                                           curses_color.color_cube.dtype))
+    if overlay is not None:
+        chars, pair_ids = overlay.apply(chars, pair_ids)
+    paint_color_chars(window, chars, pair_ids)
+
+
+class IncrementalPainter:
+    """
+    Redraws only the parts of the window that changed since the last frame.
+
+    The painter remembers the characters, color pairs and source pixel values
+    it last drew. Each frame it compares the new frame against them with
+    vectorized cell masks and issues draw calls only for the span of each row
+    that contains changed cells. Cells whose source pixels moved by no more
+    than 'threshold' are treated as unchanged, so sensor noise does not cause
+    redraws.
+
+    Attributes:
+        threshold (int): Largest per-channel pixel change ignored as noise.
+        cells_redrawn (int): Cells drawn during the last frame.
+        cells_skipped (int): Cells left untouched during the last frame.
+        total_redrawn (int): Cells drawn since creation.
+        total_skipped (int): Cells skipped since creation.
+    """
+
+    def __init__(self, threshold=0):
+        self.threshold = threshold
+        self.cells_redrawn = 0
+        self.cells_skipped = 0
+        self.total_redrawn = 0
+        self.total_skipped = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the previous frame so the next one is drawn in full. Call this
+        after the window has been cleared or resized.
+        """
+        self._chars = None
+        self._pixels = None
+        self._pair_ids = None
+
+    def paint_screen(self, window, grayscale_frame, width, height, overlay=None):
+        """Incremental counterpart of the module-level paint_screen."""
+        chars = frame_to_chars(grayscale_frame, frame_buffer("chars", grayscale_frame.shape))
+        self.paint(window, chars, grayscale_frame, overlay=overlay)
+
+    def paint_color_screen(self, window, grayscale_frame, frame, width, height, curses_color, overlay=None):
+        """Incremental counterpart of the module-level paint_color_screen."""
+        chars = frame_to_chars(grayscale_frame, frame_buffer("chars", grayscale_frame.shape))
+        pair_ids = curses_color.get_colors(frame, frame_buffer("pair_ids", grayscale_frame.shape,
+                                                               curses_color.color_cube.dtype))
+        self.paint(window, chars, frame, pair_ids, overlay)
+
+    def paint(self, window, chars, pixels, pair_ids=None, overlay=None):
+        """
+        Draws the cells of 'chars' (and 'pair_ids', in color mode) that differ
+        from what is currently on screen.
+
+        Args:
+            window: The curses window object to draw on.
+            chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+            pixels (numpy.ndarray): The source pixels the characters were
+                derived from, grayscale (H, W) or BGR (H, W, 3). Used for the
+                noise threshold.
+            pair_ids (numpy.ndarray, optional): A 2D array of curses color
+                pair IDs, or None for monochrome output.
+            overlay (overlay.Overlay, optional): Text merged into the frame.
+                Changed overlay cells are redrawn regardless of the threshold.
+        """
+        if overlay is not None:
+            chars, pair_ids = overlay.apply(chars, pair_ids)
+        if (self._chars is None or self._chars.shape != chars.shape
+                or self._pixels.shape != pixels.shape
+                or (self._pair_ids is None) != (pair_ids is None)):
+            self._chars = chars.copy()
+            self._pixels = pixels.copy()
+            self._pair_ids = None if pair_ids is None else pair_ids.copy()
+            if pair_ids is None:
+                paint_chars(window, chars)
+            else:
+                paint_color_chars(window, chars, pair_ids)
+            self._count(chars.size, 0)
+            return
+
+        changed = np.not_equal(chars, self._chars, out=frame_buffer("changed", chars.shape, bool))
+        if pair_ids is not None:
+            changed |= np.not_equal(pair_ids, self._pair_ids, out=frame_buffer("pair_changed", chars.shape, bool))
+        dirty = changed
+        if self.threshold > 0:
+            delta = np.subtract(pixels, self._pixels, out=frame_buffer("delta", pixels.shape, np.int16),
+                                dtype=np.int16)
+            np.abs(delta, out=delta)
+            if delta.ndim == 3:
+                delta = delta.max(axis=2, out=frame_buffer("delta_max", chars.shape, np.int16))
+            dirty = np.greater(delta, self.threshold, out=frame_buffer("dirty", chars.shape, bool))
+            dirty &= changed
+            if overlay is not None:
+                # Overlay text does not come from the pixels, so the noise
+                # threshold must not hide its changes
+                dirty |= np.logical_and(changed, overlay.mask, out=frame_buffer("overlay_dirty", chars.shape, bool))
+
+        redrawn = 0
+        for y in np.flatnonzero(dirty.any(axis=1)).tolist():
+            changed = np.flatnonzero(dirty[y])
+            x0, x1 = int(changed[0]), int(changed[-1]) + 1
+            self._chars[y, x0:x1] = chars[y, x0:x1]
+            self._pixels[y, x0:x1] = pixels[y, x0:x1]
+            if pair_ids is None:
+                self._paint_span(window, y, x0, chars[y, x0:x1], 0)
+            else:
+                self._pair_ids[y, x0:x1] = pair_ids[y, x0:x1]
+                span_ids = pair_ids[y, x0:x1]
+                # Split the span into runs of the same color pair
+                bounds = np.flatnonzero(span_ids[1:] != span_ids[:-1]) + 1
+                starts = [0] + bounds.tolist()
+                ends = bounds.tolist() + [x1 - x0]
+                for start, end in zip(starts, ends):
+                    self._paint_span(window, y, x0 + start, chars[y, x0 + start:x0 + end],
+                                     curses.color_pair(int(span_ids[start])))
+            redrawn += x1 - x0
+        self._count(redrawn, chars.size - redrawn)
+
+    @staticmethod
+    def _paint_span(window, y, x, span_chars, attr):
+        try:
+            window.addstr(y, x, span_chars.tobytes().decode("ascii"), attr)
+        except curses.error:
+            # Ignore errors from trying to draw outside the window bounds
+            pass
+
+    def _count(self, redrawn, skipped):
+        self.cells_redrawn = redrawn
+        self.cells_skipped = skipped
+        self.total_redrawn += redrawn
+        self.total_skipped += skipped
+
 
 def paint_embedding(window, embed_bytes, height, fullwidth, fullheight):
     """
@@ -133,3 +409,6 @@ def paint_embedding(window, embed_bytes, height, fullwidth, fullheight):
             except curses.error:
                 # This can happen if the window is resized, just stop drawing
                 return
+
+
+build_char_lut()
@@ -0,0 +1,234 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, initializedcheck=False
+"""
+Compiled inner loops for painter.py and ansi.py. Build with:
+
+    python setup.py build_ext --inplace
+
+painter.py and ansi.py use this module when it is importable and falls back to its
+NumPy implementation otherwise, so both must produce identical output.
+"""
+from cpython.mem cimport PyMem_Malloc, PyMem_Free
+from cpython.unicode cimport PyUnicode_DecodeASCII
+import curses
+
+
+def char_rows(const unsigned char[:, :] grayscale_frame, const unsigned char[:] char_lut):
+    """
+    Maps a grayscale frame through the character lookup table, building each
+    row in a C buffer.
+
+    Args:
+        grayscale_frame (numpy.ndarray): A 2D uint8 array of grayscale values.
+        char_lut (numpy.ndarray): The 256-entry character code table.
+
+    Returns:
+        list: The rows of the frame as strings.
+    """
+    cdef Py_ssize_t height = grayscale_frame.shape[0]
+    cdef Py_ssize_t width = grayscale_frame.shape[1]
+    cdef Py_ssize_t y, x
+    cdef char *row = <char *> PyMem_Malloc(width + 1)
+    if row == NULL:
+        raise MemoryError()
+    rows = []
+    try:
+        for y in range(height):
+            for x in range(width):
+                row[x] = char_lut[grayscale_frame[y, x]]
+            rows.append(PyUnicode_DecodeASCII(row, width, NULL))
+    finally:
+        PyMem_Free(row)
+    return rows
+
+
+def draw_color_runs(window, const unsigned char[:, :] grayscale_frame, const unsigned char[:, :, :] frame,
+                    const unsigned char[:] char_lut, const unsigned short[:] color_cube, int lut_bits,
+                    color_pair):
+    """
+    Maps a frame to characters and color pairs in a single pass and draws
+    every run of the same color pair as soon as it ends, so no list of runs
+    is built.
+
+    Args:
+        window: The curses window object to draw on.
+        grayscale_frame (numpy.ndarray): A 2D uint8 array of grayscale values.
+        frame (numpy.ndarray): A (height, width, 3) uint8 BGR array.
+        char_lut (numpy.ndarray): The 256-entry character code table.
+        color_cube (numpy.ndarray): Pair IDs per color cube cell, as in
+            CursesColor.color_cube.
+        lut_bits (int): Bits per channel the cube was built with.
+        color_pair: curses.color_pair, turning pair IDs into attributes.
+
+    Returns:
+        int: The number of draw calls issued.
+    """
+    cdef Py_ssize_t height = grayscale_frame.shape[0]
+    cdef Py_ssize_t width = grayscale_frame.shape[1]
+    cdef Py_ssize_t y, x, start, calls = 0
+    cdef int shift = 8 - lut_bits
+    cdef unsigned short pair_id, run_id
+    cdef char *row = <char *> PyMem_Malloc(width + 1)
+    if row == NULL:
+        raise MemoryError()
+    addstr = window.addstr
+    try:
+        for y in range(height):
+            start = 0
+            run_id = 0
+            for x in range(width):
+                row[x] = char_lut[grayscale_frame[y, x]]
+                pair_id = color_cube[((frame[y, x, 0] >> shift) << (2 * lut_bits))
+                                     | ((frame[y, x, 1] >> shift) << lut_bits)
+                                     | (frame[y, x, 2] >> shift)]
+                if x == 0:
+                    run_id = pair_id
+                elif pair_id != run_id:
+                    _draw(addstr, y, start, row + start, x - start, color_pair(run_id))
+                    calls += 1
+                    start = x
+                    run_id = pair_id
+            if width:
+                _draw(addstr, y, start, row + start, width - start, color_pair(run_id))
+                calls += 1
+    finally:
+        PyMem_Free(row)
+    return calls
+
+
+def draw_char_runs(window, const unsigned char[:, :] chars, const unsigned short[:, :] pair_ids, color_pair):
+    """
+    Draws rows of ready-made character codes with one call per run of the
+    same color pair, as paint_color_chars does, without building a list of
+    runs.
+
+    Args:
+        window: The curses window object to draw on.
+        chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+        pair_ids (numpy.ndarray): A 2D uint16 array of curses color pair IDs.
+        color_pair: curses.color_pair, turning pair IDs into attributes.
+
+    Returns:
+        int: The number of draw calls issued.
+    """
+    cdef Py_ssize_t height = chars.shape[0]
+    cdef Py_ssize_t width = chars.shape[1]
+    cdef Py_ssize_t y, x, start, calls = 0
+    cdef unsigned short run_id
+    cdef char *row = <char *> PyMem_Malloc(width + 1)
+    if row == NULL:
+        raise MemoryError()
+    addstr = window.addstr
+    try:
+        for y in range(height):
+            start = 0
+            run_id = pair_ids[y, 0] if width else 0
+            for x in range(width):
+                row[x] = chars[y, x]
+                if pair_ids[y, x] != run_id:
+                    _draw(addstr, y, start, row + start, x - start, color_pair(run_id))
+                    calls += 1
+                    start = x
+                    run_id = pair_ids[y, x]
+            if width:
+                _draw(addstr, y, start, row + start, width - start, color_pair(run_id))
+                calls += 1
+    finally:
+        PyMem_Free(row)
+    return calls
+
+
+cdef inline _draw(addstr, Py_ssize_t y, Py_ssize_t x, const char *text, Py_ssize_t length, attr):
+    try:
+        addstr(y, x, PyUnicode_DecodeASCII(text, length, NULL), attr)
+    except curses.error:
+        # Ignore errors from trying to draw outside the window bounds
+        pass
+
+
+# Decimal digits of every byte value, for building color escapes
+cdef char byte_digits[256][3]
+cdef unsigned char byte_digit_count[256]
+
+
+cdef void _init_digits():
+    cdef int value, count, i
+    for value in range(256):
+        text = str(value).encode("ascii")
+        count = len(text)
+        byte_digit_count[value] = count
+        for i in range(count):
+            byte_digits[value][i] = text[i]
+
+
+_init_digits()
+
+
+cdef inline Py_ssize_t _write_byte_digits(unsigned char *out, Py_ssize_t pos, unsigned char value):
+    cdef int i
+    for i in range(byte_digit_count[value]):
+        out[pos + i] = byte_digits[value][i]
+    return pos + byte_digit_count[value]
+
+
+def ansi_body(const unsigned char[:, :] chars, const unsigned char[:, :, :] frame,
+              unsigned char color_mask, unsigned char[:] out):
+    """
+    Writes the rows of a frame as ANSI text into a caller-owned buffer, as
+    AnsiScreen.render_chars builds them: rows separated by CR/LF and, if
+    'frame' is given, a 24-bit foreground escape wherever the masked color
+    differs from the previous cell.
+
+    Args:
+        chars (numpy.ndarray): A 2D uint8 array of ASCII character codes.
+        frame (numpy.ndarray or None): A (height, width, 3) BGR array giving
+            each cell's color, or None for monochrome.
+        color_mask (int): Mask applied to every color channel.
+        out (bytearray): Receives the text. Must hold at least
+            height * (width * 20 + 2) bytes in color mode, or
+            height * (width + 2) bytes otherwise.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    cdef Py_ssize_t height = chars.shape[0]
+    cdef Py_ssize_t width = chars.shape[1]
+    cdef Py_ssize_t needed = height * ((width * 20 if frame is not None else width) + 2)
+    cdef Py_ssize_t y, x, pos = 0
+    cdef unsigned char r, g, b
+    cdef unsigned int rgb, last_rgb = 0
+    cdef bint first = True
+    cdef bint use_color = frame is not None
+    if out.shape[0] < needed:
+        raise ValueError(f"Output buffer too small: {out.shape[0]} < {needed}")
+    for y in range(height):
+        if y:
+            out[pos] = 13
+            out[pos + 1] = 10
+            pos += 2
+        for x in range(width):
+            if use_color:
+                b = frame[y, x, 0] & color_mask
+                g = frame[y, x, 1] & color_mask
+                r = frame[y, x, 2] & color_mask
+                rgb = (r << 16) | (g << 8) | b
+                if first or rgb != last_rgb:
+                    # ESC [ 3 8 ; 2 ; R ; G ; B m
+                    out[pos] = 27
+                    out[pos + 1] = 91
+                    out[pos + 2] = 51
+                    out[pos + 3] = 56
+                    out[pos + 4] = 59
+                    out[pos + 5] = 50
+                    out[pos + 6] = 59
+                    pos = _write_byte_digits(&out[0], pos + 7, r)
+                    out[pos] = 59
+                    pos = _write_byte_digits(&out[0], pos + 1, g)
+                    out[pos] = 59
+                    pos = _write_byte_digits(&out[0], pos + 1, b)
+                    out[pos] = 109
+                    pos += 1
+                    last_rgb = rgb
+                    first = False
+            out[pos] = chars[y, x]
+            pos += 1
+    return pos
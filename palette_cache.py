@@ -0,0 +1,135 @@
+import hashlib
+import os
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ascii_player", "palettes")
+
+
+def file_identity(path, head_bytes=1024 * 1024):
+    """
+    Identifies a file's contents cheaply: its size, modification time and a
+    hash of its first 'head_bytes' bytes.
+
+    Returns:
+        str: A string that changes whenever the file is replaced or edited.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(head_bytes))
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()}"
+
+
+class PaletteCache:
+    """
+    On-disk cache of color palettes and their lookup cubes, so a video's
+    palette is sampled and clustered only once.
+
+    Entries are keyed by the file's identity (size, modification time and a
+    hash of its first bytes) together with the render geometry and color
+    budget. Each entry is one .npz file; when the cache grows past
+    'max_bytes' the least recently used entries are deleted.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=64 * 1024 * 1024, head_bytes=1024 * 1024):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache entries.
+            max_bytes (int): Total size the cache is trimmed to.
+            head_bytes (int): How much of the start of the file is hashed.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.head_bytes = head_bytes
+
+    def key(self, video_path, width, height, num_colors):
+        """
+        Computes the cache key of a video rendered at a given geometry.
+
+        Args:
+            video_path (str): Path of the video file.
+            width (int): Render width in characters.
+            height (int): Render height in characters.
+            num_colors (int): The color budget of the palette.
+
+        Returns:
+            str: A hex digest identifying the entry.
+        """
+        identity = f"{file_identity(video_path, self.head_bytes)}:{width}x{height}:{num_colors}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key):
+        """
+        Returns a cached entry, or None on a miss.
+
+        Returns:
+            dict or None: 'palette' (BGR array) and 'index_cube' (palette
+            indices per color cube cell).
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {"palette": data["palette"], "index_cube": data["index_cube"]}
+        except (OSError, KeyError, ValueError):
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        return entry
+
+    def store(self, key, palette, index_cube):
+        """
+        Saves an entry, then evicts old entries if the cache is too large.
+
+        Args:
+            key (str): The entry's key.
+            palette (numpy.ndarray): An (N, 3) BGR palette.
+            index_cube (numpy.ndarray): Palette indices per color cube cell.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self._path(key) + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, palette=palette, index_cube=index_cube)
+        # Rename into place so concurrent readers never see half an entry
+        os.replace(temp_path, self._path(key))
+        self.evict()
+
+    def invalidate(self, key=None):
+        """
+        Deletes one entry, or every entry if key is None.
+        """
+        if key is not None:
+            paths = [self._path(key)]
+        elif os.path.isdir(self.cache_dir):
+            paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        else:
+            paths = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
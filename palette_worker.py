@@ -0,0 +1,229 @@
+import collections
+import threading
+import time
+import cv2
+import numpy as np
+import color
+
+
+class PaletteWorker:
+    """
+    Watches the frames being played for scene cuts and rebuilds the color
+    palette for the new scene on a background thread.
+
+    Cuts are detected by comparing a coarse color histogram of each frame,
+    taken from a small thumbnail, against the histogram of the scene the
+    current palette was built for. After a cut the worker collects a few
+    frames of the new scene, clusters them into a palette and precomputes its
+    lookup cube. The render thread picks the result up with poll() and swaps
+    it in with CursesColor.set_palette(), so it never waits for clustering.
+
+    Attributes:
+        cuts_detected (int): Scene cuts seen so far.
+        palettes_built (int): Palettes rebuilt so far.
+        last_build_seconds (float): Time the most recent rebuild took.
+    """
+
+    def __init__(self, num_colors, cut_threshold=0.5, settle_frames=5, min_interval=2.0,
+                 thumbnail_size=(32, 18), pixels_per_frame=2000):
+        """
+        Args:
+            num_colors (int): Color budget of the rebuilt palettes.
+            cut_threshold (float): Histogram distance (0 to 1) treated as a cut.
+            settle_frames (int): Frames of the new scene sampled for its palette.
+            min_interval (float): Minimum seconds between rebuilds.
+            thumbnail_size (tuple): (width, height) frames are shrunk to before
+                computing histograms.
+            pixels_per_frame (int): Maximum pixels sampled from each frame.
+        """
+        self.num_colors = num_colors
+        self.cut_threshold = cut_threshold
+        self.settle_frames = settle_frames
+        self.min_interval = min_interval
+        self.thumbnail_size = thumbnail_size
+        self.pixels_per_frame = pixels_per_frame
+        self.cuts_detected = 0
+        self.palettes_built = 0
+        self.last_build_seconds = 0.0
+        self._reference_hist = None
+        self._scene_samples = collections.deque(maxlen=settle_frames)
+        self._pending_cut = False
+        self._last_build = 0.0
+        # Submitted frames are copied into one of two buffers that alternate
+        # between the render thread and the worker
+        self._pending_frame = None
+        self._working_frame = None
+        self._frame_pending = False
+        self._ready = None
+        self._lock = threading.Lock()
+        self._frame_available = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="palette-worker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._frame_available.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def submit(self, frame):
+        """
+        Offers a played frame to the worker. Never blocks: if the worker is
+        still busy with an earlier frame, this one replaces any frame waiting.
+        The frame is copied, so the caller may reuse its buffer.
+
+        Args:
+            frame (numpy.ndarray): A (height, width, 3) BGR frame.
+        """
+        with self._lock:
+            if self._pending_frame is None or self._pending_frame.shape != frame.shape:
+                self._pending_frame = np.empty_like(frame)
+            np.copyto(self._pending_frame, frame)
+            self._frame_pending = True
+        self._frame_available.set()
+
+    def poll(self):
+        """
+        Returns a newly built palette, once.
+
+        Returns:
+            tuple or None: (palette, index_cube) ready for
+            CursesColor.set_palette, or None if nothing new is ready.
+        """
+        with self._lock:
+            ready, self._ready = self._ready, None
+        return ready
+
+    def _histogram(self, thumbnail):
+        hist = cv2.calcHist([thumbnail], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
+        return hist.ravel() / max(hist.sum(), 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._frame_available.wait()
+            self._frame_available.clear()
+            with self._lock:
+                if not self._frame_pending:
+                    continue
+                self._pending_frame, self._working_frame = self._working_frame, self._pending_frame
+                self._frame_pending = False
+                frame = self._working_frame
+
+            thumbnail = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+            hist = self._histogram(thumbnail)
+            if self._reference_hist is None:
+                self._reference_hist = hist
+                continue
+
+            # Total variation distance between the two color distributions
+            distance = 0.5 * np.abs(hist - self._reference_hist).sum()
+            if not self._pending_cut and distance > self.cut_threshold:
+                self.cuts_detected += 1
+                self._pending_cut = True
+                self._scene_samples.clear()
+
+            if self._pending_cut:
+                pixels = frame.reshape(-1, 3)
+                if len(pixels) > self.pixels_per_frame:
+                    pixels = pixels[np.random.choice(len(pixels), self.pixels_per_frame, replace=False)]
+                else:
+                    # The frame buffer is reused for the next submitted frame
+                    pixels = pixels.copy()
+                self._scene_samples.append(pixels)
+                if (len(self._scene_samples) == self.settle_frames
+                        and time.perf_counter() - self._last_build >= self.min_interval):
+                    self._rebuild(hist)
+
+    def _rebuild(self, hist):
+        build_start = time.perf_counter()
+        palette = color.build_palette(np.vstack(self._scene_samples), self.num_colors)
+        index_cube = color.build_color_cube(palette)
+        self._last_build = time.perf_counter()
+        self.last_build_seconds = self._last_build - build_start
+        self.palettes_built += 1
+        self._reference_hist = hist
+        self._pending_cut = False
+        with self._lock:
+            self._ready = (palette, index_cube)
+
+
+class PaletteBuilder:
+    """
+    Builds a video's first color palette on a background thread, so playback
+    can start in grayscale right away and switch to color once poll()
+    returns the palette.
+
+    The worker samples frames across the file with a capture of its own,
+    which leaves the playback capture alone, then clusters the pixels and
+    precomputes the lookup cube. Registering the colors with curses is left
+    to the render thread, since curses must only be used from one thread.
+
+    Attributes:
+        build_seconds (float or None): Time from start() until the palette
+            was ready.
+        error (str or None): Why no palette could be built.
+    """
+
+    def __init__(self, source, width, height, num_colors, fallback_frame=None):
+        """
+        Args:
+            source (str or int): Path or URL of the video, or a webcam index.
+                Webcams and sources without frames to sample use the
+                fallback frame alone.
+            width (int): Width the frames are rendered at.
+            height (int): Height the frames are rendered at.
+            num_colors (int): Color budget of the palette.
+            fallback_frame (numpy.ndarray, optional): A BGR frame of the video,
+                e.g. the first one, used when nothing can be sampled.
+        """
+        self.source = source
+        self.width = width
+        self.height = height
+        self.num_colors = num_colors
+        self.fallback_frame = fallback_frame
+        self.build_seconds = None
+        self.error = None
+        self._ready = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="palette-builder", daemon=True)
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        self._thread.start()
+
+    def poll(self):
+        """
+        Returns the palette once it is ready, once.
+
+        Returns:
+            tuple or None: (palette, index_cube) ready for color.CursesColor,
+            or None if nothing new is ready.
+        """
+        with self._lock:
+            ready, self._ready = self._ready, None
+        return ready
+
+    def _run(self):
+        try:
+            sample_pixels = None
+            if isinstance(self.source, str):
+                cap = cv2.VideoCapture(self.source)
+                if int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) > 1:
+                    sample_pixels = color.sample_video_pixels(cap, self.width, self.height)
+                cap.release()
+            if sample_pixels is None and self.fallback_frame is not None:
+                sample_pixels = cv2.resize(self.fallback_frame, (self.width, self.height))
+            if sample_pixels is None:
+                self.error = "no frames to sample"
+                return
+            palette = color.build_palette(sample_pixels, self.num_colors)
+            index_cube = color.build_color_cube(palette)
+        except (cv2.error, ValueError, MemoryError) as e:
+            self.error = str(e)
+            return
+        self.build_seconds = time.perf_counter() - self._start_time
+        with self._lock:
+            self._ready = (palette, index_cube)
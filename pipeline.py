@@ -0,0 +1,529 @@
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import cv2
+import numpy as np
+import frame_ring
+from frame_ring import FrameRing
+from frame_source import FFmpegFrameSource
+from seek_index import KeyframeIndex, seek_capture
+
+
+class FrameBuffers:
+    """
+    Output arrays for decoding, resizing and grayscale-converting one frame,
+    reused from frame to frame and reallocated only when the geometry
+    changes, so steady playback does not allocate frame-sized arrays.
+
+    The arrays returned by the methods are overwritten by the next call.
+    """
+
+    def __init__(self):
+        self.original = None
+        self._resized = None
+        self._gray = None
+
+    def read(self, cap):
+        """
+        Decodes the next frame into the reused buffer.
+
+        Returns:
+            tuple: (ok, frame) like cv2.VideoCapture.read().
+        """
+        ok, frame = cap.read(self.original)
+        if ok and isinstance(cap, cv2.VideoCapture):
+            # OpenCV decodes into the array it was given if the size matches
+            # and returns a new one otherwise. Other sources own their buffers.
+            self.original = frame
+        return ok, frame
+
+    def resize(self, frame, width, height):
+        """Resizes a frame to (height, width), or returns it if it already is."""
+        if frame.shape[:2] == (height, width):
+            return frame
+        shape = (height, width) + frame.shape[2:]
+        if self._resized is None or self._resized.shape != shape:
+            self._resized = np.empty(shape, dtype=np.uint8)
+        return cv2.resize(frame, (width, height), dst=self._resized)
+
+    def to_gray(self, frame):
+        """Converts a BGR frame to grayscale, or returns it if it already is."""
+        if frame.ndim == 2:
+            return frame
+        if self._gray is None or self._gray.shape != frame.shape[:2]:
+            self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+
+class FramePrefetcher:
+    """
+    Decodes, resizes and grayscale-converts frames on a background thread
+    into a bounded queue, so decoding overlaps with painting. OpenCV releases
+    the GIL while decoding, so the two stages genuinely run in parallel.
+
+    Each queued item is a tuple (frame_index, original_frame, resized_frame,
+    grayscale_frame, stage_times), where stage_times holds the seconds spent
+    on (decode, resize, convert) for that frame. None marks the end of the
+    stream.
+
+    Frames are decoded and converted into a ring of FrameBuffers, so a
+    queued frame stays valid until the renderer asks for the one after it.
+
+    seek() moves decoding anywhere in the video; frames decoded before it
+    are never returned afterwards.
+
+    Attributes:
+        size (tuple): (width, height) frames are resized to.
+        depth (int): Maximum number of frames decoded ahead.
+        producer_stall (float): Seconds the decoder spent waiting for room
+            in the queue (renderer is the bottleneck).
+        consumer_stall (float): Seconds the renderer spent waiting for a
+            frame (decoder is the bottleneck).
+        frames_decoded (int): Frames produced so far.
+        frames_skipped (int): Frames passed over with grab() without being
+            decoded to images, after skip_to().
+        seeks (int): Seeks performed after skip_to(..., seek=True) or seek().
+        error (str or None): Why decoding stopped before the end of the
+            stream, if it did.
+    """
+
+    def __init__(self, cap, width, height, depth=4, index=None):
+        """
+        Args:
+            cap (cv2.VideoCapture): An opened capture, or a compatible source
+                such as frame_source.FFmpegFrameSource. The prefetcher owns
+                it once started; do not read from it on another thread.
+            width (int): Width to resize frames to.
+            height (int): Height to resize frames to.
+            depth (int): Maximum number of frames decoded ahead.
+            index (seek_index.KeyframeIndex, optional): Keyframes used to
+                seek with as little decoding as possible.
+        """
+        self.cap = cap
+        self.index = index
+        self.size = (width, height)
+        self.depth = max(depth, 1)
+        self.producer_stall = 0.0
+        self.consumer_stall = 0.0
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.seeks = 0
+        self.error = None
+        self._skip_request = None
+        self._seek_request = None
+        # Bumped by every seek(); items from earlier generations are stale
+        self._generation = 0
+        self._occupancy_total = 0
+        self._occupancy_samples = 0
+        self._queue = queue.Queue(maxsize=self.depth)
+        # Frames in the queue, plus the one being rendered and the one being
+        # decoded, each need their own buffers
+        self._buffers = [FrameBuffers() for _ in range(self.depth + 2)]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-prefetcher", daemon=True)
+
+    def start(self):
+        """Starts decoding ahead from the capture's current position."""
+        self._thread.start()
+
+    def stop(self):
+        """Stops the decoder thread and waits for it to exit."""
+        self._stop.set()
+        # Unblock a producer waiting on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def set_size(self, width, height):
+        """
+        Changes the size frames are resized to. Frames already in the queue
+        keep the old size.
+        """
+        self.size = (width, height)
+
+    def skip_to(self, frame_index, seek=False):
+        """
+        Asks the decoder to jump ahead so the next produced frame is
+        frame_index. Frames already in the queue are unaffected.
+
+        Args:
+            frame_index (int): The frame to resume decoding at.
+            seek (bool): Seek the capture instead of grabbing through the
+                intermediate frames. Seeking usually means decoding forward
+                from the previous keyframe, so it only pays off for large gaps.
+        """
+        self._skip_request = (frame_index, seek)
+
+    def seek(self, frame_index):
+        """
+        Moves decoding to frame_index, forwards or backwards. Frames queued
+        before the call are dropped, so the next get() returns frame_index
+        (or the end of the stream).
+        """
+        self._generation += 1
+        self._skip_request = None
+        self._seek_request = (frame_index, self._generation)
+
+    def get(self):
+        """
+        Returns the next decoded frame, waiting if none is ready yet.
+
+        Returns:
+            tuple or None: (frame_index, original_frame, resized_frame,
+            grayscale_frame, stage_times), or None once the stream has ended.
+        """
+        self._occupancy_total += self._queue.qsize()
+        self._occupancy_samples += 1
+        while True:
+            try:
+                generation, item = self._queue.get_nowait()
+            except queue.Empty:
+                wait_start = time.perf_counter()
+                try:
+                    generation, item = self._wait_for_item()
+                finally:
+                    self.consumer_stall += time.perf_counter() - wait_start
+                if item is None and generation is None:
+                    # The decoder thread is gone; nothing more will arrive
+                    return None
+            if generation == self._generation:
+                return item
+
+    def average_occupancy(self):
+        """Returns the average number of ready frames seen by get()."""
+        if self._occupancy_samples == 0:
+            return 0.0
+        return self._occupancy_total / self._occupancy_samples
+
+    def _wait_for_item(self):
+        # Wake up periodically to notice a decoder thread that has died
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if not self._thread.is_alive():
+                    return None, None
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        wait_start = time.perf_counter()
+        # Wake up periodically so stop() is noticed even if nobody consumes,
+        # and give up on the frame once a seek has made it stale
+        while not self._stop.is_set() and self._seek_request is None:
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.producer_stall += time.perf_counter() - wait_start
+
+    def _run(self):
+        try:
+            self._decode()
+        except (cv2.error, OSError, ValueError) as e:
+            self.error = str(e) or type(e).__name__
+        finally:
+            # End the stream for the renderer, whatever stopped decoding
+            self._put((self._generation, None))
+
+    def _decode(self):
+        frame_index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        next_buffers = 0
+        generation = 0
+        while not self._stop.is_set():
+            seek_request, self._seek_request = self._seek_request, None
+            if seek_request is not None:
+                target_index, generation = seek_request
+                frame_index = seek_capture(self.cap, frame_index, target_index, self.index)
+                self.seeks += 1
+
+            request, self._skip_request = self._skip_request, None
+            if request is not None:
+                target_index, seek = request
+                if target_index > frame_index:
+                    frame_index = self._skip(frame_index, target_index, seek)
+
+            buffers = self._buffers[next_buffers]
+            next_buffers = (next_buffers + 1) % len(self._buffers)
+            decode_start = time.perf_counter()
+            ok, orig_frame = buffers.read(self.cap)
+            if not ok:
+                self._put((generation, None))
+                # Stay around for a seek back into the video
+                while not self._stop.is_set() and self._seek_request is None:
+                    time.sleep(0.01)
+                continue
+            resize_start = time.perf_counter()
+            # Sources that scale or convert in the decoder (FFmpegFrameSource)
+            # deliver frames that need neither step
+            width, height = self.size
+            frame_resized = buffers.resize(orig_frame, width, height)
+            convert_start = time.perf_counter()
+            grayscale_frame = buffers.to_gray(frame_resized)
+            stage_times = (resize_start - decode_start, convert_start - resize_start,
+                           time.perf_counter() - convert_start)
+            self._put((generation, (frame_index, orig_frame, frame_resized, grayscale_frame, stage_times)))
+            self.frames_decoded += 1
+            frame_index += 1
+
+    def _skip(self, frame_index, target_index, seek):
+        if seek:
+            self.seeks += 1
+            return seek_capture(self.cap, frame_index, target_index, self.index)
+        # grab() demuxes and decodes without converting to an image, which
+        # is far cheaper than read() and never rewinds to a keyframe.
+        while frame_index < target_index and not self._stop.is_set():
+            if not self.cap.grab():
+                break
+            self.frames_skipped += 1
+            frame_index += 1
+        return frame_index
+
+
+def decode_into_ring(source, ring_spec, ffmpeg=False, use_index=True, live=False):
+    """
+    Body of the DecodeProcess: decodes, resizes and grayscale-converts frames
+    straight into the shared slots of a FrameRing until asked to stop.
+
+    Files are decoded in order, at most up to the frame index the reader
+    asks for in the WANTED header field, and seek requests are followed.
+    Live sources (webcams) are read as they deliver and never wait.
+    """
+    # Ctrl-C is handled by the renderer, which then stops the decoder
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cv2.setNumThreads(1)
+    ring = FrameRing(**ring_spec)
+    header = ring.header
+    if ffmpeg:
+        cap = FFmpegFrameSource(source, ring.width, ring.height, pix_fmt="bgr24" if ring.color else "gray",
+                                buffers=2)
+    else:
+        cap = cv2.VideoCapture(source)
+    index = None
+    if use_index and not live:
+        index = KeyframeIndex(source)
+        index.start()
+
+    buffers = FrameBuffers()
+    frame_index = 0
+    generation = 0
+    try:
+        while not header[frame_ring.STOP]:
+            if header[frame_ring.SEEK_GENERATION] != generation:
+                generation = int(header[frame_ring.SEEK_GENERATION])
+                frame_index = seek_capture(cap, frame_index, int(header[frame_ring.SEEK_TARGET]), index)
+                header[frame_ring.SEEKS] += 1
+            if not live and frame_index > header[frame_ring.WANTED]:
+                # Far enough ahead of the reader
+                wait_start = time.perf_counter()
+                time.sleep(0.001)
+                header[frame_ring.PRODUCER_STALL_US] += int((time.perf_counter() - wait_start) * 1e6)
+                continue
+
+            decode_start = time.perf_counter()
+            ok, frame = buffers.read(cap)
+            if not ok:
+                header[frame_ring.END_GENERATION] = generation
+                # Stay around for a seek back into the video
+                while not header[frame_ring.STOP] and header[frame_ring.SEEK_GENERATION] == generation:
+                    time.sleep(0.01)
+                continue
+            resize_start = time.perf_counter()
+            width = min(int(header[frame_ring.FRAME_WIDTH]), ring.width)
+            height = min(int(header[frame_ring.FRAME_HEIGHT]), ring.height)
+            bgr, gray = ring.acquire(width, height)
+            if frame.ndim == 2:
+                # FFmpeg already delivered gray frames
+                cv2.resize(frame, (width, height), dst=gray)
+                convert_start = time.perf_counter()
+            elif bgr is not None:
+                cv2.resize(frame, (width, height), dst=bgr)
+                convert_start = time.perf_counter()
+                cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY, dst=gray)
+            else:
+                frame_resized = buffers.resize(frame, width, height)
+                convert_start = time.perf_counter()
+                cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY, dst=gray)
+            ring.publish(frame_index, generation, (resize_start - decode_start, convert_start - resize_start,
+                                                   time.perf_counter() - convert_start))
+            frame_index += 1
+    finally:
+        cap.release()
+        ring.close()
+
+
+class DecodeProcess:
+    """
+    Decodes, resizes and grayscale-converts frames in a separate process, so
+    decoding gets a core of its own instead of competing with painting for
+    the GIL. Frames are handed over through a FrameRing in shared memory and
+    read as NumPy views, without pickling or copying.
+
+    Offers the same interface as FramePrefetcher, so the players can use
+    either. Files are played in order: the decoder works at most 'depth'
+    frames ahead of the renderer. Live sources (webcam indices) are decoded
+    as they arrive and get() returns the newest complete frame, skipping any
+    the renderer was too slow for.
+
+    A returned frame stays valid until the renderer asks for the one after
+    it; the frame size can only shrink below the size the ring was made for.
+
+    Attributes:
+        ring (frame_ring.FrameRing): The shared frame slots.
+        size (tuple): (width, height) frames are resized to.
+        depth (int): Maximum number of frames decoded ahead.
+        live (bool): True for sources read as they deliver.
+        producer_stall (float): Seconds the decoder waited for the renderer.
+        consumer_stall (float): Seconds the renderer waited for a frame.
+        frames_decoded (int): Frames produced so far.
+        frames_skipped (int): Frames passed over after skip_to().
+        seeks (int): Seeks performed by the decoder.
+    """
+
+    def __init__(self, source, width, height, depth=4, color=True, ffmpeg=False, index=True):
+        """
+        Args:
+            source (str or int): A video path or URL, or a webcam index.
+            width (int): Width to resize frames to, and the ring's capacity.
+            height (int): Height to resize frames to, and the ring's capacity.
+            depth (int): Maximum number of frames decoded ahead.
+            color (bool): Keep the resized BGR frames, not just grayscale.
+            ffmpeg (bool): Decode with frame_source.FFmpegFrameSource.
+            index (bool): Build a seek_index.KeyframeIndex in the decoder
+                process for cheaper seeks.
+        """
+        self.size = (width, height)
+        self.depth = max(depth, 1)
+        self.live = not isinstance(source, str)
+        self.producer_stall = 0.0
+        self.consumer_stall = 0.0
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.seeks = 0
+        # The frame being rendered and 'depth' frames ahead, plus the one
+        # being written
+        self.ring = FrameRing(width, height, self.depth + 2, color, create=True)
+        self.ring.header[frame_ring.WANTED] = self.depth - 1
+        self._next_index = 0
+        self._generation = 0
+        self._current = None
+        self._occupancy_total = 0
+        self._occupancy_samples = 0
+        self._process = multiprocessing.Process(
+            target=decode_into_ring, name="frame-decoder", daemon=True,
+            args=(source, self.ring.spec(), ffmpeg, index, self.live))
+
+    def start(self):
+        """Starts the decoder process at the beginning of the video."""
+        self._process.start()
+
+    def stop(self):
+        """Stops the decoder process, waits for it to exit and frees the ring."""
+        if self.ring.header is None:
+            return
+        self._update_stats()
+        self.ring.header[frame_ring.STOP] = 1
+        self._process.join(2.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.ring.close()
+
+    def set_size(self, width, height):
+        """
+        Changes the size frames are resized to, capped to the ring's
+        capacity. Frames already decoded keep the old size.
+        """
+        self.size = (min(width, self.ring.width), min(height, self.ring.height))
+        self.ring.header[frame_ring.FRAME_WIDTH] = self.size[0]
+        self.ring.header[frame_ring.FRAME_HEIGHT] = self.size[1]
+
+    def skip_to(self, frame_index, seek=False):
+        """
+        Asks the decoder to jump ahead so the next returned frame is
+        frame_index. The decoder picks the cheaper of grabbing forward and
+        restarting at a keyframe, so 'seek' is only kept for compatibility.
+        """
+        if not self.live and frame_index > self._next_index:
+            self.frames_skipped += frame_index - self._next_index
+            self.seek(frame_index)
+
+    def seek(self, frame_index):
+        """
+        Moves decoding to frame_index, forwards or backwards. Frames decoded
+        before the call are never returned afterwards.
+        """
+        if self.live:
+            return
+        self._generation += 1
+        self._next_index = frame_index
+        header = self.ring.header
+        header[frame_ring.WANTED] = frame_index + self.depth - 1
+        header[frame_ring.SEEK_TARGET] = frame_index
+        # Written last: the decoder reads the target once it sees the change
+        header[frame_ring.SEEK_GENERATION] = self._generation
+
+    def get(self):
+        """
+        Returns the next decoded frame, waiting if none is ready yet.
+
+        Returns:
+            tuple or None: (frame_index, original_frame, resized_frame,
+            grayscale_frame, stage_times) like FramePrefetcher.get(), or None
+            once the stream has ended. The original frame is not shared
+            between the processes; the resized one stands in for it.
+        """
+        ring = self.ring
+        if self._current is not None:
+            ring.release(self._current)
+            self._current = None
+        if not self.live:
+            # The frame being returned and 'depth' - 1 more may be decoded ahead
+            ring.header[frame_ring.WANTED] = self._next_index + self.depth - 1
+            self._occupancy_total += ring.ready_frames(self._next_index, self._generation)
+            self._occupancy_samples += 1
+        wait_start = None
+        while True:
+            ended = ring.header[frame_ring.END_GENERATION] == self._generation
+            frame = ring.newest() if self.live else ring.find(self._next_index, self._generation)
+            if frame is not None:
+                break
+            if ended or not self._process.is_alive():
+                return None
+            if wait_start is None:
+                wait_start = time.perf_counter()
+            time.sleep(0.0005)
+        if wait_start is not None:
+            self.consumer_stall += time.perf_counter() - wait_start
+        self._current = frame
+        self._next_index = frame.index + 1
+        if not self.live:
+            ring.header[frame_ring.WANTED] = self._next_index + self.depth - 1
+        self._update_stats()
+        resized = frame.bgr if frame.bgr is not None else frame.gray
+        return frame.index, resized, resized, frame.gray, frame.stage_times
+
+    def average_occupancy(self):
+        """Returns the average number of ready frames seen by get()."""
+        if self._occupancy_samples == 0:
+            return 0.0
+        return self._occupancy_total / self._occupancy_samples
+
+    def report(self):
+        """Returns a one-line summary of the frame transport for the exit summary."""
+        return self.ring.report()
+
+    def _update_stats(self):
+        header = self.ring.header
+        self.frames_decoded = int(header[frame_ring.LATEST])
+        self.seeks = int(header[frame_ring.SEEKS])
+        self.producer_stall = int(header[frame_ring.PRODUCER_STALL_US]) / 1e6
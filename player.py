@@ -6,9 +6,20 @@ import time
 import numpy as np
 import color
 import youtube_utils
+import youtube_cache
 import painter # Your painter module
-import subprocess
-import pygame
+import ansi
+import container
+from palette_cache import PaletteCache
+from palette_worker import PaletteWorker
+from audio import AudioStream
+from frame_source import FFmpegFrameSource
+from pipeline import FrameBuffers
+from stats import StageTimer, NullTimer
+from overlay import Overlay
+from quality import QualityController, build_ladder, describe
+from seek_index import KeyframeIndex, seek_capture, seek_lead
+from controls import PlaybackControls, CursesKeys, TerminalKeys, POLL_INTERVAL
 
 # --- Argument Parsing (No changes) ---
 parser = argparse.ArgumentParser(description='ASCII Player')
@@ -18,7 +29,23 @@ parser.add_argument("--show", action='store_true', help="show the original video
 parser.add_argument("--inv", action='store_true', help="invert the shades")
 parser.add_argument("--color", action='store_true', help="print colors if available (slows things down)")
 parser.add_argument("--embed", type=str, default="", help="pass a txt file to embed as watermark")
-parser.add_argument("video", type=str, help="path to video or webcam index")
+parser.add_argument("--title", type=str, default="", help="show a title box at the top of the screen")
+parser.add_argument("--incremental", action='store_true', help="only redraw the parts of the frame that changed")
+parser.add_argument("--threshold", type=int, default=0, help="pixel change ignored as noise by --incremental")
+parser.add_argument("--ansi", action='store_true', help="write frames as raw ANSI escapes instead of using curses")
+parser.add_argument("--ansi-bits", type=int, default=8, help="bits per color channel in --ansi color mode")
+parser.add_argument("--ffmpeg", action='store_true', help="decode with FFmpeg straight to the render size (faster for HD/4K sources)")
+parser.add_argument("--no-palette-cache", action='store_true', help="always rebuild the color palette instead of using the on-disk cache")
+parser.add_argument("--no-youtube-cache", action='store_true', help="stream YouTube videos instead of downloading them to the on-disk cache")
+parser.add_argument("--refresh-palette", action='store_true', help="discard the cached palette for this video and rebuild it")
+parser.add_argument("--adaptive-palette", action='store_true', help="rebuild the color palette in the background after scene cuts")
+parser.add_argument("--adaptive", action='store_true', help="lower the width or drop color when frames take too long, and raise them again when there is headroom")
+parser.add_argument("--min-width", type=int, default=40, help="narrowest width --adaptive may fall back to")
+parser.add_argument("--exact-seek", action='store_true', help="seek to the exact frame instead of snapping to a nearby keyframe")
+parser.add_argument("--stats", action='store_true', help="show per-stage timings and dropped frames in a HUD line")
+parser.add_argument("--trace", type=str, default="", help="write per-frame stage timings to this file")
+parser.add_argument("--trace-format", type=str, default="jsonl", choices=["jsonl", "chrome"], help="format of the --trace file")
+parser.add_argument("video", type=str, help="path to video, pre-rendered container or webcam index")
 args = parser.parse_args()
 
 video_path_arg = args.video
@@ -31,110 +58,300 @@ width = args.width
 if args.inv:
     painter.invert_chars()
 
-# --- Temporary file for extracted audio ---
-TEMP_AUDIO_FILE = "temp_audio_for_ascii_player.mp3"
-audio_extracted = False
+launch_time = time.perf_counter()
+audio = None
+time_to_first_frame = None
 fps = 0 # Initialize fps to avoid NameError in finally block
+incremental_painter = None
+palette_worker = None
+ansi_screen = None
+reader = None
+cap = None
+quality = None
+keyframe_index = None
+controls = None
+# Timing calls are no-ops unless --stats or --trace is given
+timer = StageTimer(args.trace or None, args.trace_format) if args.stats or args.trace else NullTimer()
 
 try:
     # --- Video Path and Audio Extraction ---
     if isinstance(video_path_arg, str):
-        if youtube_utils.is_youtube_url(video_path_arg):
+        if container.is_container(video_path_arg):
+            # Frames are pre-rendered; the source video is only needed for audio
+            reader = container.ContainerReader(video_path_arg)
+            video = reader.audio_path
+            if youtube_utils.is_youtube_url(video):
+                video = youtube_cache.resolve(video, reader.width, not args.no_youtube_cache)
+        elif youtube_utils.is_youtube_url(video_path_arg):
             print("Downloading YouTube video...")
-            video = youtube_utils.get_youtube_video_url(video_path_arg)
+            video = youtube_cache.resolve(video_path_arg, args.width, not args.no_youtube_cache)
         elif os.path.isfile(video_path_arg):
             video = video_path_arg
         else:
             print("failed to find video at:", args.video)
             exit()
-        
-        # --- NEW: Extract audio using FFmpeg ---
-        print("Extracting audio... (this may take a moment)")
-        command = [
-            'ffmpeg', '-i', video, '-q:a', '0', '-map', 'a', TEMP_AUDIO_FILE, '-y'
-        ]
-        # Use DEVNULL to hide FFmpeg's console output
-        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if result.returncode == 0 and os.path.exists(TEMP_AUDIO_FILE):
-            audio_extracted = True
-        else:
-            print("Warning: Could not extract audio. FFmpeg might not be installed, or the video may have no audio.")
+
+        # --- Audio is decoded by FFmpeg and streamed while playing ---
+        audio = AudioStream(video)
     else:
         video = video_path_arg # For webcam
 
     # --- Video Capture and Initial Frame Processing ---
-    cap = cv2.VideoCapture(video)
-    ok, frame = cap.read()
-    if not ok:
-        print("could not extract frame from video")
-        exit()
+    if reader:
+        width, height = reader.width, reader.height
+        source_fps = reader.fps
+        total_frames = reader.frame_count
+    else:
+        if args.ffmpeg and isinstance(video, str):
+            # FFmpeg scales (and converts to gray in monochrome mode) while decoding
+            cap = FFmpegFrameSource(video, width, pix_fmt="bgr24" if args.color else "gray")
+        else:
+            cap = cv2.VideoCapture(video)
+        ok, frame = cap.read()
+        if not ok:
+            print("could not extract frame from video")
+            exit()
 
-    ratio = width / frame.shape[1]
-    height = int(frame.shape[0] * ratio * 3 / 5)
+        if isinstance(cap, FFmpegFrameSource):
+            height = cap.height
+        else:
+            ratio = width / frame.shape[1]
+            height = int(frame.shape[0] * ratio * 3 / 5)
+        # Playback runs at --fps; the source rate maps frames to seek times
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or args.fps
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    # --- Curses and Pygame Setup ---
-    curses.initscr()
+    # --- Output Backend Setup ---
     curses_color = None
-    if args.color and curses.has_colors():
-        curses.start_color()
-        curses.use_default_colors()
-        curses_color = color.CursesColor()
-    window = curses.newwin(height, width, 0, 0)
-
-    # --- NEW: Initialize Pygame mixer and play audio if extracted ---
-    if audio_extracted:
-        pygame.mixer.init()
-        pygame.mixer.music.load(TEMP_AUDIO_FILE)
-        pygame.mixer.music.play()
-
-    # --- Embedding Setup (No changes) ---
-    embedding = ""
-    embedding_height = 0
+    if args.ansi:
+        ansi_screen = ansi.AnsiScreen(color_bits=args.ansi_bits)
+        ansi_screen.start()
+    else:
+        curses.initscr()
+        if args.color and curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            if reader:
+                if reader.is_color:
+                    curses_color = color.CursesColor(palette=reader.palette)
+                    pair_lookup = curses_color.get_colors(reader.palette[np.newaxis])[0]
+            else:
+                # --- Palette Cache (local files only) ---
+                palette_cache = None
+                cached_palette = None
+                if not args.no_palette_cache and isinstance(video, str) and os.path.isfile(video):
+                    palette_cache = PaletteCache()
+                    cache_key = palette_cache.key(video, width, height, color.available_colors())
+                    if args.refresh_palette:
+                        palette_cache.invalidate(cache_key)
+                    cached_palette = palette_cache.load(cache_key)
+
+                if cached_palette:
+                    curses_color = color.CursesColor(palette=cached_palette["palette"],
+                                                     index_cube=cached_palette["index_cube"])
+                else:
+                    sample_pixels = None
+                    if isinstance(video, str):
+                        sample_pixels = color.sample_video_pixels(cap, width, height)
+                    if sample_pixels is None:
+                        sample_pixels = cv2.resize(frame, (width, height))
+                    curses_color = color.CursesColor(sample_pixels)
+                    if palette_cache:
+                        palette_cache.store(cache_key, curses_color.palette_bgr, curses_color.index_cube)
+        window = curses.newwin(height, width, 0, 0)
+
+    # --- Start streaming audio ---
+    if audio and not audio.start():
+        print("Warning: Could not start audio. FFmpeg might not be installed.")
+        audio = None
+
+    # --- Overlay Setup (watermark, title and stats line, merged into each frame) ---
+    overlay = Overlay(width, height)
     if args.embed:
         if os.path.isfile(args.embed):
             with open(args.embed, "r", encoding='utf-8') as f:
-                embedding = f.read()
-            embedding_height = len(embedding.split("\n"))
+                overlay.add_text(f.read(), "bottom-right")
         else:
             print(f"Warning: Embedding file not found at {args.embed}")
+    if args.title:
+        overlay.add_box(args.title, "top-center")
+    if not overlay.active and not args.stats:
+        overlay = None
+
+    # --- Scene-Adaptive Palette ---
+    if args.adaptive_palette and curses_color and not reader:
+        palette_worker = PaletteWorker(curses_color.num_custom_colors)
+        palette_worker.start()
+
+    # --- Incremental Redraw Setup ---
+    screen = painter
+    if args.incremental:
+        incremental_painter = painter.IncrementalPainter(args.threshold)
+        screen = incremental_painter
+
+    # --- Adaptive Quality (frame size and color mode follow the render budget) ---
+    color_mode = args.color and (ansi_screen is not None or curses_color is not None)
+    if args.adaptive:
+        # Pre-rendered frames have a fixed size; only color can be dropped
+        min_width = width if reader else args.min_width
+        quality = QualityController(build_ladder(width, height, color_mode, min_width), args.fps)
+
+    # --- Keyframe Index (built in the background, cached per file) ---
+    if not reader and isinstance(video, str) and os.path.isfile(video):
+        keyframe_index = KeyframeIndex(video)
+        keyframe_index.start()
+
+    # --- Playback Controls (pause and seek keys, read without blocking) ---
+    controls = PlaybackControls(TerminalKeys() if ansi_screen else CursesKeys(window),
+                                total_frames / source_fps if total_frames > 0 else 0.0)
 
     # --- Main Rendering Loop ---
+    # Decode, resize and convert into the same arrays every frame
+    frame_buffers = FrameBuffers()
     frame_count = 0
+    # Index of the next frame to show. The first one was read for its size,
+    # but palette sampling may have rewound the capture since
+    if reader:
+        frame_index = 0
+    elif isinstance(video, str):
+        frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    else:
+        frame_index = 1
+    # A seek while paused still shows the frame it lands on
+    show_one = False
     frames_per_ms = args.fps / 1000
     start = time.perf_counter_ns() // 1000000
 
     while True:
-        ok, orig_frame = cap.read()
-        if not ok:
+        for command, value in controls.poll(max(frame_index - 1, 0) / source_fps):
+            if command == "pause":
+                if audio:
+                    audio.pause()
+            elif command == "resume":
+                if audio:
+                    audio.resume()
+                # Paused time does not count towards pacing or the frame rate
+                start += int(value * 1000)
+            elif command == "seek":
+                target_frame = min(int(value * source_fps), max(total_frames - 1, 0))
+                if keyframe_index and not args.exact_seek:
+                    # Half a short seek away from the target is close enough
+                    target_frame = keyframe_index.snap(target_frame, frame_index - 1, int(source_fps * 2.5),
+                                                       seek_lead(cap))
+                if reader:
+                    frame_index = target_frame
+                else:
+                    frame_index = seek_capture(cap, frame_index, target_frame, keyframe_index)
+                if audio:
+                    audio.seek(frame_index / source_fps)
+                show_one = controls.paused
+        if controls.quit:
             break
+        if controls.paused and not show_one:
+            time.sleep(POLL_INTERVAL)
+            continue
 
-        frame_resized = cv2.resize(orig_frame, (width, height))
-        grayscale_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
-        
-        if args.show:
-            cv2.imshow("frame", orig_frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+        timer.begin_frame()
+        frame_start = time.perf_counter()
+        if args.stats:
+            overlay.set_status(timer.hud_text() + controls.hud_text())
+        if reader:
+            if frame_index >= reader.frame_count:
                 break
-
-        if args.color and curses_color:
-            painter.paint_color_screen(window, grayscale_frame, frame_resized, width, height, curses_color)
+            chars, palette_indices = reader.read_frame(frame_index)
+            timer.lap("decode")
+            use_color = color_mode and palette_indices is not None
+            if ansi_screen:
+                colors = reader.palette[palette_indices] if use_color else None
+                if overlay is not None:
+                    chars, colors = overlay.apply(chars, colors)
+                ansi_screen.write_frame(ansi_screen.render_chars(chars, colors))
+            else:
+                pair_ids = pair_lookup[palette_indices] if curses_color and use_color else None
+                if incremental_painter:
+                    incremental_painter.paint(window, chars, chars, pair_ids, overlay)
+                else:
+                    if overlay is not None:
+                        chars, pair_ids = overlay.apply(chars, pair_ids)
+                    if pair_ids is not None:
+                        painter.paint_color_chars(window, chars, pair_ids)
+                    else:
+                        painter.paint_chars(window, chars)
         else:
-            painter.paint_screen(window, grayscale_frame, width, height)
+            ok, orig_frame = frame_buffers.read(cap)
+            if not ok:
+                break
+            timer.lap("decode")
+
+            # Frames from FFmpegFrameSource arrive at the render size already
+            frame_resized = frame_buffers.resize(orig_frame, width, height)
+            timer.lap("resize")
+            grayscale_frame = frame_buffers.to_gray(frame_resized)
+            timer.lap("convert")
 
-        if embedding:
-            # Note: The original 'paint_embedding' expected bytes. Assuming it's meant to handle strings.
-            # If it needs bytes, use embedding.encode('utf-8')
-            painter.paint_embedding(window, embedding.encode('utf-8'), embedding_height, width, height)
+            if args.show:
+                cv2.imshow("frame", orig_frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+
+            if ansi_screen:
+                if color_mode:
+                    ansi_screen.paint_color_screen(grayscale_frame, frame_resized, overlay)
+                else:
+                    ansi_screen.paint_screen(grayscale_frame, overlay)
+            elif color_mode and curses_color:
+                if palette_worker:
+                    # Swap in a rebuilt palette between frames, never waiting for one
+                    new_palette = palette_worker.poll()
+                    if new_palette:
+                        curses_color.set_palette(*new_palette)
+                        if incremental_painter:
+                            # Cells keep their pixels but their pair ids now mean other colors
+                            incremental_painter.reset()
+                    palette_worker.submit(frame_resized)
+                screen.paint_color_screen(window, grayscale_frame, frame_resized, width, height, curses_color,
+                                          overlay)
+            else:
+                screen.paint_screen(window, grayscale_frame, width, height, overlay)
+        timer.lap("paint")
         
         # FPS Limiter Logic
+        sleep_start = time.perf_counter()
         elapsed = (time.perf_counter_ns() // 1000000) - start
         supposed_frame_count = frames_per_ms * elapsed
-        if frame_count > supposed_frame_count:
+        if frame_count > supposed_frame_count and not show_one:
             sleep_duration_ms = (frame_count - supposed_frame_count) / frames_per_ms
             time.sleep(sleep_duration_ms / 1000)
+        slept = time.perf_counter() - sleep_start
+        timer.lap("sleep")
 
-        window.refresh()
+        if not ansi_screen:
+            window.refresh()
+        timer.lap("refresh")
+        timer.end_frame()
+        controls.frame_shown()
+        show_one = False
+        if frame_count == 0:
+            time_to_first_frame = time.perf_counter() - launch_time
         frame_count += 1
+        frame_index += 1
+
+        if quality:
+            new_level = quality.update(time.perf_counter() - frame_start - slept)
+            if new_level:
+                width, height, color_mode = new_level
+                # Everything sized to the frame follows the new geometry
+                if overlay is not None:
+                    overlay.resize(width, height)
+                if incremental_painter:
+                    incremental_painter.reset()
+                if ansi_screen:
+                    ansi_screen.clear()
+                else:
+                    window.erase()
+                    window.refresh()
+                    window = curses.newwin(height, width, 0, 0)
+                    controls.keys.set_window(window)
         
         # Calculate FPS for display
         elapsed_time_seconds = (time.perf_counter_ns() // 1000000 - start) / 1000
@@ -143,13 +360,51 @@ try:
 
 finally:
     # --- Cleanup ---
+    if controls:
+        controls.close()
+    timer.close()
+    if palette_worker:
+        palette_worker.stop()
     cv2.destroyAllWindows()
-    curses.endwin()
+    if reader:
+        reader.close()
+    if cap is not None:
+        cap.release()
+    if ansi_screen:
+        ansi_screen.stop()
+    else:
+        curses.endwin()
 
-    # NEW: Quit pygame and remove temporary audio file
-    if audio_extracted:
-        pygame.mixer.quit()
-        if os.path.exists(TEMP_AUDIO_FILE):
-            os.remove(TEMP_AUDIO_FILE)
+    if audio:
+        audio.stop()
 
     print(f"Finished. Average playback was around {int(fps)} FPS.")
+    if time_to_first_frame is not None:
+        print(f"Time to first frame: {time_to_first_frame * 1000:.0f} ms", end="")
+        if audio and audio.first_chunk_latency is not None:
+            print(f", audio started after {audio.first_chunk_latency * 1000:.0f} ms", end="")
+        print(".")
+    if timer.frames:
+        print(f"Stage timings:{timer.hud_text()}")
+        if args.trace:
+            print(f"Per-frame trace written to {args.trace}.")
+    if controls and controls.report():
+        print(f"Seeking: {controls.report()}", end="")
+        if audio and audio.seek_latencies:
+            print(f", audio followed after {sum(audio.seek_latencies) / len(audio.seek_latencies) * 1000:.0f} ms",
+                  end="")
+        print(f"; {keyframe_index.report()}." if keyframe_index else ".")
+    if palette_worker:
+        print(f"Adaptive palette: {palette_worker.cuts_detected} scene cuts, "
+              f"{palette_worker.palettes_built} palettes rebuilt "
+              f"(last took {palette_worker.last_build_seconds:.2f}s).")
+    if quality:
+        print(f"Adaptive quality: {len(quality.changes)} changes, finished at {describe(quality.level)}.")
+        for line in quality.report():
+            print(line)
+    if incremental_painter:
+        print(f"Incremental redraw: {incremental_painter.total_redrawn} cells redrawn, "
+              f"{incremental_painter.total_skipped} skipped.")
+    if ansi_screen and ansi_screen.frames_written:
+        print(f"ANSI output: {int(ansi_screen.average_bytes())} bytes per frame on average "
+              f"({ansi_screen.total_bytes / 1024:.0f} KiB total).")
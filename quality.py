@@ -0,0 +1,208 @@
+import collections
+import time
+
+# Cost of a color frame relative to a monochrome one of the same size, used
+# until both have been measured
+COLOR_COST_FACTOR = 2.0
+
+QualityLevel = collections.namedtuple("QualityLevel", ["width", "height", "color"])
+
+
+def build_ladder(width, height, use_color, min_width=40, step=0.8, color_steps=2):
+    """
+    Lists quality levels from best to cheapest.
+
+    Widths shrink by 'step' down to 'min_width', heights keep the aspect
+    ratio. In color mode the first 'color_steps' width reductions keep color;
+    after that color is dropped and the width keeps shrinking in monochrome,
+    so every level costs less than the one before.
+
+    Args:
+        width (int): The requested width in characters.
+        height (int): The height belonging to that width.
+        use_color (bool): Whether playback starts in color.
+        min_width (int): Narrowest width to fall back to.
+        step (float): Factor between consecutive widths.
+        color_steps (int): Width reductions tried before dropping color.
+
+    Returns:
+        list: QualityLevel tuples, best first.
+    """
+    widths = [width]
+    while int(widths[-1] * step) >= min_width and int(widths[-1] * step) < widths[-1]:
+        widths.append(int(widths[-1] * step))
+    levels = []
+    color_widths = widths[:color_steps + 1] if use_color else []
+    for level_width in color_widths:
+        levels.append(QualityLevel(level_width, max(round(height * level_width / width), 1), True))
+    for level_width in widths[max(len(color_widths) - 1, 0):]:
+        levels.append(QualityLevel(level_width, max(round(height * level_width / width), 1), False))
+    return levels
+
+
+class QualityController:
+    """
+    Closed-loop control of render quality to hold a target frame rate.
+
+    The player reports how long each frame kept it busy (excluding the time
+    it slept to pace playback). The first 'settle' frames after each change
+    are left out, since they also pay for the change itself (a full redraw,
+    a new window, queued frames resized again). Once a full window of frames
+    after that averages over 'high_water' of the frame budget, quality drops
+    one level. Quality goes back up only when the current level runs under
+    'low_water' of the budget, the better level is expected to fit under it
+    too, and the current level has been held for 'upgrade_hold' frames. The expected cost is the current cost scaled by
+    the ratio measured the last time the player moved between the two levels
+    (or by their cell counts and the color factor before that, and never
+    below 1 for a better level), so it follows the content getting cheaper
+    or more expensive. A level that had
+    to be left again right after an upgrade doubles that hold, so the
+    controller settles instead of oscillating between two levels.
+
+    Attributes:
+        levels (list): The QualityLevel ladder, best first.
+        index (int): Position of the current level in the ladder.
+        changes (list): One (seconds since start, old level, new level,
+            average busy ms) tuple per change.
+    """
+
+    def __init__(self, levels, fps, window=30, high_water=0.9, low_water=0.7, upgrade_hold=90,
+                 futile_ratio=0.9, settle=15):
+        """
+        Args:
+            levels (list): QualityLevel ladder from build_ladder().
+            fps (float): The frame rate to hold.
+            window (int): Frames averaged per decision.
+            high_water (float): Budget fraction that triggers a downgrade.
+            low_water (float): Budget fraction an upgrade must fit under.
+            upgrade_hold (int): Frames to stay at a level before upgrading.
+            futile_ratio (float): Stop stepping down once a step down left
+                more than this fraction of the cost.
+            settle (int): Frames ignored after each change.
+        """
+        self.levels = levels
+        self.index = 0
+        self.budget = 1.0 / fps
+        self.window = window
+        self.high_water = high_water
+        self.low_water = low_water
+        self.upgrade_hold = upgrade_hold
+        self.futile_ratio = futile_ratio
+        self.settle = settle
+        self.changes = []
+        self._initial_hold = upgrade_hold
+        self._samples = collections.deque(maxlen=window)
+        self._frames_at_level = 0
+        self._settle_left = 0
+        self._last_upgrade_from = None
+        # Measured cost ratios between neighbouring levels, keyed (to, from)
+        self._ratios = {}
+        self._previous = None
+        self._level_seconds = collections.defaultdict(float)
+        self._start = time.perf_counter()
+        self._level_start = self._start
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def update(self, busy_seconds):
+        """
+        Records one frame and decides whether to change quality.
+
+        Args:
+            busy_seconds (float): Time the frame took, excluding pacing sleeps.
+
+        Returns:
+            QualityLevel or None: The level to switch to, or None to keep
+            the current one.
+        """
+        self._frames_at_level += 1
+        if self._settle_left:
+            self._settle_left -= 1
+            return None
+        self._samples.append(busy_seconds)
+        if len(self._samples) < self.window:
+            return None
+        average = sum(self._samples) / len(self._samples)
+        if self._previous is not None:
+            # First full window since the change: learn what it did to the cost
+            previous_index, previous_average = self._previous
+            self._ratios[(self.index, previous_index)] = average / max(previous_average, 1e-9)
+            self._ratios[(previous_index, self.index)] = previous_average / max(average, 1e-9)
+            self._previous = None
+
+        # If the last step down saved almost nothing, something other than
+        # the render size (usually decoding) limits the frame rate
+        futile = self._ratios.get((self.index, self.index - 1), 0.0) > self.futile_ratio
+        if average > self.budget * self.high_water and self.index + 1 < len(self.levels) and not futile:
+            if self._last_upgrade_from == self.index + 1 and self._frames_at_level < 2 * self.upgrade_hold:
+                # The upgrade did not hold; wait longer before trying again
+                self.upgrade_hold *= 2
+            self._last_upgrade_from = None
+            return self._switch(self.index + 1, average)
+
+        upgrade_room = average < self.budget * self.low_water
+        if self.index > 0 and upgrade_room and self._frames_at_level >= self.upgrade_hold:
+            if self._estimate(self.index - 1, average) < self.budget * self.low_water:
+                self._last_upgrade_from = self.index
+                return self._switch(self.index - 1, average)
+        if self._frames_at_level >= 4 * self.upgrade_hold:
+            # Stable for a long time: forget earlier oscillation
+            self.upgrade_hold = max(self.upgrade_hold // 2, self._initial_hold)
+        return None
+
+    def _estimate(self, index, current_cost):
+        if (index, self.index) in self._ratios:
+            ratio = self._ratios[(index, self.index)]
+        else:
+            current = self.level
+            target = self.levels[index]
+            ratio = (target.width * target.height) / (current.width * current.height)
+            if target.color and not current.color:
+                ratio *= COLOR_COST_FACTOR
+        if index < self.index:
+            # A better level never costs less, whatever a noisy window said
+            ratio = max(ratio, 1.0)
+        return current_cost * ratio
+
+    def _switch(self, index, average):
+        now = time.perf_counter()
+        old = self.level
+        self._level_seconds[old] += now - self._level_start
+        self._level_start = now
+        self._previous = (self.index, average)
+        self.index = index
+        self.changes.append((now - self._start, old, self.level, average * 1000))
+        self._samples.clear()
+        self._frames_at_level = 0
+        self._settle_left = self.settle
+        return self.level
+
+    def time_at_levels(self):
+        """
+        Returns:
+            list: (QualityLevel, seconds) for every level played, best first.
+        """
+        seconds = dict(self._level_seconds)
+        seconds[self.level] = seconds.get(self.level, 0.0) + time.perf_counter() - self._level_start
+        return [(level, seconds[level]) for level in self.levels if level in seconds]
+
+    def report(self):
+        """
+        Returns:
+            list: Lines describing every change and the time spent per level.
+        """
+        lines = []
+        for elapsed, old, new, average_ms in self.changes:
+            direction = "down" if self.levels.index(new) > self.levels.index(old) else "up"
+            lines.append(f"  {elapsed:7.1f}s {direction:4} {describe(old)} -> {describe(new)} "
+                         f"(frames took {average_ms:.1f} ms, budget {self.budget * 1000:.1f} ms)")
+        total = sum(seconds for _, seconds in self.time_at_levels()) or 1.0
+        for level, seconds in self.time_at_levels():
+            lines.append(f"  {describe(level)}: {seconds:.1f}s ({seconds * 100 / total:.0f}%)")
+        return lines
+
+
+def describe(level):
+    return f"{level.width}x{level.height} {'color' if level.color else 'mono'}"
@@ -5,11 +5,11 @@ import cv2
 import curses
 import time
 import argparse
-import pyximport
-pyximport.install()
 
-from painter import paint_screen, paint_embedding, invert_chars
-from picamera2 import Picamera2
+from painter import paint_screen, invert_chars, IncrementalPainter
+from camera import Picamera2Source, StubCamera
+from stats import StageTimer, NullTimer
+from overlay import Overlay
 
 parser = argparse.ArgumentParser(description='ASCII Player for Raspberry Pi')
 parser.add_argument("--width", type=int, default=120,
@@ -20,6 +20,20 @@ parser.add_argument("--show", action="store_true",
 parser.add_argument("--inv", action="store_true", help="Invert the shades")
 parser.add_argument("--embed", type=str, default="",
                     help="pass a txt file to embed as watermark")
+parser.add_argument("--incremental", action="store_true",
+                    help="Only redraw the parts of the frame that changed")
+parser.add_argument("--threshold", type=int, default=0,
+                    help="Pixel change ignored as noise by --incremental")
+parser.add_argument("--stats", action="store_true",
+                    help="Show per-stage timings in a HUD line")
+parser.add_argument("--trace", type=str, default="",
+                    help="Write per-frame stage timings to this file")
+parser.add_argument("--trace-format", type=str, default="jsonl",
+                    choices=["jsonl", "chrome"], help="Format of the --trace file")
+parser.add_argument("--capture", type=str, default="luma", choices=["luma", "rgb"],
+                    help="Use the Y plane of a small YUV stream (luma) or resize full RGB frames (rgb)")
+parser.add_argument("--stub-camera", action="store_true",
+                    help="Use a synthetic camera instead of Picamera2 (for testing off the Pi)")
 
 args = parser.parse_args()
 
@@ -27,70 +41,75 @@ width = args.width
 if args.inv:
     invert_chars()
 
-embedding = ""
-if args.embed != "":
-    with open(args.embed, "r") as f:
-        embedding = f.read()
-embed_height = len(embedding.split("\n"))
-
-# Initialize Picamera2
-picam2 = Picamera2()
-picam2.configure(picam2.create_video_configuration(
-    main={"format": "RGB888", "size": (1920, 1080)}))
-picam2.start()
-picam2.set_controls({
-    # Enable Auto Exposure (ensures proper brightness)
-    "AeEnable": True,
-    # Enable Auto White Balance (ensures proper colors)
-    "AwbEnable": True,
-    # High-quality noise reduction (matches ISP processing)
-    "NoiseReductionMode": 3,
-    "Sharpness": 1.0,         # Match rpicam-still sharpness
-    "Contrast": 1.0,          # Prevent washed-out image
-    "Saturation": 1.2,        # Slight color boost (adjust if needed)
-    "ScalerCrop": (348, 434, 1920, 1080),  # Ensure full frame is used
-    "ColourGains": (1.5, 1.5)  # Try matching CFE color correction
-})
-time.sleep(2)
-
-# Capture first frame to determine height
-frame = picam2.capture_array()
-ratio = width / frame.shape[1]
-height = int(frame.shape[0] * ratio * (3.0 / 5))  # Character height correction
+
+# Initialize the camera; frames arrive gray and at the render size
+camera_class = StubCamera if args.stub_camera else Picamera2Source
+camera = camera_class(width, luma=args.capture == "luma")
+height = camera.height
 
 curses.initscr()
 window = curses.newwin(height, width, 0, 0)
 
+# The watermark and stats line are merged into each frame's characters
+overlay = None
+if args.embed != "" or args.stats:
+    overlay = Overlay(width, height)
+    if args.embed != "":
+        with open(args.embed, "r") as f:
+            overlay.add_text(f.read(), "bottom-right")
+
+incremental_painter = None
+if args.incremental:
+    incremental_painter = IncrementalPainter(args.threshold)
+    paint_screen = incremental_painter.paint_screen
+
+# Timing calls are no-ops unless --stats or --trace is given
+timer = StageTimer(args.trace or None, args.trace_format) \
+    if args.stats or args.trace else NullTimer()
+
 frame_count = 0
 frames_per_ms = args.fps / 1000
 start = time.perf_counter_ns() // 1000000
 
 try:
     while True:
-        frame = picam2.capture_array()
-        frame = cv2.resize(frame, (width, height))
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        timer.begin_frame()
+        # Includes the resize, and in RGB mode the gray conversion
+        frame = camera.read_gray()
+        timer.lap("capture")
 
         if args.show:
             cv2.imshow("frame", frame)
             cv2.waitKey(1)
 
-        paint_screen(window, frame, width, height)
-        paint_embedding(window, embedding.encode(),
-                        embed_height, width, height)
+        if args.stats:
+            overlay.set_status(timer.hud_text())
+        paint_screen(window, frame, width, height, overlay)
+        timer.lap("paint")
 
         elapsed = (time.perf_counter_ns() // 1000000) - start
         supposed_frame_count = frames_per_ms * elapsed
         if frame_count > supposed_frame_count:
             time.sleep((frame_count - supposed_frame_count)
                        * (1 / frames_per_ms) / 1000)
+        timer.lap("sleep")
 
         window.refresh()
+        timer.lap("refresh")
+        timer.end_frame()
         frame_count += 1
 
 finally:
     cv2.destroyAllWindows()
     curses.endwin()
+    timer.close()
     fps = frame_count / (((time.perf_counter_ns() // 1000000) - start) / 1000)
     print("Played on average at %d fps" % fps)
-    picam2.stop()
+    if incremental_painter:
+        print("Redrew %d cells, skipped %d" % (incremental_painter.total_redrawn,
+                                               incremental_painter.total_skipped))
+    if timer.frames:
+        print("Stage timings:%s" % timer.hud_text())
+    if camera.luma:
+        print("Captured the Y plane of a %dx%d YUV420 stream" % camera.lores_size)
+    camera.stop()
@@ -0,0 +1,278 @@
+import bisect
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+import cv2
+import numpy as np
+from palette_cache import file_identity
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ascii_player", "keyframes")
+
+# OpenCV seeks to this many frames before the requested one and decodes
+# forward, so a request closer than that to a keyframe decodes the whole group
+# before it as well
+OPENCV_SEEK_LEAD = 16
+
+# Timestamp framecrc prints for packets without one (AV_NOPTS_VALUE)
+NO_PTS = -(2 ** 63)
+
+
+def read_packets(source):
+    """
+    Lists the presentation timestamps and keyframe flags of the first video
+    stream's packets without decoding them.
+
+    Uses ffprobe when it is installed, and otherwise FFmpeg copying the stream
+    into its framecrc muxer, which prints one line per packet.
+
+    Args:
+        source (str): A file path.
+
+    Returns:
+        tuple: (timestamps in seconds, keyframe flags) as numpy arrays, in
+        decoding order.
+    """
+    command = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'json', source
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True).stdout
+    except OSError:
+        output = None
+    if output is not None:
+        packets = [packet for packet in json.loads(output).get("packets", [])
+                   if packet.get("pts_time") not in (None, "N/A")]
+        return (np.array([float(packet["pts_time"]) for packet in packets]),
+                np.array(["K" in packet.get("flags", "") for packet in packets], dtype=bool))
+
+    command = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', source, '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-'
+    ]
+    output = subprocess.run(command, capture_output=True, check=True, text=True).stdout
+    time_base = 1.0
+    timestamps = []
+    keyframes = []
+    for line in output.splitlines():
+        if line.startswith("#tb 0:"):
+            numerator, _, denominator = line.split(":", 1)[1].strip().partition("/")
+            time_base = int(numerator) / int(denominator)
+            continue
+        if line.startswith("#") or not line.strip():
+            continue
+        # stream, dts, pts, duration, size, hash[, F=flags]; flags are only
+        # printed when they differ from "keyframe"
+        fields = [field.strip() for field in line.split(",")]
+        pts = int(fields[2])
+        if pts == NO_PTS:
+            continue
+        flags = 1
+        for field in fields[6:]:
+            if field.startswith("F="):
+                flags = int(field[2:], 16)
+        timestamps.append(pts * time_base)
+        keyframes.append(bool(flags & 1))
+    return np.array(timestamps), np.array(keyframes, dtype=bool)
+
+
+class KeyframeIndex:
+    """
+    Where a video's keyframes are, so seeks can start decoding at the last
+    keyframe before the target instead of wherever the decoder guesses.
+
+    The index is built from the packet list, which FFmpeg reads without
+    decoding any frames, on a background thread so playback starts right
+    away; until ready() returns True, seek_capture() falls back to the
+    capture's own seeking. Finished indexes are cached on disk, keyed by the
+    file's identity like the palette cache, so each file is indexed once.
+
+    Attributes:
+        frames (numpy.ndarray): Frame numbers of the keyframes, ascending.
+        times (numpy.ndarray): Their timestamps in seconds from the first
+            frame.
+        frame_count (int): Number of frames in the video.
+        build_seconds (float or None): Time spent building or loading.
+        from_cache (bool): True if the index was loaded from the cache.
+    """
+
+    def __init__(self, source, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Args:
+            source (str): Path of the video file.
+            cache_dir (str): Directory holding cached indexes, or None to
+                build the index every time.
+        """
+        self.source = source
+        self.cache_dir = cache_dir
+        self.frames = None
+        self.times = None
+        self.frame_count = 0
+        self.build_seconds = None
+        self.from_cache = False
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="keyframe-index", daemon=True)
+
+    def start(self):
+        """Loads or builds the index in the background."""
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Waits until the index is ready or could not be built. Returns ready()."""
+        self._ready.wait(timeout)
+        return self.ready()
+
+    def ready(self):
+        return self._ready.is_set() and self.frames is not None and len(self.frames) > 0
+
+    def _cache_path(self):
+        identity = file_identity(self.source)
+        return os.path.join(self.cache_dir, hashlib.sha1(identity.encode("utf-8")).hexdigest() + ".npz")
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            path = self._cache_path() if self.cache_dir else None
+            if path and self._load(path):
+                self.from_cache = True
+            else:
+                self.build()
+                if path and self.frames is not None:
+                    self._store(path)
+        except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+            # No index; seeks use the capture's own seeking
+            pass
+        finally:
+            self.build_seconds = time.perf_counter() - start
+            self._ready.set()
+
+    def build(self):
+        """Reads the packet list and derives the keyframe positions."""
+        timestamps, keyframes = read_packets(self.source)
+        if len(timestamps) == 0:
+            return
+        # Packets arrive in decoding order; a frame's number is its rank in
+        # presentation order
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        frames = np.flatnonzero(keyframes[order])
+        self.times = timestamps[frames] - timestamps[0]
+        self.frame_count = len(timestamps)
+        self.frames = frames
+
+    def _load(self, path):
+        try:
+            with np.load(path) as data:
+                self.times = data["times"]
+                self.frame_count = int(data["frame_count"])
+                self.frames = data["frames"]
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def _store(self, path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, frames=self.frames, times=self.times, frame_count=self.frame_count)
+        # Rename into place so concurrent readers never see half an entry
+        os.replace(temp_path, path)
+
+    def keyframe_before(self, frame_index):
+        """
+        Returns:
+            int: Position in 'frames' of the last keyframe at or before
+            frame_index (the first keyframe if there is none).
+        """
+        return max(bisect.bisect_right(self.frames, frame_index) - 1, 0)
+
+    def snap(self, target, position, tolerance, lead=0):
+        """
+        Moves a seek target onto the nearest point the decoder can reach
+        without decoding a run of frames first: a keyframe, or 'lead' frames
+        past one for captures that seek ahead of the target.
+
+        Only points on the same side of 'position' as the target are used,
+        so a seek always moves in the direction asked for.
+
+        Args:
+            target (int): The frame the seek asked for.
+            position (int): The frame currently shown.
+            tolerance (int): How many frames the result may differ from
+                the target.
+            lead (int): Frames past each keyframe that are cheap to reach.
+
+        Returns:
+            int: The frame to seek to; 'target' if no point is close enough.
+        """
+        if not self.ready():
+            return target
+        points = np.minimum(self.frames + lead, max(self.frame_count - 1, 0))
+        if target > position:
+            points = points[points > position]
+        else:
+            points = points[points < position]
+        if len(points) == 0:
+            return target
+        nearest = int(points[np.argmin(np.abs(points - target))])
+        return nearest if abs(nearest - target) <= tolerance else target
+
+    def report(self):
+        """Returns a short description of the index for the exit summary."""
+        if not self.ready():
+            return "no keyframe index (seeks used the decoder's own seeking)"
+        source = "loaded from cache" if self.from_cache else f"built in {self.build_seconds:.2f}s"
+        return f"keyframe index of {len(self.frames)} keyframes, {source}"
+
+
+def seek_lead(cap):
+    """Frames past a keyframe a capture decodes when asked to seek to it."""
+    return OPENCV_SEEK_LEAD if isinstance(cap, cv2.VideoCapture) else 0
+
+
+def seek_capture(cap, position, target, index=None):
+    """
+    Moves a capture so that its next read() returns frame 'target'.
+
+    With a ready index this takes the cheaper of decoding forward from the
+    current position and restarting at the last keyframe before the target,
+    and either way passes over the frames in between with grab(), which
+    decodes without converting to images. A target in the same group of
+    frames as the current position is therefore reached without seeking at
+    all. Without an index the capture seeks on its own.
+
+    Args:
+        cap: A cv2.VideoCapture or frame_source.FFmpegFrameSource.
+        position (int): The frame the next read() would return.
+        target (int): The frame to move to.
+        index (KeyframeIndex, optional): The video's keyframes.
+
+    Returns:
+        int: The frame the next read() returns, short of 'target' only if
+        the stream ended.
+    """
+    if index is None or not index.ready():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        return target
+
+    keyframe = index.keyframe_before(target)
+    lead = seek_lead(cap)
+    if target - index.frames[keyframe] < lead:
+        # The capture will back up into the previous group anyway
+        keyframe = index.keyframe_before(target - lead)
+    seek_cost = target - int(index.frames[keyframe])
+    if not (position <= target and target - position <= seek_cost):
+        if not hasattr(cap, "seek_keyframe"):
+            # OpenCV seeks to the keyframe and decodes forward itself
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            return target
+        cap.seek_keyframe(int(index.frames[keyframe]), float(index.times[keyframe]))
+        position = int(index.frames[keyframe])
+    while position < target:
+        if not cap.grab():
+            break
+        position += 1
+    return position
@@ -0,0 +1,262 @@
+import os
+import sys
+import cv2
+import argparse
+import asyncio
+import time
+import ansi
+import painter
+import youtube_utils
+import youtube_cache
+
+# --- Argument Parsing ---
+parser = argparse.ArgumentParser(description='Stream one video as ANSI frames to many terminal clients over TCP')
+parser.add_argument("--host", type=str, default="0.0.0.0", help="address to listen on")
+parser.add_argument("--port", type=int, default=2323, help="TCP port to listen on")
+parser.add_argument("--width", type=int, default=120, help="width of the rendered frames in characters")
+parser.add_argument("--fps", type=int, default=30, help="frame rate for webcams and sources that report none")
+parser.add_argument("--inv", action='store_true', help="invert the shades")
+parser.add_argument("--color", action='store_true', help="send 24-bit color escapes")
+parser.add_argument("--ansi-bits", type=int, default=6, help="bits per color channel in --color mode")
+parser.add_argument("--loop", action='store_true', help="restart video files when they end")
+parser.add_argument("--report-interval", type=float, default=10.0, help="seconds between status reports (0 to disable)")
+parser.add_argument("video", type=str, help="path or YouTube URL of the video, or a webcam index")
+
+
+class ClientSession:
+    """
+    One connected viewer. Holds a single slot for the newest frame: when a
+    frame arrives before the previous one was sent, the older frame is
+    replaced and counted as dropped, so a slow client falls behind by at most
+    one frame instead of buffering without limit.
+
+    Attributes:
+        name (str): The peer address.
+        frames_sent (int): Frames written to the client.
+        frames_dropped (int): Frames replaced before they could be sent.
+        bytes_sent (int): Bytes written to the client.
+    """
+
+    def __init__(self, name, writer):
+        self.name = name
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self._writer = writer
+        self._latest = None
+        self._frame_ready = asyncio.Event()
+
+    def offer(self, payload):
+        """Puts a frame in the client's slot, replacing any unsent frame."""
+        if self._latest is not None:
+            self.frames_dropped += 1
+        self._latest = payload
+        self._frame_ready.set()
+
+    def close(self):
+        self._writer.close()
+
+    async def send_frames(self):
+        """Writes frames as they arrive until the connection fails."""
+        try:
+            await self._send_loop()
+        except (ConnectionError, OSError):
+            # The client went away mid-write
+            pass
+
+    async def _send_loop(self):
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            payload, self._latest = self._latest, None
+            if payload is None:
+                continue
+            self._writer.write(payload)
+            # drain() waits while the socket buffer is full; frames offered
+            # meanwhile overwrite the slot instead of queueing up.
+            await self._writer.drain()
+            self.frames_sent += 1
+            self.bytes_sent += len(payload)
+
+
+class Broadcaster:
+    """
+    Accepts client connections and fans every published frame out to all of
+    them. The frame is rendered once; clients share the same bytes object.
+
+    Attributes:
+        frames_published (int): Frames handed to publish().
+        clients_served (int): Connections accepted since start.
+    """
+
+    def __init__(self):
+        self.frames_published = 0
+        self.clients_served = 0
+        self.clients = set()
+        # Totals of clients that already disconnected
+        self._closed_bytes = 0
+        self._closed_drops = 0
+
+    def publish(self, payload):
+        """Offers a rendered frame to every connected client."""
+        self.frames_published += 1
+        for client in self.clients:
+            client.offer(payload)
+
+    def bytes_sent(self):
+        return self._closed_bytes + sum(client.bytes_sent for client in self.clients)
+
+    def frames_dropped(self):
+        return self._closed_drops + sum(client.frames_dropped for client in self.clients)
+
+    async def handle_client(self, reader, writer):
+        """asyncio.start_server callback serving one connection."""
+        peer = writer.get_extra_info("peername")
+        name = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else str(peer)
+        client = ClientSession(name, writer)
+        self.clients.add(client)
+        self.clients_served += 1
+        print(f"Client connected: {name} ({len(self.clients)} watching)")
+
+        writer.write(ansi.CLEAR_SCREEN + ansi.CURSOR_HOME + ansi.HIDE_CURSOR)
+        sender = asyncio.ensure_future(client.send_frames())
+        # Input is ignored; reading only tells us when the client hangs up
+        receiver = asyncio.ensure_future(self._discard_input(reader))
+        try:
+            await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            sender.cancel()
+            receiver.cancel()
+            self.clients.discard(client)
+            self._closed_bytes += client.bytes_sent
+            self._closed_drops += client.frames_dropped
+            writer.close()
+            print(f"Client disconnected: {name} after {client.frames_sent} frames, "
+                  f"{client.frames_dropped} dropped ({len(self.clients)} watching)")
+
+    @staticmethod
+    async def _discard_input(reader):
+        while await reader.read(4096):
+            pass
+
+    def report(self, elapsed):
+        """Prints connected clients, throughput and per-client drops."""
+        print(f"[{elapsed:7.1f}s] {len(self.clients)} clients, {self.frames_published} frames rendered, "
+              f"{self.bytes_sent() / 1024 / 1024:.1f} MiB sent, {self.frames_dropped()} frames dropped")
+        for client in sorted(self.clients, key=lambda c: c.name):
+            print(f"    {client.name}: {client.frames_sent} sent, {client.frames_dropped} dropped, "
+                  f"{client.bytes_sent / 1024:.0f} KiB")
+
+
+def open_capture(video, width):
+    """
+    Opens the source and computes the render height.
+
+    Returns:
+        tuple: (cv2.VideoCapture, height, fps) or None if no frame could be read.
+    """
+    cap = cv2.VideoCapture(video)
+    ok, frame = cap.read()
+    if not ok:
+        return None
+    height = int(frame.shape[0] * (width / frame.shape[1]) * (3.0 / 5))
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return cap, height, cap.get(cv2.CAP_PROP_FPS)
+
+
+def render_next(cap, screen, width, height, use_color, loop):
+    """
+    Decodes and renders the next frame. Runs on an executor thread so the
+    event loop keeps serving clients meanwhile.
+
+    Returns:
+        bytes or None: The ANSI payload, or None at the end of the stream.
+    """
+    ok, orig_frame = cap.read()
+    if not ok and loop:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        ok, orig_frame = cap.read()
+    if not ok:
+        return None
+    frame_resized = cv2.resize(orig_frame, (width, height))
+    grayscale_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
+    return screen.render_chars(painter.frame_to_chars(grayscale_frame), frame_resized if use_color else None)
+
+
+async def produce(broadcaster, cap, width, height, fps, args):
+    """Renders frames at the source rate and publishes them until the end."""
+    loop = asyncio.get_running_loop()
+    # Frames are only rendered to bytes here; each client socket gets them
+    screen = ansi.AnsiScreen(fd=-1, color_bits=args.ansi_bits)
+    frame_interval = 1.0 / fps
+    start_time = time.perf_counter()
+    next_report = args.report_interval
+    frame_count = 0
+    while True:
+        payload = await loop.run_in_executor(None, render_next, cap, screen, width, height,
+                                             args.color, args.loop)
+        if payload is None:
+            break
+        broadcaster.publish(payload)
+        frame_count += 1
+
+        elapsed = time.perf_counter() - start_time
+        if args.report_interval and elapsed >= next_report:
+            broadcaster.report(elapsed)
+            next_report += args.report_interval
+        # Pace against the start time so rendering jitter does not accumulate
+        wait_time = frame_count * frame_interval - elapsed
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+
+async def serve(args, video):
+    opened = open_capture(video, args.width)
+    if opened is None:
+        print("Could not extract frame from video.")
+        return 1
+    cap, height, source_fps = opened
+    fps = source_fps if source_fps and source_fps > 0 else args.fps
+
+    broadcaster = Broadcaster()
+    server = await asyncio.start_server(broadcaster.handle_client, args.host, args.port)
+    print(f"Streaming {args.width}x{height} at {fps:.0f} fps on {args.host}:{args.port} "
+          f"(connect with: telnet <host> {args.port})")
+    start_time = time.perf_counter()
+    try:
+        await produce(broadcaster, cap, args.width, height, fps, args)
+    finally:
+        server.close()
+        for client in list(broadcaster.clients):
+            client.close()
+        await server.wait_closed()
+        cap.release()
+        broadcaster.report(time.perf_counter() - start_time)
+        print(f"Finished. Served {broadcaster.clients_served} clients.")
+    return 0
+
+
+def main():
+    args = parser.parse_args()
+    if args.inv:
+        painter.invert_chars()
+
+    video = args.video
+    try:
+        video = int(video) # Webcam index
+    except ValueError:
+        if youtube_utils.is_youtube_url(video):
+            print("Resolving YouTube video...")
+            video = youtube_cache.resolve(video, args.width)
+        elif not os.path.isfile(video):
+            print(f"Error: Failed to find video at: {args.video}")
+            return 1
+
+    try:
+        return asyncio.run(serve(args, video))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,5 +2,5 @@ from setuptools import setup
 from Cython.Build import cythonize
 
 setup(
-    ext_modules = cythonize("painter.pyx")
+    ext_modules = cythonize("painter_kernel.pyx")
 )
\ No newline at end of file
@@ -0,0 +1,154 @@
+import json
+import time
+
+
+class StageTimer:
+    """
+    Times the stages of every frame with the monotonic performance counter.
+
+    Call begin_frame() at the top of the loop, lap(name) after each stage and
+    end_frame() once the frame is done. Averages over recent frames are kept
+    for the HUD, and each frame can be written to a trace file either as JSON
+    lines or in Chrome's trace event format (open it in chrome://tracing or
+    Perfetto).
+    """
+
+    def __init__(self, trace_path=None, trace_format="jsonl", smoothing=0.1):
+        """
+        Args:
+            trace_path (str, optional): File to write per-frame timings to.
+            trace_format (str): "jsonl" for one JSON object per frame, or
+                "chrome" for the Chrome trace event format.
+            smoothing (float): Weight of the newest frame in the averages.
+        """
+        self.smoothing = smoothing
+        self.trace_format = trace_format
+        self.frames = 0
+        self.dropped = 0
+        self.averages = {}
+        self.interval_average = 0.0
+        self._stages = {}
+        self._external = set()
+        self._frame_start = 0.0
+        self._last = 0.0
+        self._origin = time.perf_counter()
+        self._trace = open(trace_path, "w", encoding="utf-8") if trace_path else None
+        if self._trace and trace_format == "chrome":
+            self._trace.write('{"traceEvents": [\n')
+            self._first_event = True
+
+    def begin_frame(self):
+        """Marks the start of a frame."""
+        now = time.perf_counter()
+        if self.frames:
+            # Frame-to-frame interval, so the HUD shows the displayed frame rate
+            # rather than how fast a single frame could be rendered
+            interval = now - self._frame_start
+            alpha = self.smoothing if self.frames > 1 else 1.0
+            self.interval_average += alpha * (interval - self.interval_average)
+        self._frame_start = self._last = now
+        self._stages = {}
+        self._external = set()
+
+    def lap(self, stage):
+        """Attributes the time since the previous lap to 'stage'."""
+        now = time.perf_counter()
+        self._stages[stage] = self._stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def add(self, stage, seconds):
+        """Records a stage that was timed elsewhere, e.g. on another thread."""
+        self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+        self._external.add(stage)
+
+    def drop(self, count=1):
+        """Counts frames that were decoded but never shown."""
+        self.dropped += count
+
+    def end_frame(self):
+        """Finishes the frame, updating averages and the trace."""
+        total = time.perf_counter() - self._frame_start
+        alpha = self.smoothing if self.frames else 1.0
+        for stage, seconds in self._stages.items():
+            previous = self.averages.get(stage, seconds)
+            self.averages[stage] = previous + alpha * (seconds - previous)
+        if self._trace:
+            self._write_trace(total)
+        self.frames += 1
+
+    def hud_text(self):
+        """Returns a one-line summary: fps, per-stage milliseconds and drops."""
+        fps = 1.0 / self.interval_average if self.interval_average > 0 else 0.0
+        stages = " ".join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in self.averages.items())
+        return f" {fps:5.1f} fps | {stages} ms | drop {self.dropped} "
+
+    def close(self):
+        """Flushes and closes the trace file."""
+        if not self._trace:
+            return
+        if self.trace_format == "chrome":
+            self._trace.write("\n]}\n")
+        self._trace.close()
+        self._trace = None
+
+    def _write_trace(self, total):
+        if self.trace_format == "chrome":
+            # Lay the stages out back to back as complete ("X") events, in
+            # microseconds. Stages timed on another thread get their own track.
+            frame_start = (self._frame_start - self._origin) * 1e6
+            timestamp = frame_start
+            events = [{"name": "frame", "ph": "X", "pid": 0, "tid": 0, "ts": frame_start,
+                       "dur": total * 1e6, "args": {"frame": self.frames}}]
+            external_timestamp = frame_start
+            for stage, seconds in self._stages.items():
+                if stage in self._external:
+                    events.append({"name": stage, "ph": "X", "pid": 0, "tid": 2, "ts": external_timestamp,
+                                   "dur": seconds * 1e6})
+                    external_timestamp += seconds * 1e6
+                else:
+                    events.append({"name": stage, "ph": "X", "pid": 0, "tid": 1, "ts": timestamp,
+                                   "dur": seconds * 1e6})
+                    timestamp += seconds * 1e6
+            for event in events:
+                if not self._first_event:
+                    self._trace.write(",\n")
+                self._trace.write(json.dumps(event))
+                self._first_event = False
+        else:
+            record = {
+                "frame": self.frames,
+                "t": round(self._frame_start - self._origin, 6),
+                "total_ms": round(total * 1000, 3),
+                "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self._stages.items()},
+                "dropped": self.dropped,
+            }
+            self._trace.write(json.dumps(record) + "\n")
+
+
+class NullTimer:
+    """A StageTimer stand-in that does nothing, used when stats are off."""
+
+    frames = 0
+    dropped = 0
+
+    def begin_frame(self):
+        pass
+
+    def lap(self, stage):
+        pass
+
+    def add(self, stage, seconds):
+        pass
+
+    def drop(self, count=1):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def hud_text(self):
+        return ""
+
+    def close(self):
+        pass
+
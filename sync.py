@@ -0,0 +1,132 @@
+import time
+
+
+class SmoothedClock:
+    """
+    Smooths a coarse millisecond position source such as
+    pygame.mixer.music.get_pos(), which only advances in audio-buffer sized
+    steps. Between updates the position is extrapolated with the monotonic
+    wall clock; when a new reading arrives the estimate is nudged towards it
+    instead of jumping, so the clock advances evenly.
+    """
+
+    def __init__(self, get_pos_ms, gain=0.1, snap_threshold=0.25):
+        """
+        Args:
+            get_pos_ms (callable): Returns the raw position in milliseconds.
+            gain (float): Fraction of the measured error corrected per update.
+            snap_threshold (float): Errors larger than this many seconds (a
+                restart or a seek) are applied immediately.
+        """
+        self.get_pos_ms = get_pos_ms
+        self.gain = gain
+        self.snap_threshold = snap_threshold
+        self._last_raw = None
+        self._snap = False
+        self._anchor_pos = 0.0
+        self._anchor_time = time.perf_counter()
+
+    def reset(self):
+        """Follows the next reading exactly, after a pause or seek moved the source."""
+        self._last_raw = None
+        self._snap = True
+
+    def time(self):
+        """Returns the smoothed position in seconds."""
+        now = time.perf_counter()
+        raw = self.get_pos_ms()
+        predicted = self._anchor_pos + (now - self._anchor_time)
+        if raw != self._last_raw:
+            self._last_raw = raw
+            error = raw / 1000.0 - predicted
+            if abs(error) > self.snap_threshold or self._snap:
+                predicted += error
+                self._snap = False
+            else:
+                predicted += error * self.gain
+            self._anchor_pos = predicted
+            self._anchor_time = now
+        return predicted
+
+
+class AVSync:
+    """
+    Schedules video frames against an audio clock.
+
+    Frames that are early are held until their presentation time, frames that
+    are less than 'late_tolerance' seconds late are shown immediately, and
+    anything later is dropped so the decoder can catch up by skipping frames
+    rather than by seeking.
+
+    Attributes:
+        dropped_frames (int): Frames discarded for being too late.
+        late_frames (int): Frames shown late but within tolerance.
+        seeks (int): Catch-ups large enough to warrant a seek.
+        max_drift (float): Largest absolute drift seen, in seconds.
+    """
+
+    def __init__(self, fps, clock, late_tolerance=None, seek_threshold=3.0):
+        """
+        Args:
+            fps (float): Frame rate of the source video.
+            clock: An object whose time() method returns the audio position
+                in seconds, e.g. SmoothedClock.
+            late_tolerance (float, optional): Seconds a frame may be late and
+                still be shown. Defaults to one frame period.
+            seek_threshold (float): Seconds behind the clock beyond which
+                catching up should seek instead of skipping frames.
+        """
+        self.fps = fps
+        self.clock = clock
+        self.late_tolerance = late_tolerance if late_tolerance is not None else 1.0 / fps
+        self.seek_threshold = seek_threshold
+        self.dropped_frames = 0
+        self.late_frames = 0
+        self.seeks = 0
+        self.max_drift = 0.0
+        self._drift_total = 0.0
+        self._drift_samples = 0
+
+    def schedule(self, frame_index):
+        """
+        Decides what to do with a decoded frame.
+
+        Args:
+            frame_index (int): Index of the frame in the source video.
+
+        Returns:
+            float or None: Seconds to wait before showing the frame, or None
+            if the frame is too late and should be dropped.
+        """
+        drift = frame_index / self.fps - self.clock.time()
+        self._drift_total += abs(drift)
+        self._drift_samples += 1
+        self.max_drift = max(self.max_drift, abs(drift))
+
+        if drift >= 0:
+            return drift
+        if -drift <= self.late_tolerance:
+            self.late_frames += 1
+            return 0.0
+        self.dropped_frames += 1
+        return None
+
+    def target_frame(self):
+        """Returns the frame index that should be on screen right now."""
+        return int(self.clock.time() * self.fps)
+
+    def should_seek(self, frame_index, target_frame):
+        """
+        Returns True if the gap to target_frame is too large to skip through
+        frame by frame, and counts the seek.
+        """
+        if (target_frame - frame_index) / self.fps > self.seek_threshold:
+            self.seeks += 1
+            return True
+        return False
+
+    def mean_drift(self):
+        """Returns the mean absolute drift in seconds."""
+        if self._drift_samples == 0:
+            return 0.0
+        return self._drift_total / self._drift_samples
@@ -0,0 +1,80 @@
+import os
+import cv2
+import argparse
+import time
+import color
+import container
+import painter
+import youtube_utils
+import youtube_cache
+
+# --- Argument Parsing ---
+parser = argparse.ArgumentParser(description='Pre-render a video into an ASCII video container')
+parser.add_argument("--width", type=int, default=120, help="width of the rendered frames in characters")
+parser.add_argument("--inv", action='store_true', help="invert the shades")
+parser.add_argument("--color", action='store_true', help="store a palette and per-cell colors")
+parser.add_argument("--colors", type=int, default=240, help="maximum number of palette colors in --color mode")
+parser.add_argument("--no-compress", action='store_true', help="store frames uncompressed (larger, zero-copy playback)")
+parser.add_argument("video", type=str, help="path or YouTube URL of the video to render")
+parser.add_argument("output", type=str, help="container file to write")
+args = parser.parse_args()
+
+if args.inv:
+    painter.invert_chars()
+
+if youtube_utils.is_youtube_url(args.video):
+    print("Resolving YouTube video...")
+    video = youtube_cache.resolve(args.video, args.width)
+    audio_path = args.video
+elif os.path.isfile(args.video):
+    video = args.video
+    audio_path = os.path.abspath(args.video)
+else:
+    print(f"Error: Failed to find video at: {args.video}")
+    exit(1)
+
+cap = cv2.VideoCapture(video)
+ok, frame = cap.read()
+if not ok:
+    print("Could not extract frame from video.")
+    exit(1)
+
+source_fps = cap.get(cv2.CAP_PROP_FPS) or 30
+width = args.width
+ratio = width / frame.shape[1]
+height = int(frame.shape[0] * ratio * (3.0 / 5))
+
+palette = None
+color_cube = None
+if args.color:
+    print("Analyzing video for optimal color palette...")
+    sample_pixels = color.sample_video_pixels(cap, width, height)
+    if sample_pixels is None:
+        sample_pixels = cv2.resize(frame, (width, height))
+    palette = color.build_palette(sample_pixels, min(args.colors, 256))
+    color_cube = color.build_color_cube(palette)
+cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+start_time = time.time()
+frame_count = 0
+with container.ContainerWriter(args.output, width, height, source_fps, "".join(painter.characters),
+                               palette, audio_path, compress=not args.no_compress) as writer:
+    while True:
+        ok, orig_frame = cap.read()
+        if not ok:
+            break
+
+        frame_resized = cv2.resize(orig_frame, (width, height))
+        grayscale_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
+        palette_indices = None
+        if color_cube is not None:
+            palette_indices = color_cube[color.cube_index(frame_resized)]
+        writer.write_frame(painter.frame_to_chars(grayscale_frame), palette_indices)
+
+        frame_count += 1
+        if frame_count % 100 == 0:
+            print(f"Rendered {frame_count} frames...")
+
+elapsed = time.time() - start_time
+print(f"Wrote {frame_count} frames ({width}x{height}) to {args.output} in {elapsed:.1f}s, "
+      f"{os.path.getsize(args.output) / 1024:.0f} KiB.")
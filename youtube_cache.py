@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+
+import youtube_utils
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ascii_player", "youtube")
+
+
+def video_id(url):
+    """
+    Extracts the video ID from a YouTube URL (watch, youtu.be, shorts, embed
+    and live links). Other URLs get a stable hash instead.
+    """
+    parsed = urlparse(url)
+    hostname = (parsed.hostname or "").lower()
+    if hostname == "youtu.be":
+        candidate = parsed.path.strip("/").split("/")[0]
+    else:
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+        parts = parsed.path.strip("/").split("/")
+        if not candidate and len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            candidate = parts[1]
+    if candidate and all(c.isalnum() or c in "-_" for c in candidate):
+        return candidate
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class YouTubeCache:
+    """
+    On-disk cache of YouTube videos, so a video is resolved and downloaded
+    once and audio and video are both read from the same local file.
+
+    Each video gets a directory named after its ID holding 'info.json' (the
+    format chosen by the extractor, with the time it was resolved) and the
+    downloaded media. Resolved formats expire after 'metadata_ttl' seconds,
+    since stream URLs are only valid for a few hours, but a complete download
+    is reused without contacting YouTube at all. When the cache grows past
+    'max_bytes' the least recently played videos are deleted.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3, metadata_ttl=5 * 3600):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache entries.
+            max_bytes (int): Total media size the cache is trimmed to.
+            metadata_ttl (float): Seconds a resolved format stays valid.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.metadata_ttl = metadata_ttl
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _load_info(self, key):
+        try:
+            with open(os.path.join(self._entry_dir(key), "info.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store_info(self, key, info):
+        path = os.path.join(self._entry_dir(key), "info.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(path + ".tmp", path)
+
+    def cached_path(self, url, width):
+        """
+        Returns the local copy of a video if a complete download at least
+        'width' pixels wide (or the widest available) is cached, else None.
+        """
+        key = video_id(url)
+        info = self._load_info(key)
+        if not info or not info.get("media"):
+            return None
+        path = os.path.join(self._entry_dir(key), info["media"])
+        if not os.path.isfile(path) or os.path.getsize(path) != info.get("size"):
+            return None
+        if info.get("width", 0) < width and not info.get("widest"):
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        return path
+
+    def fetch(self, url, width, progress=True):
+        """
+        Returns a local file for the video, downloading it if needed.
+
+        Args:
+            url (str): A YouTube URL.
+            width (int): Render width in characters; the smallest format at
+                least this many pixels wide is downloaded.
+            progress (bool): Print download progress.
+
+        Returns:
+            str: Path of the cached media file.
+        """
+        path = self.cached_path(url, width)
+        if path:
+            return path
+
+        key = video_id(url)
+        os.makedirs(self._entry_dir(key), exist_ok=True)
+        info = self._load_info(key)
+        stale_media = info.get("media") if info else None
+        if (not info or time.time() - info.get("resolved_at", 0) > self.metadata_ttl
+                or info.get("requested_width") != width):
+            video_info = youtube_utils.extract_info(url)
+            chosen = youtube_utils.find_best_video_quality_url(video_info, width)
+            info = {
+                "id": key,
+                "title": video_info.get("title", ""),
+                "resolved_at": time.time(),
+                "requested_width": width,
+                "url": chosen["url"],
+                "http_headers": chosen.get("http_headers", {}),
+                "ext": chosen.get("ext", "mp4"),
+                "width": youtube_utils.format_width(chosen),
+                "widest": chosen is youtube_utils.widest_format(video_info),
+            }
+            self._store_info(key, info)
+
+        media = f"media.{info['ext']}"
+        path = os.path.join(self._entry_dir(key), media)
+        if stale_media and stale_media != media:
+            # A download too narrow for this width is replaced, not kept alongside
+            try:
+                os.remove(os.path.join(self._entry_dir(key), stale_media))
+            except OSError:
+                pass
+        self._download(info, path, progress)
+        info.update({"media": media, "size": os.path.getsize(path)})
+        self._store_info(key, info)
+        self.evict(keep=key)
+        return path
+
+    def _download(self, info, path, progress):
+        request = urllib.request.Request(info["url"], headers=info.get("http_headers", {}))
+        temp_path = path + ".part"
+        with urllib.request.urlopen(request, timeout=30) as response, open(temp_path, "wb") as f:
+            total = int(response.headers.get("Content-Length") or 0)
+            done = 0
+            while True:
+                chunk = response.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+                done += len(chunk)
+                if progress and total:
+                    print(f"\rDownloading: {done * 100 // total}% of {total / 1024 / 1024:.1f} MiB", end="")
+        if progress and total:
+            print()
+        # Rename into place so an interrupted download is never mistaken for a complete one
+        os.replace(temp_path, path)
+
+    def invalidate(self, url=None):
+        """
+        Deletes one video's entry, or every entry if url is None.
+        """
+        if url is not None:
+            shutil.rmtree(self._entry_dir(video_id(url)), ignore_errors=True)
+        elif os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def evict(self, keep=None):
+        """
+        Deletes least recently played entries until the cache fits max_bytes.
+
+        Args:
+            keep (str, optional): ID of an entry never to delete, e.g. the
+                video about to be played.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(entry_dir):
+                continue
+            size = 0
+            last_used = 0.0
+            for file_name in os.listdir(entry_dir):
+                try:
+                    stat = os.stat(os.path.join(entry_dir, file_name))
+                except OSError:
+                    continue
+                size += stat.st_size
+                last_used = max(last_used, stat.st_mtime)
+            entries.append((last_used, size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
+
+
+def resolve(url, width, use_cache=True):
+    """
+    Returns what the players should open for a YouTube URL: the cached local
+    copy, or with use_cache=False a stream URL resolved for this play only.
+
+    Args:
+        url (str): A YouTube URL.
+        width (int): Render width in characters.
+        use_cache (bool): Download through the on-disk cache.
+
+    Returns:
+        str: A file path or stream URL usable by OpenCV and FFmpeg alike.
+    """
+    if not use_cache:
+        return youtube_utils.get_youtube_video_url(url, width)
+    return YouTubeCache().fetch(url, width)
@@ -1,4 +1,3 @@
-import yt_dlp
 from urllib.parse import urlparse
 
 
@@ -19,31 +18,62 @@ def is_youtube_url(url: str) -> bool:
         return False
 
 
-def find_best_video_quality_url(video_info: dict) -> dict:
-    highest_allowed_resolution = 340
-    found_formats = {}
-    for format in video_info["formats"]:
-        if format["vcodec"] != "none":
-            codec = format["vcodec"]
-            # height because it basically defines resolution. e.g. 640x480 -> 480p
-            resolution = format["height"]
-            fps = format["fps"]
-            found_formats["%s_%s_%s" % (codec, resolution, fps)] = format
+def format_width(format: dict) -> int:
+    """Pixel width of a format, estimated from its height if missing."""
+    if isinstance(format.get("width"), int):
+        return format["width"]
+    return int(format["height"] * 16 / 9)
 
-    video_formats = [format for format in found_formats.values()
-                     if type(format["height"]) is int]
-    sorted_formats = sorted(video_formats, key=lambda x: x["height"])
-    if sorted_formats[0]["height"] > highest_allowed_resolution:
-        raise Exception("no desired resolution found, found resolutions:", list(
-            map(lambda x: x["height"], found_formats.values())))
 
-    return sorted_formats[0]
+def _video_formats(video_info: dict, with_audio: bool) -> list:
+    formats = [format for format in video_info["formats"]
+               if format.get("vcodec", "none") != "none" and isinstance(format.get("height"), int)]
+    if with_audio:
+        # Formats carrying both streams let audio and video share one file;
+        # fall back to video-only formats if there are none.
+        muxed = [format for format in formats if format.get("acodec", "none") != "none"]
+        formats = muxed or formats
+    return sorted(formats, key=lambda x: (format_width(x), x.get("fps") or 0))
 
 
-def get_youtube_video_url(yt_url: str):
+def widest_format(video_info: dict, with_audio: bool = True) -> dict:
+    return _video_formats(video_info, with_audio)[-1]
+
+
+def find_best_video_quality_url(video_info: dict, width: int = 120, with_audio: bool = True) -> dict:
+    """
+    Picks the smallest format that is still at least 'width' pixels wide, so
+    no detail is lost when frames are shrunk to 'width' characters, and falls
+    back to the widest format for larger renders.
+
+    Args:
+        video_info (dict): The result of extract_info().
+        width (int): Render width in characters.
+        with_audio (bool): Prefer formats that also carry an audio stream.
+
+    Returns:
+        dict: The chosen yt-dlp format.
+    """
+    sorted_formats = _video_formats(video_info, with_audio)
+    if not sorted_formats:
+        raise Exception("no video formats found")
+    for format in sorted_formats:
+        if format_width(format) >= width:
+            return format
+    return sorted_formats[-1]
+
+
+def extract_info(yt_url: str) -> dict:
+    # Imported on first use: every player checks is_youtube_url(), but only
+    # YouTube playback needs yt-dlp
+    import yt_dlp
     options = {}
     ytdl = yt_dlp.YoutubeDL(options)
-    info_dict = ytdl.extract_info(yt_url, download=False)
-    best_video_format = find_best_video_quality_url(info_dict)
+    return ytdl.extract_info(yt_url, download=False)
+
+
+def get_youtube_video_url(yt_url: str, width: int = 120):
+    info_dict = extract_info(yt_url)
+    best_video_format = find_best_video_quality_url(info_dict, width)
 
     return best_video_format["url"]